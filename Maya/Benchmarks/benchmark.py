@@ -0,0 +1,308 @@
+"""
+    Benchmark suite for the Tools scripts, run against the headless stand-in.
+
+    Times the Python side of keying, playback scrubbing, cache save/load,
+    crease painting/selection, alpha migration and bbox updates on
+    synthetic meshes, and writes the results as JSON so runs can be
+    compared against each other.
+
+    Usage:
+
+        python benchmark.py [--sizes 1000 10000 100000 1000000] [--repeat 3]
+            [--only keying scrub] [--output results.json] [--compare baseline.json]
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from collections import OrderedDict
+import numpy as np
+
+import standin
+standin.install()
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Tools'))
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import VertexColorAnimator as vca
+import editor
+import boundingbox
+import batchmigrate
+from alphacodec import makeAlphaV2, makeAlphaV3
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+# Keyed frames per animator, spaced KEY_SPACING frames apart on the timeline
+KEY_COUNT = 8
+KEY_SPACING = 10
+
+# Fraction of vertices changed between keys / painted with creases
+CHANGE_FRACTION = 0.05
+CREASE_FRACTION = 0.2
+
+# Vertices per shape for the bbox benchmarks, which scale by shape count
+BBOX_SHAPE_VERTICES = 1000
+BBOX_MATERIALS = 4
+
+
+def newScene():
+    """Reset the stand-in and every cache the tools keep between calls"""
+    standin.reset()
+    vca.VertexColorAnimatorSystem.animators = dict()
+    vca.VertexColorAnimatorSystem.initialize()
+    editor.clearCreaseIndices()
+    boundingbox.BoundingBoxSync.disable()
+
+def getColors(shape, colorset=None):
+    return standin.scene.get(shape).mesh.getColors(colorset)
+
+def keyedAnimator(vertices):
+    """Create a mesh with KEY_COUNT keyed color states
+
+        :return Tuple (shape, animator)
+    """
+    newScene()
+    shape = createKeyFrames(vertices)
+    cmds.select('grid')
+
+    for i, colors in enumerate(shape[1]):
+        cmds.currentTime(i * KEY_SPACING)
+        getColors(shape[0])[:] = colors
+        vca.VertexColorAnimatorSystem.on_set_key()
+
+    return shape[0], vca.VertexColorAnimatorSystem.animators['|grid']
+
+def createKeyFrames(vertices):
+    """Create the benchmark mesh and the color state of each key
+
+        :return Tuple (shape, list of (N, 4) colors)
+    """
+    shape = standin.createMesh('grid', vertices)
+    colors = getColors(shape).copy()
+    rng = np.random.RandomState(1)
+
+    frames = []
+    for i in range(KEY_COUNT):
+        changed = rng.rand(len(colors)) < CHANGE_FRACTION
+        colors[changed] = rng.rand(int(changed.sum()), 4)
+        frames.append(colors.copy())
+
+    return (shape, frames)
+
+def benchKeying(vertices):
+    newScene()
+    shape, frames = createKeyFrames(vertices)
+    cmds.select('grid')
+
+    def run():
+        for i, colors in enumerate(frames):
+            cmds.currentTime(i * KEY_SPACING)
+            getColors(shape)[:] = colors
+            vca.VertexColorAnimatorSystem.on_set_key()
+
+    return run
+
+def benchScrub(vertices):
+    keyedAnimator(vertices)
+    last = KEY_COUNT * KEY_SPACING
+    frames = list(range(last)) + list(range(last, -1, -1))
+
+    def run():
+        for frame in frames:
+            vca.VertexColorAnimatorSystem.on_frame_change(frame)
+
+    return run
+
+def benchCacheSave(vertices):
+    shape, animator = keyedAnimator(vertices)
+
+    # Repacking from scratch, as after a fresh load
+    for frame in animator.frames:
+        frame.packed = None
+
+    return animator.update_cache
+
+def benchCacheLoad(vertices):
+    shape, animator = keyedAnimator(vertices)
+
+    def run():
+        animator.load_cache()
+        for frame in animator.frames:
+            frame.cache
+
+    return run
+
+def creaseMesh(vertices, alphas):
+    """Create a mesh with the crease colorset painted on CREASE_FRACTION of it"""
+    newScene()
+    shape = standin.createMesh('grid', vertices, ('colorSet1', editor.CREASE_COLORSET))
+    rng = np.random.RandomState(2)
+
+    colors = getColors(shape, editor.CREASE_COLORSET)
+    colors[:, 3] = 0
+    painted = rng.rand(len(colors)) < CREASE_FRACTION
+    colors[painted, 3] = alphas(rng, int(painted.sum()))
+
+    return shape
+
+def randomV3(rng, count):
+    return makeAlphaV3(np.round(rng.rand(count) * 98 + 1) / 100)
+
+def randomV2(rng, count):
+    return makeAlphaV2(0, 0, 0, rng.randint(1, 32, count))
+
+def benchCreasePaint(vertices):
+    shape = creaseMesh(vertices, randomV3)
+    ids = np.flatnonzero(np.random.RandomState(3).rand(vertices) < CHANGE_FRACTION)
+    cmds.select(editor.getComponentRanges(shape, ids))
+
+    return lambda: editor.crease(0.5)
+
+def benchCreaseSelectCold(vertices):
+    shape = creaseMesh(vertices, randomV3)
+    cmds.select('grid')
+
+    def run():
+        editor.invalidateCreaseIndex(shape)
+        editor.selectCreases(False, (0.25, 0.75))
+        cmds.select('grid')
+
+    return run
+
+def benchCreaseSelectWarm(vertices):
+    shape = creaseMesh(vertices, randomV3)
+    cmds.select('grid')
+    editor.getCreaseIndex(shape)
+
+    def run():
+        editor.selectCreases(False, (0.25, 0.75))
+        cmds.select('grid')
+
+    return run
+
+def benchMigrate(vertices):
+    creaseMesh(vertices, randomV2)
+    scene = batchmigrate.MayaScene()
+
+    return lambda: batchmigrate.migrateScene(scene)
+
+def bboxScene(vertices):
+    """Create vertices / BBOX_SHAPE_VERTICES shapes over BBOX_MATERIALS materials"""
+    newScene()
+    count = max(1, vertices // BBOX_SHAPE_VERTICES)
+    shapes = [
+        standin.createMesh('shape{}'.format(i), BBOX_SHAPE_VERTICES, seed=i)
+        for i in range(count)
+    ]
+
+    for i in range(BBOX_MATERIALS):
+        standin.createMaterial('npr{}'.format(i), shapes[i::BBOX_MATERIALS])
+
+    cmds.select(['shape{}'.format(i) for i in range(count)])
+    return shapes
+
+def benchBBoxUpdate(vertices):
+    bboxScene(vertices)
+    return lambda: boundingbox.updateSelectedBoundingBoxes(boundingbox.aggregateMax)
+
+def benchBBoxLive(vertices):
+    shapes = bboxScene(vertices)
+    boundingbox.BoundingBoxSync.enable()
+
+    # A modeling edit dirtying a single shape
+    def run():
+        standin.scene.dirty(standin.scene.get(shapes[0]))
+        standin.scene.runIdle()
+
+    return run
+
+BENCHMARKS = OrderedDict((
+    ('keying', benchKeying),
+    ('scrub', benchScrub),
+    ('cache_save', benchCacheSave),
+    ('cache_load', benchCacheLoad),
+    ('crease_paint', benchCreasePaint),
+    ('crease_select_cold', benchCreaseSelectCold),
+    ('crease_select_warm', benchCreaseSelectWarm),
+    ('migrate', benchMigrate),
+    ('bbox_update', benchBBoxUpdate),
+    ('bbox_live', benchBBoxLive),
+))
+
+
+def runBenchmark(name, vertices, repeat):
+    """Time a benchmark, with a fresh setup for every repeat
+
+        :return dict Result entry
+    """
+    seconds = []
+    for i in range(repeat):
+        run = BENCHMARKS[name](vertices)
+        start = time.perf_counter()
+        run()
+        seconds.append(time.perf_counter() - start)
+
+    return OrderedDict((
+        ('benchmark', name),
+        ('vertices', vertices),
+        ('repeat', repeat),
+        ('min', min(seconds)),
+        ('median', float(np.median(seconds))),
+        ('seconds', seconds),
+    ))
+
+def compareResults(results, baseline):
+    """Print the ratio of each median against a baseline run"""
+    previous = dict(
+        ((r['benchmark'], r['vertices']), r['median']) for r in baseline['results']
+    )
+
+    for result in results:
+        key = (result['benchmark'], result['vertices'])
+        if key in previous and previous[key] > 0:
+            print('{:20} {:>8}  {:6.2f}x'.format(
+                key[0], key[1], result['median'] / previous[key]
+            ))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Tools scripts')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS.keys()))
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help='Previous output to compare against')
+    args = parser.parse_args(argv)
+
+    # Keep the prefetch thread from racing the timings
+    vca.VertexColorAnimatorSystem.PREFETCH_COUNT = 0
+
+    results = []
+    for vertices in args.sizes:
+        for name in args.only or BENCHMARKS.keys():
+            result = runBenchmark(name, vertices, args.repeat)
+            results.append(result)
+            print('{:20} {:>8}  {:9.4f}s'.format(name, vertices, result['median']))
+
+    output = OrderedDict((
+        ('meta', OrderedDict((
+            ('time', time.strftime('%Y-%m-%dT%H:%M:%S')),
+            ('python', platform.python_version()),
+            ('numpy', np.__version__),
+            ('platform', platform.platform()),
+        ))),
+        ('results', results),
+    ))
+
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compareResults(results, json.load(f))
+
+if __name__ == '__main__':
+    main()
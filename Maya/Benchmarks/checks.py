@@ -0,0 +1,210 @@
+"""
+    Correctness checks for the Tools scripts, run against the headless stand-in.
+
+    Each check builds a synthetic scene, runs a tool on it and compares
+    the result against a reference, raising an AssertionError on the
+    first mismatch. Meant to be run alongside benchmark.py, so speedups
+    don't come at the cost of wrong results.
+
+    Usage:
+
+        python checks.py [--only export_roundtrip ...]
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import sys
+import argparse
+from collections import OrderedDict
+import numpy as np
+
+# Sets up the stand-in and the Tools import path
+import benchmark
+import standin
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import boundingbox
+import VertexColorAnimator as vca
+import editor
+import edgeextract
+import normalcones
+from alphacodec import makeAlphaV3
+
+# Vertices of the meshes built for each check
+CHECK_VERTICES = 5000
+
+# Rings and segments of the UV sphere used by the normal cone checks
+SPHERE_RINGS = 60
+SPHERE_SEGMENTS = 120
+
+# Uniform model scales the normal cone checks run under
+CONE_SCALES = (10.0, 1.0, 0.5, 0.1, 0.01)
+
+
+def exportedAnimator(vertices, store):
+    """Key an animator using a given frame store and export it
+
+        :param store Name of the VertexColorAnimator flag to enable, or None
+        :return Tuple (animator, decode_export() result)
+    """
+    flags = ('USE_DELTA_CHAIN', 'USE_PALETTE')
+    try:
+        for flag in flags:
+            setattr(vca.VertexColorAnimator, flag, flag == store)
+
+        shape, animator = benchmark.keyedAnimator(vertices)
+        animator.on_export()
+    finally:
+        for flag in flags:
+            setattr(vca.VertexColorAnimator, flag, False)
+
+    encoded = cmds.getAttr('{}.{}'.format(animator.dag_path, animator.ATTR_EXPORT))
+    return animator, vca.decode_export(encoded)
+
+def checkExportRoundTrip(vertices):
+    """Decoded VCAExport data matches the source frames, for every frame store"""
+    for store in (None, 'USE_DELTA_CHAIN', 'USE_PALETTE'):
+        animator, (vtx_count, keys, indices, frames) = exportedAnimator(vertices, store)
+        label = store or 'list'
+
+        source = animator.get_keys()
+        remap = OrderedDict()
+        for time, vci in source:
+            remap.setdefault(vci, len(remap))
+
+        base = animator.frames[source[0][1]].cache
+        assert vtx_count == len(base), label
+        assert [(t, remap[vci]) for t, vci in source] == keys, label
+        assert len(frames) == len(remap), label
+
+        animated = np.zeros(vtx_count, dtype=bool)
+        animated[indices] = True
+
+        for vci, colors in zip(remap, frames):
+            cache = animator.frames[vci].cache
+            expected = vca.quantize_export_colors(cache[indices])
+            assert np.array_equal(colors, expected), label
+
+            # Every vertex left out of the export never changes
+            assert np.array_equal(cache[~animated], base[~animated]), label
+
+def checkCreaseAlphas(vertices):
+    """Crease writes store the exact makeAlphaV3() value of every thickness step"""
+    shape = benchmark.creaseMesh(vertices, benchmark.randomV3)
+    steps = np.arange(1, 100) / 100.0
+    ids = np.arange(vertices)
+    alphas = makeAlphaV3(steps[ids % len(steps)])
+
+    editor.setCreaseAlphas(shape, ids, alphas)
+    stored = benchmark.getColors(shape, editor.CREASE_COLORSET)[ids, 3]
+
+    # Any rounding shifts the signature digits isValidAlphaV3() checks
+    # once Maya stores the alphas as float32
+    assert np.array_equal(stored, alphas), 'alphas changed when written'
+
+def checkLiveBoundingBoxSceneChange(vertices):
+    """Live bbox sync stays on and watches the new scene after New/Open"""
+    sync = boundingbox.BoundingBoxSync
+    shapes = benchmark.bboxScene(vertices)
+    sync.enable()
+
+    try:
+        for before, after in (
+            (om.MSceneMessage.kBeforeNew, om.MSceneMessage.kAfterNew),
+            (om.MSceneMessage.kBeforeOpen, om.MSceneMessage.kAfterOpen)
+        ):
+            standin.scene.fire(('scene', before))
+            assert len(sync.callbacks) == 0, 'shapes still watched while closing'
+
+            standin.scene.fire(('scene', after))
+            assert sync.isEnabled(), 'live sync turned off by a scene change'
+            assert sorted(sync.callbacks) == sorted(shapes), 'new scene not watched'
+
+            standin.scene.dirty(standin.scene.get(shapes[0]))
+            assert sync.job is not None, 'edit did not schedule an update'
+            standin.scene.runIdle()
+    finally:
+        sync.disable()
+
+def createSphere(rings, segments):
+    """Unit UV sphere with smooth normals
+
+        :return Tuple (positions (V, 3), normals (V, 3), triangles (T, 3))
+    """
+    theta = np.linspace(0, np.pi, rings + 1)[1:-1]
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    t, p = np.meshgrid(theta, phi, indexing='ij')
+
+    ring = np.stack((np.sin(t) * np.cos(p), np.cos(t), np.sin(t) * np.sin(p)), axis=-1)
+    positions = np.concatenate(([[0, 1, 0]], ring.reshape(-1, 3), [[0, -1, 0]]))
+
+    grid = 1 + np.arange((rings - 1) * segments).reshape(rings - 1, segments)
+    right = np.roll(grid, -1, axis=1)
+    bottom = len(positions) - 1
+
+    triangles = np.concatenate((
+        np.stack((np.zeros(segments, dtype=int), right[0], grid[0]), axis=1),
+        np.stack((grid[:-1], right[:-1], right[1:]), axis=-1).reshape(-1, 3),
+        np.stack((grid[:-1], right[1:], grid[1:]), axis=-1).reshape(-1, 3),
+        np.stack((grid[-1], right[-1], np.full(segments, bottom)), axis=1)
+    ))
+
+    return positions, positions.copy(), triangles
+
+def checkNormalConesUnderScale(vertices):
+    """Culled silhouettes match a full scan under uniform model scale"""
+    positions, normals, triangles = createSphere(SPHERE_RINGS, SPHERE_SEGMENTS)
+    alphas = np.zeros(len(positions))
+    tree = normalcones.buildNormalConeTree(positions, normals, triangles)
+
+    rng = np.random.RandomState(4)
+    directions = rng.randn(16, 3)
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+
+    for scale in CONE_SCALES:
+        model = np.eye(4)
+        model[:3, :3] *= scale
+        model[:3, 3] = (1.0, -2.0, 0.5)
+
+        # Cameras 2 to 10 radii out from the sphere
+        cameras = model[:3, 3] + directions * scale * np.linspace(2, 10, len(directions))[:, None]
+
+        full = edgeextract.extractEdges(positions, normals, alphas, triangles, model, cameras)
+        culled = edgeextract.extractEdges(
+            positions, normals, alphas, triangles, model, cameras, cones=tree
+        )
+
+        for a, b in zip(full, culled):
+            missed = np.setdiff1d(a['silhouetteTriangles'], b['silhouetteTriangles'])
+            assert len(missed) == 0, 'scale {}: {} of {} silhouette triangles culled'.format(
+                scale, len(missed), len(a['silhouetteTriangles'])
+            )
+            assert np.array_equal(a['silhouetteTriangles'], b['silhouetteTriangles'])
+
+CHECKS = OrderedDict((
+    ('export_roundtrip', checkExportRoundTrip),
+    ('crease_alphas', checkCreaseAlphas),
+    ('bbox_live_scene_change', checkLiveBoundingBoxSceneChange),
+    ('normal_cones_scale', checkNormalConesUnderScale),
+))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check the Tools scripts')
+    parser.add_argument('--only', nargs='+', choices=list(CHECKS.keys()))
+    args = parser.parse_args(argv)
+
+    vca.VertexColorAnimatorSystem.PREFETCH_COUNT = 0
+
+    failed = 0
+    for name in args.only or CHECKS.keys():
+        try:
+            CHECKS[name](CHECK_VERTICES)
+            print('{:24} ok'.format(name))
+        except AssertionError as e:
+            failed += 1
+            print('{:24} FAILED {}'.format(name, e))
+
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,811 @@
+"""
+    Headless in-memory stand-in for the parts of Maya used by the Tools scripts.
+
+    Implements the subset of maya.cmds, maya.api.OpenMaya and
+    maya.api.OpenMayaAnim that VertexColorAnimator.py, editor.py,
+    boundingbox.py and batchmigrate.py call, backed by a simple scene
+    of NumPy meshes. UI commands are accepted and ignored.
+
+    This is not an emulation of Maya: it exists so the Python side of
+    the tools can be timed and regression tested without a licensed
+    session. Costs inside Maya itself (MColorArray conversion, undo
+    queue, viewport refresh) are not represented.
+
+    Usage:
+
+        import standin
+        standin.install()       # Before importing any of the tools
+        standin.reset()         # Fresh empty scene
+        mesh = standin.createMesh('grid', 10000)
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import re
+import sys
+import types
+import numpy as np
+
+# Default colorset created on every synthetic mesh
+DEFAULT_COLORSET = 'colorSet1'
+
+# Node types ls(mat=True) treats as materials
+MATERIAL_TYPES = ('GLSLShader', 'lambert', 'phong', 'blinn')
+
+# Components are only ever vertices in the tools
+COMPONENT_PATTERN = re.compile(r'^(.+)\.vtx\[(\d+)(?::(\d+))?\]$')
+ATTRIBUTE_PATTERN = re.compile(r'^([^.]+)\.(.+)$')
+
+UI_COMMANDS = (
+    'window', 'showWindow', 'columnLayout', 'rowLayout', 'rowColumnLayout',
+    'frameLayout', 'menuBarLayout', 'menu', 'menuItem', 'button', 'checkBox',
+    'text', 'separator', 'setParent', 'floatSliderGrp', 'confirmDialog',
+    'refresh', 'ogs', 'expression', 'DeleteHistory', 'polySoftEdge'
+)
+
+
+class MeshData:
+    """Geometry and colorsets of a mesh shape"""
+
+    def __init__(self, points, triangles):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64)
+        self.colorsets = dict()
+        self.current = None
+
+    @property
+    def count(self):
+        return len(self.points)
+
+    def getColors(self, name=None):
+        name = name or self.current
+        if name not in self.colorsets:
+            return np.full((self.count, 4), -1.0)
+
+        return self.colorsets[name]
+
+    def createColorset(self, name):
+        self.colorsets[name] = np.full((self.count, 4), -1.0)
+        if self.current is None:
+            self.current = name
+
+
+class Node:
+    """A scene node, doubling as the MObject returned to the tools"""
+
+    def __init__(self, name, node_type, parent=None):
+        self.name = name
+        self.type = node_type
+        self.parent = parent
+        self.children = []
+        self.attrs = dict()
+        self.mesh = None
+
+        if parent:
+            parent.children.append(self)
+
+    @property
+    def shortName(self):
+        return self.name.rsplit('|', 1)[-1]
+
+    def isDag(self):
+        return self.name.startswith('|')
+
+    def getMesh(self):
+        """Mesh shape of this node, or its first mesh child"""
+        if self.mesh is not None:
+            return self
+        for child in self.children:
+            if child.mesh is not None:
+                return child
+        return None
+
+    def hasFn(self, fn):
+        if fn == MFn.kMesh:
+            return self.getMesh() is not None
+        if fn == MFn.kShadingEngine:
+            return self.type == 'shadingEngine'
+        if fn == MFn.kTransform:
+            return self.type == 'transform'
+        return False
+
+    def isNull(self):
+        return False
+
+
+class Scene:
+    """In-memory scene state used by the cmds and OpenMaya stand-ins"""
+
+    def __init__(self):
+        self.nodes = dict()
+        self.short = dict()
+        self.connections = dict()
+        self.selection = []
+        self.time = 0.0
+        self.keys = dict()
+        self.callbacks = dict()
+        self.next_callback = 1
+        self.idle = dict()
+        self.next_job = 1
+
+    def add(self, name, node_type, parent=None):
+        path = (parent.name if parent else '') + '|' + name if node_type in ('transform', 'mesh') else name
+        node = Node(path, node_type, parent)
+        self.nodes[path] = node
+        self.short.setdefault(node.shortName, []).append(node)
+        return node
+
+    def find(self, name):
+        """Resolve a long or short node name, or None"""
+        node = self.nodes.get(name)
+        if node is not None:
+            return node
+
+        matches = self.short.get(name.rsplit('|', 1)[-1], [])
+        matches = [n for n in matches if n.name.endswith(name)]
+        if len(matches) == 1:
+            return matches[0]
+
+        return None
+
+    def get(self, name):
+        node = self.find(name)
+        if node is None:
+            raise ValueError('No object matches name: {}'.format(name))
+        return node
+
+    def connect(self, a, b):
+        self.connections.setdefault(a.name, set()).add(b.name)
+        self.connections.setdefault(b.name, set()).add(a.name)
+
+    def addCallback(self, kind, node, fn):
+        cid = self.next_callback
+        self.next_callback += 1
+        self.callbacks[cid] = (kind, node, fn)
+        return cid
+
+    def fire(self, kind, node=None, *args):
+        for cid, (k, n, fn) in list(self.callbacks.items()):
+            if k == kind and (n is None or n is node) and cid in self.callbacks:
+                fn(*args)
+
+    def dirty(self, node):
+        """Emulate node dirty propagation from a geometry/color edit"""
+        self.fire('dirty', node, node, None)
+        if node.parent is not None:
+            self.fire('dirty', node.parent, node.parent, None)
+
+    def runIdle(self):
+        """Run every pending idle scriptJob, as Maya would once idle"""
+        jobs = list(self.idle.items())
+        self.idle = dict()
+        for job, fn in jobs:
+            fn()
+
+    def parseComponent(self, item):
+        """Split 'mesh.vtx[a:b]' or a node name into (mesh node, ids or None)"""
+        match = COMPONENT_PATTERN.match(item)
+        if match:
+            node = self.get(match.group(1)).getMesh()
+            start = int(match.group(2))
+            end = int(match.group(3)) if match.group(3) else start
+            return node, np.arange(start, end + 1)
+
+        return self.get(item), None
+
+
+scene = Scene()
+
+
+# ---------------------------------------------
+# maya.api.OpenMaya
+# ---------------------------------------------
+
+class MFn:
+    kMesh = 296
+    kShadingEngine = 320
+    kTransform = 110
+
+
+class MSpace:
+    kObject = 2
+    kWorld = 4
+
+
+class MColor(tuple):
+    def __new__(cls, values=(0, 0, 0, 1)):
+        return tuple.__new__(cls, values)
+
+
+class MBoundingBox:
+    def __init__(self, points):
+        if len(points) > 0:
+            self.min = points.min(axis=0)
+            self.max = points.max(axis=0)
+        else:
+            self.min = self.max = np.zeros(3)
+
+    @property
+    def width(self):
+        return float(self.max[0] - self.min[0])
+
+    @property
+    def height(self):
+        return float(self.max[1] - self.min[1])
+
+    @property
+    def depth(self):
+        return float(self.max[2] - self.min[2])
+
+
+class NullComponent:
+    def isNull(self):
+        return True
+
+
+class VertexComponent:
+    def __init__(self, ids):
+        self.ids = ids
+
+    def isNull(self):
+        return False
+
+
+class MDagPath:
+    def __init__(self, node=None):
+        self._node = node
+
+    def node(self):
+        return self._node
+
+    def hasFn(self, fn):
+        return self._node is not None and self._node.hasFn(fn)
+
+    def transform(self):
+        node = self._node
+        return node if node.type == 'transform' else node.parent
+
+    def fullPathName(self):
+        return self._node.name
+
+
+class MSelectionList:
+    def __init__(self):
+        self.items = []
+        self.index = dict()
+
+    def add(self, item):
+        try:
+            node, ids = scene.parseComponent(item)
+        except ValueError:
+            raise RuntimeError('(kInvalidParameter): Object does not exist')
+
+        # Components of the same object merge into a single item, like Maya
+        if node.name in self.index:
+            existing = self.items[self.index[node.name]]
+            if existing[1] is not None and ids is not None:
+                existing[1].append(ids)
+            elif ids is None:
+                self.items[self.index[node.name]] = (node, None)
+            return
+
+        self.index[node.name] = len(self.items)
+        self.items.append((node, [ids] if ids is not None else None))
+
+    def length(self):
+        return len(self.items)
+
+    def getDagPath(self, i):
+        return MDagPath(self.items[i][0])
+
+    def getDependNode(self, i):
+        return self.items[i][0]
+
+    def getComponent(self, i):
+        node, ids = self.items[i]
+        if ids is None:
+            return MDagPath(node), NullComponent()
+
+        return MDagPath(node), VertexComponent(np.concatenate(ids))
+
+
+class MItSelectionList:
+    kDagSelectionItem = 1
+
+    def __init__(self, selection):
+        self.selection = selection
+        self.i = 0
+
+    def isDone(self):
+        return self.i >= self.selection.length()
+
+    def itemType(self):
+        node = self.selection.getDependNode(self.i)
+        return self.kDagSelectionItem if node.isDag() else 0
+
+    def getDagPath(self):
+        return self.selection.getDagPath(self.i)
+
+    def next(self):
+        self.i += 1
+
+
+class MGlobal:
+    @staticmethod
+    def getActiveSelectionList():
+        selection = MSelectionList()
+        for item in scene.selection:
+            selection.add(item)
+        return selection
+
+
+class MFnSingleIndexedComponent:
+    def __init__(self, component):
+        self.component = component
+
+    def getElements(self):
+        return self.component.ids.tolist()
+
+
+class MFnDagNode:
+    def __init__(self, obj=None):
+        self._node = None
+        if obj is not None:
+            self.setObject(obj)
+
+    def setObject(self, obj):
+        self._node = obj.node() if isinstance(obj, MDagPath) else obj
+
+    def fullPathName(self):
+        return self._node.name
+
+    @property
+    def boundingBox(self):
+        shape = self._node.getMesh()
+        return MBoundingBox(shape.mesh.points if shape else np.zeros((0, 3)))
+
+
+class MFnMesh(MFnDagNode):
+    def setObject(self, obj):
+        MFnDagNode.setObject(self, obj)
+        self.shape = self._node.getMesh()
+        self.data = self.shape.mesh
+
+    @property
+    def numVertices(self):
+        return self.data.count
+
+    def getVertexColors(self, colorSet=None):
+        # A copy, like the MColorArray Maya hands back
+        return self.data.getColors(colorSet).copy()
+
+    def setVertexColors(self, colors, vertexIds):
+        if self.data.current is None:
+            self.data.createColorset(DEFAULT_COLORSET)
+
+        colors = np.asarray(colors, dtype=np.float64).reshape(-1, 4)
+        self.data.colorsets[self.data.current][np.asarray(vertexIds, dtype=np.int64)] = colors
+        scene.dirty(self.shape)
+
+    def currentColorSetName(self):
+        return self.data.current or ''
+
+    def setCurrentColorSetName(self, name):
+        if name not in self.data.colorsets:
+            raise RuntimeError('(kInvalidParameter): No color set {}'.format(name))
+        self.data.current = name
+
+    def getPoints(self, space=MSpace.kObject):
+        return np.hstack((self.data.points, np.ones((self.data.count, 1))))
+
+    def getTriangles(self):
+        triangles = self.data.triangles
+        return np.ones(len(triangles), dtype=np.int64), triangles.reshape(-1)
+
+
+class MMessage:
+    @staticmethod
+    def removeCallback(cid):
+        scene.callbacks.pop(cid, None)
+
+    @staticmethod
+    def removeCallbacks(cids):
+        for cid in cids:
+            scene.callbacks.pop(cid, None)
+
+
+class MNodeMessage(MMessage):
+    @staticmethod
+    def addNodeDirtyCallback(node, fn, clientData=None):
+        return scene.addCallback('dirty', node, fn)
+
+
+class MDGMessage(MMessage):
+    @staticmethod
+    def addConnectionCallback(fn, clientData=None):
+        return scene.addCallback('connection', None, fn)
+
+
+class MSceneMessage(MMessage):
+    kBeforeNew = 1
+    kBeforeOpen = 2
+    kAfterNew = 3
+    kAfterOpen = 4
+
+    @staticmethod
+    def addCallback(message, fn, clientData=None):
+        return scene.addCallback(('scene', message), None, fn)
+
+
+# ---------------------------------------------
+# maya.api.OpenMayaAnim
+# ---------------------------------------------
+
+class MAnimMessage(MMessage):
+    @staticmethod
+    def addAnimCurveEditedCallback(fn, clientData=None):
+        return scene.addCallback('animCurveEdited', None, fn)
+
+
+# ---------------------------------------------
+# maya.cmds
+# ---------------------------------------------
+
+def _flatten(items):
+    if items is None:
+        return []
+    if isinstance(items, str):
+        return [items]
+
+    flat = []
+    for item in items:
+        flat.extend(_flatten(item))
+    return flat
+
+def _splitAttr(attr):
+    match = ATTRIBUTE_PATTERN.match(attr)
+    if not match:
+        raise ValueError('Invalid attribute: {}'.format(attr))
+
+    return scene.get(match.group(1)), match.group(2)
+
+def _orNone(items):
+    return items if items else None
+
+def _selectedMeshes():
+    meshes = []
+    for item in scene.selection:
+        shape = scene.parseComponent(item)[0].getMesh()
+        if shape is not None and shape not in meshes:
+            meshes.append(shape)
+    return meshes
+
+def _flattenComponents(items):
+    flat = []
+    for item in items:
+        node, ids = scene.parseComponent(item)
+        if ids is None:
+            flat.append(item)
+        else:
+            flat.extend('{}.vtx[{}]'.format(node.name, i) for i in ids)
+    return flat
+
+def ls(*args, **kwargs):
+    if kwargs.get('selection') or kwargs.get('sl'):
+        return list(scene.selection)
+
+    if kwargs.get('orderedSelection') or kwargs.get('os'):
+        items = list(scene.selection)
+        return _flattenComponents(items) if kwargs.get('flatten') else items
+
+    if args:
+        nodes = [scene.find(item) for item in _flatten(args[0])]
+        nodes = [node for node in nodes if node is not None]
+    else:
+        nodes = list(scene.nodes.values())
+
+    if kwargs.get('type'):
+        nodes = [node for node in nodes if node.type == kwargs['type']]
+    if kwargs.get('mat'):
+        nodes = [node for node in nodes if node.type in MATERIAL_TYPES]
+
+    return [node.name if kwargs.get('long') else node.shortName for node in nodes]
+
+def select(items=None, replace=True, clear=False, add=False, **kwargs):
+    if clear:
+        scene.selection = []
+        return
+
+    items = _flatten(items)
+    for item in items:
+        scene.parseComponent(item)
+
+    scene.selection = (scene.selection if add else []) + items
+
+def polyListComponentConversion(items=None, tv=False, toVertex=False, **kwargs):
+    items = _flatten(items) if items is not None else list(scene.selection)
+    if not (tv or toVertex):
+        return items
+
+    converted = []
+    for item in items:
+        node, ids = scene.parseComponent(item)
+        shape = node.getMesh()
+        if shape is None:
+            continue
+        if ids is None:
+            converted.append('{}.vtx[0:{}]'.format(shape.name, shape.mesh.count - 1))
+        else:
+            converted.append(item)
+
+    return converted
+
+def polyColorSet(*targets, **kwargs):
+    meshes = [scene.get(t).getMesh() for t in targets] if targets else _selectedMeshes()
+
+    if kwargs.get('query'):
+        if kwargs.get('allColorSets'):
+            return _orNone(sorted(meshes[0].mesh.colorsets.keys()))
+        if kwargs.get('currentColorSet'):
+            return [meshes[0].mesh.current]
+        return None
+
+    name = kwargs.get('colorSet')
+    for shape in meshes:
+        if kwargs.get('create'):
+            shape.mesh.createColorset(name)
+        elif kwargs.get('currentColorSet'):
+            if name not in shape.mesh.colorsets:
+                raise RuntimeError('Color set {} does not exist'.format(name))
+            shape.mesh.current = name
+
+def polyColorPerVertex(*components, **kwargs):
+    items = _flatten(components) if components else list(scene.selection)
+    channels = [(i, kwargs.get(c)) for i, c in enumerate('rgba')]
+
+    touched = dict()
+    for item in items:
+        node, ids = scene.parseComponent(item)
+        shape = node.getMesh()
+        if shape.mesh.current is None:
+            shape.mesh.createColorset(DEFAULT_COLORSET)
+
+        colors = shape.mesh.colorsets[shape.mesh.current]
+        rows = slice(None) if ids is None else ids
+        for channel, value in channels:
+            if value is not None:
+                colors[rows, channel] = value
+
+        touched[shape.name] = shape
+
+    for shape in touched.values():
+        scene.dirty(shape)
+
+def getAttr(attr, **kwargs):
+    node, name = _splitAttr(attr)
+    if name not in node.attrs:
+        raise ValueError('No object matches name: {}'.format(attr))
+
+    keys = scene.keys.get((node.name, name))
+    if keys:
+        times = sorted(keys)
+        i = max(0, np.searchsorted(times, scene.time, side='right') - 1)
+        return keys[times[i]]
+
+    return node.attrs[name]
+
+def setAttr(attr, *values, **kwargs):
+    node, name = _splitAttr(attr)
+    if name not in node.attrs:
+        raise RuntimeError('setAttr: No object matches name: {}'.format(attr))
+
+    node.attrs[name] = values[0] if len(values) == 1 else tuple(values)
+    scene.dirty(node)
+
+def addAttr(node, longName=None, ln=None, **kwargs):
+    node = scene.get(node)
+    name = longName or ln
+    if name in node.attrs:
+        raise RuntimeError('Attribute {} already exists'.format(name))
+
+    node.attrs[name] = '' if kwargs.get('dataType') == 'string' else 0
+
+def attributeQuery(name, node=None, exists=False, **kwargs):
+    node = scene.find(node)
+    return node is not None and name in node.attrs
+
+def objExists(name):
+    return scene.find(name) is not None
+
+def delete(*names, **kwargs):
+    for name in _flatten(names):
+        node = scene.get(name)
+        del scene.nodes[node.name]
+        scene.short[node.shortName].remove(node)
+
+def currentTime(*args, **kwargs):
+    if kwargs.get('query') or kwargs.get('q'):
+        return scene.time
+
+    scene.time = float(args[0])
+    return scene.time
+
+def keyframe(attr, query=False, timeChange=False, valueChange=False, **kwargs):
+    node, name = _splitAttr(attr)
+    keys = scene.keys.get((node.name, name))
+    if not keys:
+        return None
+
+    values = []
+    for time in sorted(keys):
+        if timeChange:
+            values.append(time)
+        if valueChange:
+            values.append(float(keys[time]))
+
+    return values
+
+def setKeyframe(node, attribute=None, value=None, time=None, **kwargs):
+    node = scene.get(node)
+    if value is None:
+        value = node.attrs[attribute]
+
+    time = scene.time if time is None else float(time)
+    scene.keys.setdefault((node.name, attribute), dict())[time] = value
+    scene.fire('animCurveEdited')
+
+def listRelatives(*nodes, **kwargs):
+    nodes = _flatten(nodes) or [scene.parseComponent(i)[0].name for i in scene.selection]
+
+    relatives = []
+    for name in nodes:
+        node = scene.get(name)
+        for child in node.children:
+            if kwargs.get('shapes') and child.type == 'transform':
+                continue
+            relatives.append(child.name if kwargs.get('fullPath') else child.shortName)
+
+    return _orNone(relatives)
+
+def listConnections(nodes=None, type=None, shapes=False, **kwargs):
+    connected = []
+    for name in _flatten(nodes):
+        node = scene.get(name)
+        for other in sorted(scene.connections.get(node.name, ())):
+            other = scene.nodes[other]
+            if type == 'shape' and other.mesh is None:
+                continue
+            if type not in (None, 'shape') and other.type != type:
+                continue
+            connected.append(other.name)
+
+    return _orNone(connected)
+
+def scriptJob(**kwargs):
+    if 'idleEvent' in kwargs:
+        job = scene.next_job
+        scene.next_job += 1
+        scene.idle[job] = kwargs['idleEvent']
+        return job
+    if 'exists' in kwargs:
+        return kwargs['exists'] in scene.idle
+    if 'kill' in kwargs:
+        scene.idle.pop(kwargs['kill'], None)
+
+def undoInfo(**kwargs):
+    pass
+
+def floatFieldGrp(*args, **kwargs):
+    if kwargs.get('query'):
+        return [0.0, 1.0]
+    return 'floatFieldGrp1'
+
+def file(*args, **kwargs):
+    raise RuntimeError('The stand-in has no scene files')
+
+def _uiCommand(name):
+    def command(*args, **kwargs):
+        return name + '1'
+    command.__name__ = name
+    return command
+
+
+# ---------------------------------------------
+# Setup
+# ---------------------------------------------
+
+def _module(name, members):
+    module = types.ModuleType(name)
+    for key, value in members.items():
+        setattr(module, key, value)
+    return module
+
+def install():
+    """Register the stand-in as the maya package in sys.modules"""
+    this = sys.modules[__name__]
+    names = lambda *n: dict((k, getattr(this, k)) for k in n)
+
+    cmds = _module('maya.cmds', names(
+        'ls', 'select', 'polyListComponentConversion', 'polyColorSet',
+        'polyColorPerVertex', 'getAttr', 'setAttr', 'addAttr', 'attributeQuery',
+        'objExists', 'delete', 'currentTime', 'keyframe', 'setKeyframe',
+        'listRelatives', 'listConnections', 'scriptJob', 'undoInfo',
+        'floatFieldGrp', 'file'
+    ))
+    for name in UI_COMMANDS:
+        setattr(cmds, name, _uiCommand(name))
+
+    om = _module('maya.api.OpenMaya', names(
+        'MFn', 'MSpace', 'MColor', 'MBoundingBox', 'MDagPath', 'MSelectionList',
+        'MItSelectionList', 'MGlobal', 'MFnSingleIndexedComponent', 'MFnDagNode',
+        'MFnMesh', 'MMessage', 'MNodeMessage', 'MDGMessage', 'MSceneMessage'
+    ))
+    oma = _module('maya.api.OpenMayaAnim', names('MAnimMessage'))
+    api = _module('maya.api', {'OpenMaya': om, 'OpenMayaAnim': oma})
+    maya = _module('maya', {'cmds': cmds, 'api': api})
+    maya.__path__ = []
+
+    sys.modules.update({
+        'maya': maya,
+        'maya.cmds': cmds,
+        'maya.api': api,
+        'maya.api.OpenMaya': om,
+        'maya.api.OpenMayaAnim': oma
+    })
+
+def reset():
+    """Replace the scene with a new empty one"""
+    global scene
+    scene = Scene()
+    return scene
+
+def createMesh(name, vertices, colorsets=(DEFAULT_COLORSET,), seed=0):
+    """Add a synthetic grid mesh with at least the given number of vertices
+
+        Vertices are laid out in a near-square grid on the XZ plane with
+        a little noise in Y, and every colorset is filled with random colors.
+
+        :name string Transform name. The shape is name + 'Shape'
+        :vertices int Minimum vertex count
+
+        :return string Shape DAG path
+    """
+    width = max(2, int(np.ceil(np.sqrt(vertices))))
+    height = max(2, int(np.ceil(vertices / float(width))))
+    rng = np.random.RandomState(seed)
+
+    x, z = np.meshgrid(np.arange(width), np.arange(height), indexing='ij')
+    points = np.stack((x.ravel(), rng.rand(x.size) * 0.1, z.ravel()), axis=1)
+
+    quads = (np.arange(width - 1)[:, None] * height + np.arange(height - 1)[None]).ravel()
+    triangles = np.concatenate((
+        np.stack((quads, quads + height, quads + 1), axis=1),
+        np.stack((quads + 1, quads + height, quads + height + 1), axis=1)
+    ))
+
+    transform = scene.add(name, 'transform')
+    shape = scene.add(name + 'Shape', 'mesh', transform)
+    shape.mesh = MeshData(points, triangles)
+
+    for colorset in colorsets:
+        shape.mesh.createColorset(colorset)
+        shape.mesh.colorsets[colorset][:] = rng.rand(shape.mesh.count, 4)
+
+    return shape.name
+
+def createMaterial(name, shapes, bbox_uniform='u_BoundingBox'):
+    """Assign a GLSLShader material (with a bounding box uniform) to shapes
+
+        :return Tuple (material name, shading engine name)
+    """
+    material = scene.add(name, 'GLSLShader')
+    engine = scene.add(name + 'SG', 'shadingEngine')
+
+    material.attrs[bbox_uniform] = (1.0, 1.0, 1.0)
+    for axis in 'XYZ':
+        material.attrs[bbox_uniform + axis] = 1.0
+
+    scene.connect(material, engine)
+    for shape in shapes:
+        scene.connect(scene.get(shape), engine)
+
+    return (material.name, engine.name)
@@ -8,20 +8,65 @@ issues with Maya's built in vertex color animation tools:
 - Difficulty in managing keyframes in the graph editor
 - Cannot export animations (sans transforms and visibility) to FBX for use in Unity
 
+Vertex color animation data is compressed and exported within the FBX
+through the VCAExport attribute (see encode_export()): vertices that never
+animate and frames that are never keyed are removed, keyframe timings are 
+pulled from the VCI curve, and the colors of the remaining vertices are 
+stored per-frame as 8-bit RGBA (or as indices into a shared palette of 
+8-bit RGBA colors, see VertexColorAnimator.USE_PALETTE).
+
 TODO:
 - UV indexing on export so the FBX will be able to map up vertices when loading in Unity/etc
-- Vertex color animation data compressed and exported within the FBX
-    (remove vertices from frames that never animate, pull keyframe timings, 
-    build out a JSON blob that contains the keyframed index changes and all
-    the modified vertex color data per-frame)
     
 @author Chase McManning <cmcmanning@gmail.com>
 """
 
 import sys, traceback
+import threading
 import json
+import struct
+import zlib
+import base64
+import hashlib
+from bisect import bisect_right
+from collections import OrderedDict
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+import numpy as np
 import maya.cmds as cmds
 import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+# Timing of hot entry points, see instrument.py. Optional, so this script 
+# still runs standalone, just without the Profiling panel.
+try:
+    import instrument
+    PROFILING_AVAILABLE = True
+except ImportError:
+    PROFILING_AVAILABLE = False
+
+    class instrument:
+        """No-op fallback for when instrument.py is not alongside this script"""
+        ENABLED = False
+
+        @staticmethod
+        def timed(name):
+            return lambda func: func
+
+        @staticmethod
+        def touched(count):
+            pass
+
+# Print diagnostics while keying and during playback. Off by default,
+# as even formatting a message per frame change adds up in large scenes.
+DEBUG = False
+
+def log(message, *args):
+    """Print a debug message, formatted with args, if DEBUG is enabled"""
+    if DEBUG:
+        print(message.format(*args))
 
 def selected_meshes():
     """Generator to return DAG paths of all selected meshes
@@ -61,6 +106,17 @@ def dag_node(xform):
 
     return selection.getDagPath(0)
 
+def to_colors(cache):
+    """Convert an (N, 4) color array into something MFnMesh accepts
+
+    Parameters:
+        cache (ndarray): RGBA colors
+
+    Returns:
+        list: RGBA tuples, one per row
+    """
+    return [tuple(c) for c in cache.tolist()]
+
 def safe_exceptions(func):
     """Decorator to improve exception handling in Maya"""
     def wrapper(*args, **kwargs):
@@ -77,53 +133,109 @@ class VertexColorFrame:
 
     Supports reading/writing to a mesh and converting to  
     a format for inclusion in the FBX file export
+
+    Colors are held as a single contiguous float32 (N, 4) RGBA array
+    rather than per-vertex Python objects to keep large meshes cheap.
+    Frames restored from a packed cache are only decoded the first
+    time their colors are actually needed.
     """
+
+    # Maximum per-channel difference for two colors to be considered equal.
+    # Half of an 8-bit step, so it absorbs cache quantization error 
+    # without hiding any change that would be visible on screen.
+    TOLERANCE = 0.5 / 255
+
     def __init__(self):
-        self.cache = [] 
+        self._cache = np.zeros((0, 4), dtype=np.float32)
         self.vtx_count = 0
 
+        # Compressed copy of the colors, see pack()
+        self.packed = None
+
+    @property
+    def cache(self):
+        """ndarray: (N, 4) float32 RGBA colors, decoded on first access"""
+        if self._cache is None:
+            self._cache = unpack_colors(self.packed, self.vtx_count)
+
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        self._cache = value
+        self.vtx_count = len(value)
+        self.packed = None
+
+    @property
+    def decoded(self):
+        """bool: Whether the colors are held decoded, rather than only packed"""
+        return self._cache is not None
+
     def copy_from(self, mesh):
         """Copy the colors from the input mesh into this frame
 
         Parameters:
             mesh (MObject): Target mesh
         """
-        # MColor instances are converted to Python tuples to cache,
+        # MColors are copied out into our own buffer, 
         # as Maya will eventually unload the allocated memory 
-        self.cache = [c.getColor() for c in mesh.getVertexColors()]
-        self.vtx_count = len(self.cache)
+        colors = mesh.getVertexColors()
+        self.cache = np.array(colors, dtype=np.float32).reshape(-1, 4)
 
-    def copy_to(self, mesh):
+    def copy_to(self, mesh, indices=None):
         """Copy the colors of this frame back onto the input mesh
 
         Parameters:
             mesh (MObject): Target mesh
+            indices (ndarray): Optional subset of vertex IDs to copy. 
+                If omitted, every vertex is copied.
         """
-        mesh.setVertexColors(self.cache, list(range(self.vtx_count)))
-        # TODO: For large meshes (> 20k vertices) this isn't incredibly
-        # performant. Using diff() and a subset of changed vertices might be better.
+        colors, vertex_ids = self.prepare(indices)
+        if vertex_ids:
+            mesh.setVertexColors(colors, vertex_ids)
+            instrument.touched(len(vertex_ids))
 
         # FORCE the viewport to reset to redraw. Shouldn't be necessary, but 
         # it seems Maya is refusing to update renders for colormaps. 
         # cmds.ogs(reset=True)
 
+    def prepare(self, indices=None):
+        """Build the arguments for MFnMesh.setVertexColors
+
+        Does not call into Maya, so this is safe to run off the main thread.
+
+        Parameters:
+            indices (ndarray): Optional subset of vertex IDs to copy. 
+                If omitted, every vertex is copied.
+
+        Returns:
+            tuple: (colors, vertex IDs) lists
+        """
+        if indices is None:
+            return to_colors(self.cache), list(range(self.vtx_count))
+
+        return to_colors(self.cache[indices]), indices.tolist()
+
     def diff(self, frame):
         """Diff against another frame and return indices that have changed
 
+        Vertices that only exist in one of the two frames are 
+        always considered changed.
+
         Parameters:
             frame (VertexColorFrame): State to diff against
 
         Returns:
-            list: Vertex IDs that have changed
+            ndarray: Vertex IDs that have changed
         """
-        
-        # Vertices that are out of bounds on this 
-        # if frame.vtx_count < self.vtx_count:
-        #    oob = list(range(frame.vtx_count, self.vtx_count)
-
-        indices = [x for x in range(self.vtx_count) if self.cache[x] == frame.cache[x]]
+        count = min(self.vtx_count, frame.vtx_count)
+        delta = np.abs(self.cache[:count] - frame.cache[:count])
+        indices = np.flatnonzero(np.any(delta > self.TOLERANCE, axis=1))
 
-        # TODO: Deal with different cache sizes
+        # Vertices that are out of bounds on the smaller frame
+        if self.vtx_count != frame.vtx_count:
+            oob = np.arange(count, max(self.vtx_count, frame.vtx_count))
+            indices = np.concatenate((indices, oob))
 
         return indices
 
@@ -136,15 +248,18 @@ class VertexColorFrame:
         Returns:
             bool: If any vertices have changed
         """
-        for i in range(self.vtx_count):
-            if self.cache[i] != frame.cache[i]:
-                return True
-        
-        return False
+        if self.vtx_count != frame.vtx_count:
+            return True
+
+        return not np.allclose(self.cache, frame.cache, rtol=0, atol=self.TOLERANCE)
 
     def deserialize(self, cache):
-        self.cache = cache
-        self.vtx_count = len(self.cache)
+        """Restore this frame from data created by serialize()
+
+        Parameters:
+            cache (list): Per-vertex RGBA values
+        """
+        self.cache = np.array(cache, dtype=np.float32).reshape(-1, 4)
 
     def serialize(self):
         """Return a serialized copy of this frame for caching
@@ -152,7 +267,823 @@ class VertexColorFrame:
         Returns:
             list: Data to serialize
         """
-        return self.cache
+        return self.cache.tolist()
+
+    def pack(self):
+        """Return a compressed, quantized copy of this frame for caching
+
+        The result is kept, so packing an unchanged frame again is free.
+
+        Returns:
+            bytes: Data to serialize
+        """
+        if self.packed is None:
+            self.packed = pack_colors(self.cache)
+
+        return self.packed
+
+    def digest(self):
+        """Content hash of this frame's colors
+
+        Colors are hashed rounded to 8-bit steps on a fixed scale, rather 
+        than as pack() output (quantized against each frame's own range), 
+        so the same state re-read from the mesh or restored from the 
+        cache hashes the same. Values outside of [0, 1] are kept.
+
+        Returns:
+            bytes: Hash digest
+        """
+        canonical = np.rint(self.decode() * 255.0).astype('<i4')
+        return hashlib.sha1(canonical.tobytes()).digest()
+
+    def unpack(self, packed, vtx_count):
+        """Restore this frame from data created by pack()
+
+        Decoding is deferred until the colors are first accessed.
+
+        Parameters:
+            packed (bytes): Compressed frame data
+            vtx_count (int): Number of vertices stored in packed
+        """
+        self._cache = None
+        self.vtx_count = vtx_count
+        self.packed = packed
+
+    def decode(self):
+        """Return this frame's colors without keeping a decoded copy around
+
+        Used when streaming through many frames, so that frames that 
+        are still packed stay packed.
+
+        Returns:
+            ndarray: (N, 4) float32 RGBA colors
+        """
+        if self._cache is not None:
+            return self._cache
+
+        return unpack_colors(self.packed, self.vtx_count)
+
+
+# Binary VCACache format identifiers, see encode_cache()
+CACHE_PREFIX = 'VCA:'
+CACHE_MAGIC = b'VCAC'
+CACHE_VERSION = 1
+CACHE_HEADER = '<4sHI'
+CACHE_ENTRY = '<III'
+
+
+def pack_colors(cache):
+    """Quantize an (N, 4) color array to 16 bits per channel and compress
+
+    Each channel is quantized across its own [min, max] range so 
+    that unset (-1) and HDR colors survive the round trip.
+
+    Parameters:
+        cache (ndarray): RGBA colors
+
+    Returns:
+        bytes: zlib compressed channel ranges followed by quantized colors
+    """
+    if len(cache) > 0:
+        lo = cache.min(axis=0)
+        hi = cache.max(axis=0)
+    else:
+        lo = hi = np.zeros(4, dtype=np.float32)
+
+    scale = np.where(hi > lo, hi - lo, 1.0)
+    quantized = np.rint((cache - lo) / scale * 65535.0).astype('<u2')
+
+    ranges = np.concatenate((lo, hi)).astype('<f4')
+    return zlib.compress(ranges.tobytes() + quantized.tobytes())
+
+def unpack_colors(packed, vtx_count):
+    """Decode data created by pack_colors()
+
+    Parameters:
+        packed (bytes): Compressed frame data
+        vtx_count (int): Number of vertices stored in packed
+
+    Returns:
+        ndarray: (N, 4) float32 RGBA colors
+    """
+    raw = zlib.decompress(packed)
+    ranges = np.frombuffer(raw, dtype='<f4', count=8)
+    lo = ranges[:4]
+    hi = ranges[4:]
+
+    quantized = np.frombuffer(raw, dtype='<u2', offset=32, count=vtx_count * 4)
+    quantized = quantized.reshape(-1, 4).astype(np.float32)
+
+    return (lo + quantized / 65535.0 * (hi - lo)).astype(np.float32)
+
+def encode_cache(frames):
+    """Encode frames into the binary VCACache format
+
+    Layout (little endian) before base64 encoding:
+        header:     magic (4s), version (H), frame count (I)
+        directory:  per frame offset (I), length (I), vertex count (I)
+        data:       per frame pack() blobs, offsets relative to data start
+
+    Parameters:
+        frames (iterable): VertexColorFrame instances
+
+    Returns:
+        str: Attribute-safe encoded cache
+    """
+    blobs = []
+    directory = []
+    offset = 0
+    for frame in frames:
+        blob = frame.pack()
+        directory.append(struct.pack(CACHE_ENTRY, offset, len(blob), frame.vtx_count))
+        blobs.append(blob)
+        offset += len(blob)
+
+    header = struct.pack(CACHE_HEADER, CACHE_MAGIC, CACHE_VERSION, len(blobs))
+
+    payload = header + b''.join(directory) + b''.join(blobs)
+    return CACHE_PREFIX + base64.b64encode(payload).decode('ascii')
+
+def decode_cache(encoded):
+    """Decode a VCACache attribute value into frames
+
+    Both the binary format and legacy JSON caches are supported.
+    Binary frames are left packed until first use.
+
+    Parameters:
+        encoded (str): Attribute value
+
+    Returns:
+        list: VertexColorFrame instances
+    """
+    frames = []
+
+    # Legacy caches are a JSON list of per-vertex color lists
+    if not encoded.startswith(CACHE_PREFIX):
+        for cache in json.loads(encoded):
+            frame = VertexColorFrame()
+            frame.deserialize(cache)
+            frames.append(frame)
+
+        return frames
+
+    payload = base64.b64decode(encoded[len(CACHE_PREFIX):])
+    magic, version, count = struct.unpack_from(CACHE_HEADER, payload)
+    if magic != CACHE_MAGIC or version > CACHE_VERSION:
+        raise ValueError('Unsupported VCACache version {}'.format(version))
+
+    entry_size = struct.calcsize(CACHE_ENTRY)
+    data_start = struct.calcsize(CACHE_HEADER) + entry_size * count
+
+    for i in range(count):
+        offset, length, vtx_count = struct.unpack_from(
+            CACHE_ENTRY, 
+            payload, 
+            struct.calcsize(CACHE_HEADER) + entry_size * i
+        )
+
+        start = data_start + offset
+        frame = VertexColorFrame()
+        frame.unpack(payload[start:start + length], vtx_count)
+        frames.append(frame)
+
+    return frames
+
+# Binary VCAExport format identifiers, see encode_export()
+EXPORT_PREFIX = 'VCAX:'
+EXPORT_MAGIC = b'VCAX'
+EXPORT_VERSION = 1
+EXPORT_HEADER = '<4sHIIII'
+EXPORT_KEY = '<fI'
+
+# Palette variant of VCAExport, see encode_export()
+EXPORT_PALETTE_VERSION = 2
+EXPORT_PALETTE_HEADER = '<4sHIIIII'
+
+# Maximum palette size before falling back to full colors (uint16 indices)
+MAX_PALETTE_COLORS = 65536
+
+def find_animated_vertices(frames):
+    """Find every vertex whose color changes in any of the frames
+
+    Frames are visited one at a time, so only a single 
+    decoded frame (plus the first) is alive at once.
+
+    Parameters:
+        frames (iterable): VertexColorFrame instances
+
+    Returns:
+        ndarray: Sorted vertex IDs that animate
+    """
+    base = None
+    animated = None
+
+    for frame in frames:
+        colors = frame.decode()
+
+        if base is None:
+            base = colors
+            animated = np.zeros(len(base), dtype=bool)
+        elif len(colors) != len(base):
+            raise ValueError('Vertex count changed between frames, cannot export')
+        else:
+            animated |= np.any(colors != base, axis=1)
+
+    if animated is None:
+        return np.zeros(0, dtype=np.uint32)
+
+    return np.flatnonzero(animated).astype(np.uint32)
+
+def quantize_export_colors(colors):
+    """Quantize colors to 8-bit RGBA, as stored in VCAExport
+
+    Parameters:
+        colors (ndarray): (N, 4) RGBA colors
+
+    Returns:
+        ndarray: (N, 4) uint8 RGBA
+    """
+    return np.rint(np.clip(colors, 0.0, 1.0) * 255.0).astype(np.uint8)
+
+def find_export_palette(frames, indices):
+    """Collect every distinct 8-bit color of the animated vertices
+
+    Parameters:
+        frames (list): VertexColorFrame instances to export
+        indices (ndarray): Animated vertex IDs
+
+    Returns:
+        ndarray: Sorted RGBA colors packed into uint32, or None if
+            there are more than MAX_PALETTE_COLORS of them
+    """
+    palette = np.zeros(0, dtype='<u4')
+
+    for frame in frames:
+        quantized = quantize_export_colors(frame.decode()[indices])
+        codes = np.ascontiguousarray(quantized).view('<u4').reshape(-1)
+        palette = np.union1d(palette, codes)
+
+        if len(palette) > MAX_PALETTE_COLORS:
+            return None
+
+    return palette
+
+def encode_export(frames, keys, vtx_count, palette=False):
+    """Encode animation data into the binary VCAExport format
+
+    Layout (little endian) before base64 encoding:
+        header:     magic (4s), version (H), vertex count (I), 
+                    animated vertex count (I), frame count (I), key count (I)
+        body (zlib compressed):
+            keys:       per key time (f) and frame index (I)
+            indices:    animated vertex IDs (I)
+            colors:     per frame, RGBA (B) for each animated vertex
+
+    With palette, and if the animated colors fit in MAX_PALETTE_COLORS, 
+    version 2 is written instead. The header gains a palette size (I) 
+    after the key count, and colors are replaced by:
+            palette:    RGBA (B) per palette color
+            colors:     per frame, palette index for each animated vertex,
+                        (B) for palettes of up to 256 colors, (H) otherwise
+
+    Frames are compressed one at a time as they are streamed in,
+    so memory use does not grow with the length of the animation.
+
+    Parameters:
+        frames (list): VertexColorFrame instances to export, in frame index order.
+            Iterated once per pass, so a FrameSelection works as well.
+        keys (list): (time, frame index) tuples for each VCI keyframe
+        vtx_count (int): Vertex count of the mesh
+        palette (bool): Try to store colors as palette indices
+
+    Returns:
+        str: Attribute-safe encoded export data
+    """
+    indices = find_animated_vertices(frames)
+    codes = find_export_palette(frames, indices) if palette else None
+
+    if codes is None:
+        header = struct.pack(
+            EXPORT_HEADER, 
+            EXPORT_MAGIC, 
+            EXPORT_VERSION, 
+            vtx_count, 
+            len(indices), 
+            len(frames), 
+            len(keys)
+        )
+    else:
+        header = struct.pack(
+            EXPORT_PALETTE_HEADER, 
+            EXPORT_MAGIC, 
+            EXPORT_PALETTE_VERSION, 
+            vtx_count, 
+            len(indices), 
+            len(frames), 
+            len(keys),
+            len(codes)
+        )
+
+    compressor = zlib.compressobj()
+    chunks = [header]
+
+    for time, index in keys:
+        chunks.append(compressor.compress(struct.pack(EXPORT_KEY, time, index)))
+
+    chunks.append(compressor.compress(indices.astype('<u4').tobytes()))
+
+    if codes is not None:
+        chunks.append(compressor.compress(codes.astype('<u4').tobytes()))
+        index_type = '<u1' if len(codes) <= 256 else '<u2'
+
+    for frame in frames:
+        quantized = quantize_export_colors(frame.decode()[indices])
+
+        if codes is not None:
+            # Every code is in the palette, so this is an exact lookup
+            frame_codes = np.ascontiguousarray(quantized).view('<u4').reshape(-1)
+            quantized = np.searchsorted(codes, frame_codes).astype(index_type)
+
+        chunks.append(compressor.compress(quantized.tobytes()))
+
+    chunks.append(compressor.flush())
+
+    return EXPORT_PREFIX + base64.b64encode(b''.join(chunks)).decode('ascii')
+
+def decode_export(encoded):
+    """Decode a VCAExport attribute value created by encode_export()
+
+    Reference reader for importers, and for checking exports.
+    Palette (version 2) exports are expanded back to RGBA colors.
+
+    Parameters:
+        encoded (str): Attribute value
+
+    Returns:
+        tuple: (vertex count, list of (time, frame index) keys, 
+            animated vertex IDs, list of (M, 4) uint8 RGBA colors 
+            of the animated vertices per frame)
+    """
+    if not encoded.startswith(EXPORT_PREFIX):
+        raise ValueError('Not a VCAExport value')
+
+    payload = base64.b64decode(encoded[len(EXPORT_PREFIX):])
+    magic, version = struct.unpack_from('<4sH', payload)
+
+    if magic != EXPORT_MAGIC or version not in (EXPORT_VERSION, EXPORT_PALETTE_VERSION):
+        raise ValueError('Unsupported VCAExport version {}'.format(version))
+
+    header = EXPORT_HEADER if version == EXPORT_VERSION else EXPORT_PALETTE_HEADER
+    fields = struct.unpack_from(header, payload)
+    vtx_count, animated, frame_count, key_count = fields[2:6]
+    palette_count = fields[6] if version == EXPORT_PALETTE_VERSION else 0
+
+    body = zlib.decompress(payload[struct.calcsize(header):])
+
+    key_size = struct.calcsize(EXPORT_KEY)
+    keys = [
+        struct.unpack_from(EXPORT_KEY, body, key_size * i) 
+        for i in range(key_count)
+    ]
+    offset = key_size * key_count
+
+    indices = np.frombuffer(body, dtype='<u4', count=animated, offset=offset)
+    offset += indices.nbytes
+
+    palette = None
+    if version == EXPORT_PALETTE_VERSION:
+        codes = np.frombuffer(body, dtype='<u4', count=palette_count, offset=offset)
+        offset += codes.nbytes
+
+        palette = codes.view(np.uint8).reshape(-1, 4)
+        index_type = '<u1' if palette_count <= 256 else '<u2'
+
+    frames = []
+    for i in range(frame_count):
+        if palette is None:
+            colors = np.frombuffer(body, dtype=np.uint8, count=animated * 4, offset=offset)
+            frames.append(colors.reshape(-1, 4))
+        else:
+            colors = np.frombuffer(body, dtype=index_type, count=animated, offset=offset)
+            frames.append(palette[colors])
+
+        offset += colors.nbytes
+
+    return vtx_count, keys, indices, frames
+
+
+class FrameSelection:
+    """Lazy view over some of the VCIs of a frame store
+
+    Frames are only fetched from the store while iterating, so 
+    streaming through it (as encode_export() does) never holds 
+    every decoded frame of a DeltaChainFrameStore or 
+    PaletteFrameStore at once.
+    """
+    def __init__(self, frames, vcis):
+        """
+        Parameters:
+            frames (list): Frame store to read from
+            vcis (list): VCIs to visit, in order
+        """
+        self.frames = frames
+        self.vcis = vcis
+
+    def __len__(self):
+        return len(self.vcis)
+
+    def __iter__(self):
+        for vci in self.vcis:
+            yield self.frames[vci]
+
+
+class ColorDelta:
+    """Sparse change set between a frame and the one before it in a DeltaChainFrameStore"""
+    def __init__(self, indices, colors, packed, vtx_count):
+        """
+        Parameters:
+            indices (ndarray): Vertex IDs that changed
+            colors (ndarray): (K, 4) new colors for each of indices
+            packed (bytes): The full frame's pack() data
+            vtx_count (int): Number of vertices in the full frame
+        """
+        self.indices = indices
+        self.colors = colors
+        self.packed = packed
+        self.vtx_count = vtx_count
+
+
+class DeltaChainFrameStore:
+    """Frame storage that keeps full colors only for periodic keyframes
+
+    Every other frame is stored as a ColorDelta against the frame before 
+    it. Keyframes are inserted every KEYFRAME_INTERVAL frames, or whenever 
+    a delta would be too large, so reconstructing any VCI walks a bounded 
+    chain. Recently reconstructed frames are kept in an LRU cache.
+
+    Frames restored from the cache are kept as packed keyframes, so 
+    loading decodes nothing and evicted frames go back to being packed. 
+    The chain continues with deltas from the next frame that is added. 
+    Every entry keeps its pack() data, see packed_frames().
+
+    Behaves like the plain list of VertexColorFrames it replaces. Frames 
+    returned from it are shared and must not be modified.
+    """
+
+    # Maximum number of deltas chained after a keyframe
+    KEYFRAME_INTERVAL = 8
+
+    # Fraction of the mesh's vertices that may change before 
+    # a full keyframe is stored instead of a delta
+    DELTA_THRESHOLD = 0.25
+
+    # Number of reconstructed frames kept in memory
+    LRU_SIZE = 4
+
+    def __init__(self):
+        # Either a VertexColorFrame (keyframe) or a ColorDelta per VCI
+        self.entries = []
+
+        # Number of deltas between each entry and its keyframe
+        self.depths = []
+
+        self.lru = OrderedDict()
+
+        # Frames may be reconstructed from the prefetch thread
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        for vci in range(len(self.entries)):
+            yield self[vci]
+
+    def __getitem__(self, vci):
+        """Reconstruct the frame for a VCI
+
+        Parameters:
+            vci (int): Index to reconstruct
+
+        Returns:
+            VertexColorFrame: Colors at that index
+        """
+        if vci < 0:
+            vci += len(self.entries)
+
+        if vci < 0 or vci >= len(self.entries):
+            raise IndexError('VCI {} out of range'.format(vci))
+
+        with self.lock:
+            return self.reconstruct(vci)
+
+    def reconstruct(self, vci):
+        """Rebuild a frame from its closest cached frame or keyframe"""
+        if vci in self.lru:
+            frame = self.lru[vci]
+            self.remember(vci, frame)
+            return frame
+
+        entry = self.entries[vci]
+        if isinstance(entry, VertexColorFrame):
+            if entry.decoded:
+                return entry
+
+            # Decode a copy, so the keyframe itself stays packed
+            frame = VertexColorFrame()
+            frame.cache = entry.decode()
+            frame.packed = entry.packed
+            self.remember(vci, frame)
+            return frame
+
+        # Walk back to the closest cached frame or keyframe, then replay forward
+        chain = []
+        base = vci
+        while base not in self.lru and isinstance(self.entries[base], ColorDelta):
+            chain.append(self.entries[base])
+            base -= 1
+
+        base_frame = self.lru[base] if base in self.lru else self.entries[base]
+        cache = base_frame.decode().copy()
+        for delta in reversed(chain):
+            cache[delta.indices] = delta.colors
+
+        frame = VertexColorFrame()
+        frame.cache = cache
+        frame.packed = self.entries[vci].packed
+        self.remember(vci, frame)
+        return frame
+
+    def append(self, frame):
+        """Add a new frame to the end of the store
+
+        Parameters:
+            frame (VertexColorFrame): Frame to add
+        """
+        with self.lock:
+            self.push(frame)
+
+    def push(self, frame):
+        """Store a frame as either a keyframe or a delta against the last frame"""
+        vci = len(self.entries)
+
+        # Frames restored from the cache are left packed until displayed
+        if not frame.decoded:
+            self.entries.append(frame)
+            self.depths.append(0)
+            return
+
+        packed = frame.pack()
+
+        if vci > 0 and self.depths[-1] < self.KEYFRAME_INTERVAL:
+            prev = self.reconstruct(vci - 1)
+
+            if prev.vtx_count == frame.vtx_count:
+                # Exact comparison, so reconstruction is lossless
+                changed = np.any(prev.cache != frame.cache, axis=1)
+                indices = np.flatnonzero(changed).astype(np.uint32)
+
+                if len(indices) <= self.DELTA_THRESHOLD * frame.vtx_count:
+                    delta = ColorDelta(indices, frame.cache[indices], packed, frame.vtx_count)
+                    self.entries.append(delta)
+                    self.depths.append(self.depths[-1] + 1)
+                    self.remember(vci, frame)
+                    return
+
+        self.entries.append(frame)
+        self.depths.append(0)
+
+    def extend(self, frames):
+        """Append each of the input frames
+
+        Parameters:
+            frames (iterable): VertexColorFrame instances
+        """
+        for frame in frames:
+            self.append(frame)
+
+    def packed_frames(self):
+        """Iterate every frame in its packed form, for encode_cache()
+
+        Uses the pack() data kept for each entry, 
+        so evicted frames are not rebuilt.
+
+        Returns:
+            VertexColorFrame: Packed frame for each VCI
+        """
+        with self.lock:
+            entries = list(self.entries)
+
+        for entry in entries:
+            if isinstance(entry, VertexColorFrame):
+                yield entry
+            else:
+                frame = VertexColorFrame()
+                frame.unpack(entry.packed, entry.vtx_count)
+                yield frame
+
+    def remember(self, vci, frame):
+        """Add a reconstructed frame to the LRU cache, evicting the oldest"""
+        # Reinserted to move it to the end, OrderedDict.move_to_end is Python 3 only
+        self.lru.pop(vci, None)
+        self.lru[vci] = frame
+
+        while len(self.lru) > self.LRU_SIZE:
+            self.lru.popitem(last=False)
+
+
+class PaletteEntry:
+    """Frame stored as indices into the shared palette of a PaletteFrameStore"""
+    def __init__(self, indices, packed):
+        """
+        Parameters:
+            indices (ndarray): uint8 or uint16 palette index per vertex
+            packed (bytes): The frame's pack() data, if it was packed
+        """
+        self.indices = indices
+        self.packed = packed
+
+
+class PaletteFrameStore:
+    """Frame storage that keeps one color palette shared by every frame
+
+    Meshes painted with a handful of flat tones only have a few distinct 
+    colors across all of their frames. Each frame is then stored as a 
+    uint8 (up to 256 colors) or uint16 palette index per vertex instead 
+    of four floats, 8 to 16 times smaller. Colors are matched exactly, 
+    so reconstructed frames are identical to the originals.
+
+    If the palette would grow past MAX_PALETTE_COLORS, every frame is 
+    converted back to full colors and the store acts as a plain list.
+
+    Like DeltaChainFrameStore, frames returned from it are shared 
+    and must not be modified.
+    """
+
+    # Number of reconstructed frames kept in memory
+    LRU_SIZE = 4
+
+    def __init__(self):
+        # Either a VertexColorFrame (after falling back) or a PaletteEntry per VCI
+        self.entries = []
+
+        # (P, 4) float32 colors, or None once fallen back to full colors
+        self.palette = np.zeros((0, 4), dtype=np.float32)
+
+        # Palette index of each color, keyed by its raw bytes
+        self.lookup = dict()
+
+        self.lru = OrderedDict()
+
+        # Frames may be reconstructed from the prefetch thread
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        for vci in range(len(self.entries)):
+            yield self[vci]
+
+    def __getitem__(self, vci):
+        """Reconstruct the frame for a VCI
+
+        Parameters:
+            vci (int): Index to reconstruct
+
+        Returns:
+            VertexColorFrame: Colors at that index
+        """
+        if vci < 0:
+            vci += len(self.entries)
+
+        if vci < 0 or vci >= len(self.entries):
+            raise IndexError('VCI {} out of range'.format(vci))
+
+        with self.lock:
+            return self.reconstruct(vci)
+
+    def reconstruct(self, vci):
+        """Expand a frame's palette indices back into colors"""
+        if vci in self.lru:
+            frame = self.lru[vci]
+            self.remember(vci, frame)
+            return frame
+
+        entry = self.entries[vci]
+        if isinstance(entry, VertexColorFrame):
+            return entry
+
+        frame = VertexColorFrame()
+        frame.cache = self.palette[entry.indices]
+
+        # Keep pack() free for frames that were already packed
+        frame.packed = entry.packed
+
+        self.remember(vci, frame)
+        return frame
+
+    def append(self, frame):
+        """Add a new frame to the end of the store
+
+        Parameters:
+            frame (VertexColorFrame): Frame to add
+        """
+        with self.lock:
+            self.push(frame)
+
+    def push(self, frame):
+        """Store a frame as palette indices, falling back to full colors on overflow"""
+        if self.palette is not None:
+            indices = self.index_colors(frame.cache)
+            if indices is not None:
+                self.entries.append(PaletteEntry(indices, frame.packed))
+                return
+
+            self.expand()
+
+        self.entries.append(frame)
+
+    def index_colors(self, cache):
+        """Map colors onto the palette, adding any new colors to it
+
+        Parameters:
+            cache (ndarray): (N, 4) float32 RGBA colors
+
+        Returns:
+            ndarray: Palette index per vertex, or None if the
+                palette would grow past MAX_PALETTE_COLORS
+        """
+        cache = np.ascontiguousarray(cache, dtype=np.float32)
+        rows = cache.view(np.dtype((np.void, 16))).reshape(-1)
+        unique, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+        keys = [row.tobytes() for row in unique]
+        added = [i for i, key in enumerate(keys) if key not in self.lookup]
+        if len(self.palette) + len(added) > MAX_PALETTE_COLORS:
+            return None
+
+        for offset, i in enumerate(added):
+            self.lookup[keys[i]] = len(self.palette) + offset
+
+        if added:
+            self.palette = np.concatenate((self.palette, cache[first[added]]))
+
+        ids = np.array([self.lookup[key] for key in keys], dtype=np.int64)
+        dtype = np.uint8 if len(self.palette) <= 256 else np.uint16
+
+        return ids[inverse.reshape(-1)].astype(dtype)
+
+    def expand(self):
+        """Convert every frame back to full colors and stop using the palette"""
+        log('Palette overflow, storing full colors')
+
+        frames = [self.reconstruct(vci) for vci in range(len(self.entries))]
+        self.entries = frames
+        self.palette = None
+        self.lookup = dict()
+        self.lru = OrderedDict()
+
+    def extend(self, frames):
+        """Append each of the input frames
+
+        Parameters:
+            frames (iterable): VertexColorFrame instances
+        """
+        for frame in frames:
+            self.append(frame)
+
+    def packed_frames(self):
+        """Iterate every frame in its packed form, for encode_cache()
+
+        Frames that were never packed are packed once and the data 
+        kept, so later saves do not rebuild evicted frames.
+
+        Returns:
+            VertexColorFrame: Packed frame for each VCI
+        """
+        for vci in range(len(self.entries)):
+            with self.lock:
+                entry = self.entries[vci]
+
+                if isinstance(entry, PaletteEntry) and entry.packed is None:
+                    entry.packed = self.reconstruct(vci).pack()
+
+            if isinstance(entry, PaletteEntry):
+                frame = VertexColorFrame()
+                frame.unpack(entry.packed, len(entry.indices))
+                yield frame
+            else:
+                yield entry
+
+    def remember(self, vci, frame):
+        """Add a reconstructed frame to the LRU cache, evicting the oldest"""
+        # Reinserted to move it to the end, OrderedDict.move_to_end is Python 3 only
+        self.lru.pop(vci, None)
+        self.lru[vci] = frame
+
+        while len(self.lru) > self.LRU_SIZE:
+            self.lru.popitem(last=False)
 
 
 class VertexColorAnimator:
@@ -175,6 +1106,19 @@ class VertexColorAnimator:
     # Export data that will be copied to the FBX
     ATTR_EXPORT = 'VCAExport'
 
+    # Fraction of the mesh's vertices that may change between two
+    # frames before playback falls back to a full color upload
+    DELTA_THRESHOLD = 0.25
+
+    # Store frames as periodic keyframes plus sparse deltas (DeltaChainFrameStore)
+    # rather than a full copy of every frame. Trades some decoding time for memory.
+    USE_DELTA_CHAIN = False
+
+    # Store frames as indices into a color palette shared by all frames 
+    # (PaletteFrameStore), and export palette indices. Meant for flat-shaded 
+    # meshes, falls back to full colors when there are too many colors.
+    USE_PALETTE = False
+
     def __init__(self, dag_path):
         """
         Parameters:
@@ -183,12 +1127,50 @@ class VertexColorAnimator:
         # Only store the string version of the path, as Maya
         # may deallocate memory between uses
         self.dag_path = om.MFnDagNode(dag_path.transform()).fullPathName()
-        self.frames = []
+        self.frames = self.new_frame_store()
         self.prev_frame = -1
         self.prev_idx = -1
 
+        # Mapping between VertexColorFrame.digest() and its VCI,
+        # built on first use so loading does not decode every frame
+        self.digests = None
+
+        # Sorted key times and the VCI keyed at each, see build_index()
+        self.key_times = []
+        self.key_values = []
+        self.index_dirty = True
+
+        # Changed vertex IDs between pairs of VCIs, keyed by (low, high) VCI.
+        # A None entry means the pair is too different for a partial upload.
+        self.deltas = dict()
+
+        # setVertexColors arguments built ahead of time by the 
+        # FramePrefetcher, keyed by (source VCI, target VCI).
+        # Both are guarded by prefetch_lock.
+        self.prepared = dict()
+        self.prefetched = set()
+        self.prefetch_lock = threading.Lock()
+
+        # Bumped by reset_prefetch(), so jobs started before 
+        # frames changed know to drop their result
+        self.generation = 0
+
         self.setup()
 
+    def new_frame_store(self):
+        """Create an empty container for this animator's frames
+
+        Returns:
+            list: Either a list, a DeltaChainFrameStore or a PaletteFrameStore
+        """
+        if self.USE_DELTA_CHAIN:
+            return DeltaChainFrameStore()
+
+        if self.USE_PALETTE:
+            return PaletteFrameStore()
+
+        return []
+
     def get_mesh(self):
         return om.MFnMesh(dag_node(self.dag_path))
 
@@ -207,7 +1189,7 @@ class VertexColorAnimator:
         try:
             value = cmds.getAttr('{}.{}'.format(self.dag_path, name))
         except ValueError:
-            print(name, data_type)
+            log('Creating attribute {} ({})', name, data_type)
 
             # TODO: Cleanup this weird workaround. Maya is complaining that it 
             # doesn't recognize the type when setting.
@@ -237,25 +1219,54 @@ class VertexColorAnimator:
         export = self.get_attr(self.ATTR_EXPORT, 'string', '', False)
 
         self.load_cache()
+        self.precompute_deltas()
 
+    @instrument.timed('cache.load')
     def load_cache(self):
-        """Load cache data into the animator, replacing what is already setup"""
+        """Load cache data into the animator, replacing what is already setup
+
+        Frames are decoded lazily the first time they are displayed.
+        Legacy JSON caches are converted on the next update_cache().
+        """
         encoded = self.get_attr(self.ATTR_CACHE, 'string', '[]', False)
-        cache = json.loads(encoded)
 
-        self.frames = []
-        for frame in cache:
-            new_frame = VertexColorFrame()
-            new_frame.deserialize(frame)
-            self.frames.append(new_frame)
+        frames = decode_cache(encoded)
+        self.reset_prefetch()
+        self.deltas = dict()
+
+        self.digests = None
+        if instrument.ENABLED:
+            instrument.touched(sum(frame.vtx_count for frame in frames))
+
+        self.frames = self.new_frame_store()
+        self.frames.extend(frames)
+
+    def reset_prefetch(self):
+        """Drop prepared uploads and invalidate prefetch jobs still in flight
 
+        Must be called whenever frames or the displayed colors change 
+        outside of playback, so a job finishing afterwards can't store 
+        an upload built from the old state.
+        """
+        with self.prefetch_lock:
+            self.generation += 1
+            self.prepared = dict()
+            self.prefetched = set()
+
+    @instrument.timed('cache.save')
     def update_cache(self):
         """Persist our current state into the cache attribute"""
-        cache = []
-        for frame in self.frames:
-            cache.append(frame.serialize())
-        
-        encoded = json.dumps(cache)
+        if isinstance(self.frames, list):
+            frames = self.frames
+        else:
+            # Stores keep each frame's pack() data, so nothing is rebuilt to save
+            frames = list(self.frames.packed_frames())
+
+        encoded = encode_cache(frames)
+
+        if instrument.ENABLED:
+            instrument.touched(sum(frame.vtx_count for frame in frames))
+
         self.set_attr(self.ATTR_CACHE, 'string', encoded, False)
 
     def on_frame_change(self, frame):
@@ -264,70 +1275,323 @@ class VertexColorAnimator:
         Parameters:
             frame (int): new frame number
         """
+        idx = self.pending_vci(frame)
+        if idx is not None:
+            self.transition(idx)
+
+    def pending_vci(self, frame):
+        """Determine if the mesh needs to change VCI for a new frame
+
+        Does not touch the mesh, so it's cheap to call for every animator.
+
+        Parameters:
+            frame (int): new frame number
+
+        Returns:
+            int: VCI to transition to, or None if already displayed
+        """
         if frame == self.prev_frame:
-            return
+            return None
         
         self.prev_frame = frame
 
-        idx = self.get_attr(self.ATTR_VCI, 'short', 0, True)
-        if idx == self.prev_idx:
-            return 
+        idx = self.vci_at(frame)
+        if idx < 0 or idx == self.prev_idx:
+            return None
+
+        return idx
+
+    @instrument.timed('playback.transition')
+    def transition(self, idx):
+        """Write the colors of a VCI onto the mesh
 
-        print('Transition {} to VCI {}'.format(self.dag_path, idx))
+        Parameters:
+            idx (int): VCI to display
+        """
+        log('Transition {} to VCI {}', self.dag_path, idx)
+        key = (self.prev_idx, idx)
         self.prev_idx = idx
-        self.frames[idx].copy_to(self.get_mesh())
+
+        # Use the upload built by the prefetcher if it got to it in time.
+        # Otherwise the job is cancelled, see prepare().
+        with self.prefetch_lock:
+            self.prefetched.discard(key)
+            upload = self.prepared.pop(key, None)
+        if upload is None:
+            indices = self.get_delta(key[0], idx)
+            self.frames[idx].copy_to(self.get_mesh(), indices)
+        elif upload[1]:
+            self.get_mesh().setVertexColors(*upload)
+            instrument.touched(len(upload[1]))
+
+    def upcoming_transitions(self, frame, count):
+        """List the next VCI changes after a frame, in playback order
+
+        Transitions already handed to the prefetcher are skipped.
+        Must be called with prefetch_lock held.
+
+        Parameters:
+            frame (int): Current frame number
+            count (int): Maximum number of transitions to look ahead
+
+        Returns:
+            list: (source VCI, target VCI) tuples
+        """
+        if self.index_dirty or self.prev_idx < 0:
+            return []
+
+        transitions = []
+        src = self.prev_idx
+        start = bisect_right(self.key_times, frame)
+
+        for dst in self.key_values[start:]:
+            if len(transitions) >= count:
+                break
+
+            if dst != src:
+                if (src, dst) not in self.prefetched:
+                    transitions.append((src, dst))
+                src = dst
+
+        return transitions
+
+    @instrument.timed('playback.prepare')
+    def prepare(self, generation, src, dst):
+        """Decode a VCI and build its upload from another VCI ahead of time
+
+        Does not call into Maya, so this is safe to run off the main thread.
+        The upload is dropped if the transition was played, or the state 
+        was reset (see reset_prefetch()), while it was being built.
+
+        Parameters:
+            generation (int): Value of self.generation when the job was queued
+            src (int): VCI that will be displayed before the transition
+            dst (int): VCI to transition to
+        """
+        key = (src, dst)
+        with self.prefetch_lock:
+            if generation != self.generation or key not in self.prefetched:
+                return
+
+            # Work on the state the job was queued for, even if 
+            # load_cache() replaces it in the meantime
+            frames = self.frames
+            deltas = self.deltas
+
+        indices = self.find_delta(frames, deltas, src, dst)
+        upload = frames[dst].prepare(indices)
+
+        with self.prefetch_lock:
+            if generation == self.generation and key in self.prefetched:
+                self.prepared[key] = upload
+
+    def cancel_prefetch(self, src, dst):
+        """Forget a prefetch job that could not be completed"""
+        with self.prefetch_lock:
+            self.prefetched.discard((src, dst))
+
+    def get_delta(self, src, dst):
+        """Get the vertex IDs that need to be uploaded to go from one VCI to another
+
+        Parameters:
+            src (int): VCI currently displayed on the mesh, or -1 if unknown
+            dst (int): VCI to display
+
+        Returns:
+            ndarray: Changed vertex IDs, or None if a full upload is required
+        """
+        return self.find_delta(self.frames, self.deltas, src, dst)
+
+    def find_delta(self, frames, deltas, src, dst):
+        """get_delta() against a given frame store and delta cache
+
+        Parameters:
+            frames (list): Frame store
+            deltas (dict): Delta cache belonging to frames
+            src (int): VCI currently displayed on the mesh, or -1 if unknown
+            dst (int): VCI to display
+
+        Returns:
+            ndarray: Changed vertex IDs, or None if a full upload is required
+        """
+        if src < 0 or src >= len(frames):
+            return None
+
+        key = (min(src, dst), max(src, dst))
+        if key not in deltas:
+            a = frames[key[0]]
+            b = frames[key[1]]
+            indices = a.diff(b)
+
+            if a.vtx_count != b.vtx_count or \
+                    len(indices) > self.DELTA_THRESHOLD * b.vtx_count:
+                indices = None
+
+            deltas[key] = indices
+
+        return deltas[key]
+
+    def precompute_deltas(self):
+        """Compute deltas between every pair of VCIs adjacent on the timeline
+        
+        Scrubbing in either direction will then only push the 
+        vertex colors that actually change between keys
+        """
+        sequence = self.get_keyed_sequence()
+        for src, dst in zip(sequence, sequence[1:]):
+            if src != dst:
+                self.get_delta(src, dst)
+
+    def get_keyed_sequence(self):
+        """Get the VCI of each key on the timeline, in time order
+
+        Returns:
+            list: VCI values, limited to the range of cached frames
+        """
+        if self.index_dirty:
+            self.build_index()
+
+        return self.key_values
+
+    def build_index(self):
+        """Rebuild the sorted time -> VCI index from the VCI keys
+
+        Must be rebuilt whenever keys change, see invalidate_index()
+        """
+        keys = sorted(self.get_keys())
+        self.key_times = [time for time, vci in keys]
+        self.key_values = [vci for time, vci in keys]
+        self.index_dirty = False
+
+    def invalidate_index(self):
+        """Flag the time -> VCI index to be rebuilt on next use"""
+        self.index_dirty = True
+
+    def vci_at(self, time):
+        """Find the VCI displayed at a given time
+        
+        VCI keys use step tangents, so the value holds from one key 
+        until the next. Before the first key the first value is used.
+
+        Parameters:
+            time (float): Frame number
+
+        Returns:
+            int: VCI at that time, or -1 if there are no keys
+        """
+        if self.index_dirty:
+            self.build_index()
+
+        if not self.key_times:
+            return -1
+
+        i = bisect_right(self.key_times, time) - 1
+        return self.key_values[max(0, i)]
     
+    @instrument.timed('export')
     def on_export(self):
-        # TODO: Big serialization work happens here. 
-        # UV indexing is setup (if not already), frames are
-        # compressed and copied into a format for FBX,
-        # the keyframes for VCI are serialized for FBX
-        # (since that animated attribute doesn't export)
-        pass
+        """Serialize the keyed animation into the export attribute for FBX
+
+        Only frames referenced by a key are exported, renumbered in 
+        order of first use, and keyframes for VCI are serialized 
+        alongside them (since that animated attribute doesn't export)
+        """
+        # TODO: UV indexing is setup (if not already)
+        keys = self.get_keys()
+
+        # Remap keyed VCIs onto a compact range of exported frames
+        remap = OrderedDict()
+        for time, vci in keys:
+            remap.setdefault(vci, len(remap))
+
+        # Frames are streamed out of the store rather than all decoded up front
+        frames = FrameSelection(self.frames, list(remap))
+        keys = [(time, remap[vci]) for time, vci in keys]
+        vtx_count = self.frames[frames.vcis[0]].vtx_count if remap else 0
+
+        encoded = encode_export(frames, keys, vtx_count, self.USE_PALETTE)
+        self.set_attr(self.ATTR_EXPORT, 'string', encoded, False)
+
+    def get_keys(self):
+        """Get the time and VCI of each key on the timeline, in time order
 
+        Returns:
+            list: (time, VCI) tuples, limited to the range of cached frames
+        """
+        values = cmds.keyframe(
+            '{}.{}'.format(self.dag_path, self.ATTR_VCI),
+            query=True,
+            timeChange=True,
+            valueChange=True
+        )
+
+        if values is None:
+            return []
+
+        # Results are a flat list of time, value pairs
+        keys = zip(values[0::2], values[1::2])
+        return [(t, int(v)) for t, v in keys if 0 <= int(v) < len(self.frames)]
+
+    def get_digests(self):
+        """Get the mapping between VertexColorFrame.digest() and VCI
+
+        Returns:
+            dict: Digest -> first VCI stored with those colors
+        """
+        if self.digests is None:
+            self.digests = dict()
+            for vci, frame in enumerate(self.frames):
+                self.digests.setdefault(frame.digest(), vci)
+
+        return self.digests
+
+    @instrument.timed('keying.add_key')
     def add_key(self):
         """Add a timeline key for the mesh and current color state"""
         vci = self.get_current_vci()
 
         new_frame = VertexColorFrame()
         new_frame.copy_from(self.get_mesh())
-
-        if len(self.frames) > 0:
-            # If the colors of the mesh have changed, store the new VCF 
-            if self.frames[vci].is_different(new_frame):
-                self.set_keyframe(len(self.frames))
-                self.frames.append(new_frame)
-                self.update_cache()
-            else:
-                # Nothing has changed, so we key it to the same VCI
-                self.set_keyframe(vci)
+        instrument.touched(new_frame.vtx_count)
+        digest = new_frame.digest()
+        digests = self.get_digests()
+
+        if digest in digests:
+            # This color state was stored before, so we reuse its VCI
+            vci = digests[digest]
+            self.set_keyframe(vci)
+        elif len(self.frames) > 0 and not self.frames[vci].is_different(new_frame):
+            # Nothing visibly changed, so we key it to the same VCI
+            self.set_keyframe(vci)
         else:
-            # Nothing is cached yet, set it as the first
+            # New color state, store the new VCF 
+            vci = len(self.frames)
+            digests[digest] = vci
+            self.set_keyframe(vci)
             self.frames.append(new_frame)
-            self.set_keyframe(0)
             self.update_cache()
+
+        # The mesh is currently displaying the keyed colors, 
+        # which prepared uploads did not start from
+        self.reset_prefetch()
+        self.prev_idx = vci
+        self.precompute_deltas()
             
     def get_current_vci(self):
         """Evaluate the current VCI that should be displayed
         
-        Invalid keyframes just return as the last one in the cache
+        Keys outside the range of cached frames are skipped (see 
+        get_keys()), so the previous valid key holds over them. If
+        there is no valid key at all, VCI 0 is keyed at the current time.
 
         Returns:
             int: Index at the current time 
         """
-        current = cmds.keyframe(
-            '{}.{}'.format(self.dag_path, self.ATTR_VCI), 
-            query=True, 
-            eval=True
-        )
-        
-        print(current)
+        current = self.vci_at(cmds.currentTime(query=True))
 
-        if current is None:
+        if current < 0:
             self.set_keyframe(0)
             current = 0
-        else:
-            current = int(current[0])
 
         return min(len(self.frames) - 1, current)
 
@@ -340,11 +1604,61 @@ class VertexColorAnimator:
         cmds.setKeyframe(
             self.dag_path,
             attribute=self.ATTR_VCI, 
+            value=vci,
             inTangentType='stepnext', 
             outTangentType='step'
         )
 
         self.set_attr(self.ATTR_VCI, 'short', vci, True)
+        self.invalidate_index()
+
+
+class FramePrefetcher:
+    """Worker thread that prepares upcoming VCI transitions during playback
+
+    The main thread only queues work and performs the final mesh write. 
+    Decoding packed frames, diffing and building upload arrays happen 
+    here, ahead of the frame that needs them.
+    """
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.thread = None
+
+    def start(self):
+        """Start the worker thread if it is not already running"""
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name='VCAPrefetch')
+            self.thread.daemon = True
+            self.thread.start()
+
+    def schedule(self, animator, frame, count):
+        """Queue the next transitions of an animator
+
+        Parameters:
+            animator (VertexColorAnimator): Animator to look ahead on
+            frame (int): Current frame number
+            count (int): Number of transitions to look ahead
+        """
+        with animator.prefetch_lock:
+            generation = animator.generation
+            transitions = animator.upcoming_transitions(frame, count)
+            animator.prefetched.update(transitions)
+
+        for src, dst in transitions:
+            self.jobs.put((animator, generation, src, dst))
+
+        self.start()
+
+    def run(self):
+        while True:
+            animator, generation, src, dst = self.jobs.get()
+            try:
+                animator.prepare(generation, src, dst)
+            except Exception:
+                # Playback falls back to preparing the frame itself
+                animator.cancel_prefetch(src, dst)
+                if DEBUG:
+                    traceback.print_exc(file=sys.stdout)
 
 
 class VertexColorAnimatorSystem:
@@ -357,8 +1671,20 @@ class VertexColorAnimatorSystem:
     # TODO: Handle renamed objects somehow
     animators = dict()
 
+    # Maya callback IDs registered by initialize()
+    callbacks = []
+
+    # Number of upcoming VCI transitions per animator to prepare 
+    # in the background during playback, e.g. 3. 0 disables prefetching.
+    PREFETCH_COUNT = 0
+
+    prefetcher = FramePrefetcher()
+
     WINDOW_TITLE = 'Colorkey Anim'
 
+    # scrollField showing instrument.format_report()
+    profile_field = None
+
     @classmethod
     def initialize(cls):
         """Ensure there's a global expression setup for watching frame changes"""
@@ -374,16 +1700,52 @@ class VertexColorAnimatorSystem:
 
         cmds.expression(name=name, s=expression)
 
+        # Keys moved or deleted outside of the tool (graph editor, 
+        # timeline, undo) need to refresh each animator's VCI index
+        if cls.callbacks:
+            om.MMessage.removeCallbacks(cls.callbacks)
+
+        cls.callbacks = [
+            oma.MAnimMessage.addAnimCurveEditedCallback(cls.on_keys_changed)
+        ]
+
+    @classmethod
+    def on_keys_changed(cls, *args):
+        """Callback for edited animation curves to invalidate VCI indices"""
+        for animator in cls.animators.values():
+            animator.invalidate_index()
+
     @classmethod
     @safe_exceptions
+    @instrument.timed('playback.frame_change')
     def on_frame_change(cls, frame):
         """Delegate frame change event to *all* animators
         
+        Every animator's target VCI is resolved first, without touching 
+        any mesh. Only animators that change VCI on this frame are then
+        written, all in one pass with viewport refresh suspended, so the 
+        viewport redraws once per frame rather than once per mesh.
+
         Parameters:
             frame (int): new frame number
         """
+        changed = []
         for animator in cls.animators.values():
-            animator.on_frame_change(frame)
+            idx = animator.pending_vci(frame)
+            if idx is not None:
+                changed.append((animator, idx))
+
+        if changed:
+            cmds.refresh(suspend=True)
+            try:
+                for animator, idx in changed:
+                    animator.transition(idx)
+            finally:
+                cmds.refresh(suspend=False)
+
+        if cls.PREFETCH_COUNT > 0:
+            for animator in cls.animators.values():
+                cls.prefetcher.schedule(animator, frame, cls.PREFETCH_COUNT)
 
     @classmethod
     @safe_exceptions
@@ -398,6 +1760,7 @@ class VertexColorAnimatorSystem:
 
     @classmethod
     @safe_exceptions
+    @instrument.timed('keying.set_key')
     def on_set_key(cls):
         """Key vertex colors on all selected objects.
 
@@ -427,6 +1790,33 @@ class VertexColorAnimatorSystem:
 
             yield cls.animators[path]
 
+    @classmethod
+    def on_toggle_profiling(cls, enabled):
+        """Event handler for the profiling checkbox"""
+        if enabled:
+            instrument.enable()
+        else:
+            instrument.disable()
+
+    @classmethod
+    def on_refresh_profile(cls):
+        """Show the current timings in the profiling panel"""
+        if cls.profile_field:
+            cmds.scrollField(cls.profile_field, edit=True, text=instrument.format_report())
+
+    @classmethod
+    def on_reset_profile(cls):
+        instrument.reset()
+        cls.on_refresh_profile()
+
+    @classmethod
+    @safe_exceptions
+    def on_save_profile(cls):
+        """Prompt for a file to dump the current timings to as JSON"""
+        paths = cmds.fileDialog2(fileFilter='JSON (*.json)', dialogStyle=2, fileMode=0)
+        if paths:
+            instrument.dump(paths[0])
+
     @classmethod
     def open_editor(cls):
         if not cls.window:
@@ -446,8 +1836,38 @@ class VertexColorAnimatorSystem:
             cmds.setParent("..")
             cmds.setParent("..")
 
+            if PROFILING_AVAILABLE:
+                cls.add_profiling_panel()
+
         cmds.showWindow(cls.window)
 
+    @classmethod
+    def add_profiling_panel(cls):
+        """Add the instrument.py controls to the editor window"""
+        cmds.frameLayout(label="Profiling", collapsable=True, collapse=True)
+        cmds.rowColumnLayout(numberOfColumns=4)
+
+        cmds.checkBox(
+            label="Enabled", 
+            value=instrument.ENABLED,
+            changeCommand="VertexColorAnimatorSystem.on_toggle_profiling(#1)"
+        )
+        cmds.button(label="Refresh", command="VertexColorAnimatorSystem.on_refresh_profile()")
+        cmds.button(label="Reset", command="VertexColorAnimatorSystem.on_reset_profile()")
+        cmds.button(label="Save...", command="VertexColorAnimatorSystem.on_save_profile()")
+
+        cmds.setParent("..")
+        cls.profile_field = cmds.scrollField(
+            editable=False, 
+            wordWrap=False, 
+            height=160, 
+            font='fixedWidthFont'
+        )
+        cmds.setParent("..")
+
 
-VertexColorAnimatorSystem.initialize()
-VertexColorAnimatorSystem.open_editor()
+# Only hook into the scene when run as a shelf script, so the 
+# module can also be imported (e.g. by Benchmarks/benchmark.py)
+if __name__ == '__main__':
+    VertexColorAnimatorSystem.initialize()
+    VertexColorAnimatorSystem.open_editor()
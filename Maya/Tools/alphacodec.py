@@ -0,0 +1,239 @@
+"""
+    Crease alpha encoding/decoding for the NPR shader suite.
+
+    Crease data is packed into the alpha channel of the crease colorset.
+    Every function here accepts either a single alpha value or an array
+    of them (one per vertex) and works on the whole array at once, so
+    full meshes can be decoded without looping per vertex in Python.
+
+    Has no dependency on Maya, so it can be used from batch scripts.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import numpy as np
+
+# Damm Algorithm matrix is sourced from:
+# https://en.wikibooks.org/wiki/Algorithm_Implementation/Checksums/Damm_Algorithm#Python
+DAMM_MATRIX = np.array((
+    (0, 3, 1, 7, 5, 9, 8, 6, 4, 2),
+    (7, 0, 9, 2, 1, 5, 4, 8, 6, 3),
+    (4, 2, 0, 6, 8, 7, 1, 3, 5, 9),
+    (1, 7, 5, 0, 9, 8, 3, 4, 2, 6),
+    (6, 1, 2, 3, 0, 4, 5, 9, 7, 8),
+    (3, 6, 7, 4, 2, 0, 9, 5, 8, 1),
+    (5, 8, 6, 9, 7, 2, 0, 1, 3, 4),
+    (8, 9, 4, 5, 3, 6, 2, 0, 1, 7),
+    (9, 4, 3, 8, 6, 1, 7, 2, 0, 5),
+    (2, 5, 8, 1, 4, 3, 6, 7, 9, 0)
+), dtype=np.uint8)
+
+def _buildDammTable():
+    """Precompute the Damm interim digit for every 4 digit value
+
+        DAMM_TABLE[interim][x] is the interim digit after running the
+        4 digits of x (zero padded) starting from the given interim.
+    """
+    x = np.arange(10000)
+    digits = (x // 1000, x // 100 % 10, x // 10 % 10, x % 10)
+
+    table = np.empty((10, 10000), dtype=np.uint8)
+    for start in range(10):
+        interim = np.full(10000, start, dtype=np.uint8)
+        for digit in digits:
+            interim = DAMM_MATRIX[interim, digit]
+        table[start] = interim
+
+    return table
+
+DAMM_TABLE = _buildDammTable()
+
+# Fixed digits "0.xx1230" used to validate a V3 alpha
+V3_SIGNATURE = 0.001230001
+
+# Alphas at or below this are treated as unpainted (matches the shader)
+EPSILON = 0.000001
+
+
+def _result(value, scalar):
+    """Unwrap single value results back into Python scalars"""
+    if scalar:
+        return np.asarray(value).item()
+
+    return value
+
+
+def damm(val):
+    """Compute the Damm checksum digit for one or more values
+
+        Since a leading zero never changes the interim digit when
+        starting from 0, 3 and 4 digit values share the same table.
+        Values up to 8 digits are supported by chaining the table.
+
+        :val int or int[] Non-negative value(s) to check
+
+        :return Checksum digit(s). 0 if val already ends with a valid checksum.
+    """
+    scalar = np.ndim(val) == 0
+    val = np.asarray(val, dtype=np.int64)
+
+    interim = DAMM_TABLE[0][val // 10000 % 10000]
+    interim = DAMM_TABLE[interim, val % 10000]
+
+    return _result(interim, scalar)
+
+
+def breakAlphaV1(a):
+    """(legacy) Break alpha value into LOD, Bump, and Thickness
+
+        Currently uses 4 decimal places for the float,
+        which should be.. safe..ish..
+    """
+    scalar = np.ndim(a) == 0
+    a = np.asarray(a, dtype=np.float64)
+
+    lod = np.floor(a * 10)
+    bump = np.floor(a * 100) - lod * 10
+    thickness = np.floor(a * 10000) - lod * 1000 - bump * 100
+
+    return tuple(_result(x, scalar) for x in (lod, bump, thickness))
+
+
+def isValidAlphaV2(a):
+    """Check whether alpha value(s) carry a valid V2 Damm checksum"""
+    scalar = np.ndim(a) == 0
+    a = np.asarray(a, dtype=np.float64)
+
+    x = np.floor(a * 10000)
+    in_range = (x >= 0) & (x < 10000)
+    checksum = DAMM_TABLE[0][np.where(in_range, x, 0).astype(np.int64)]
+
+    return _result(in_range & (checksum == 0), scalar)
+
+
+def breakAlphaV2(a):
+    """Break alpha value into LOD, Mode, Bump, and Thickness
+
+        Version 2 uses a 4 decimal places, 3 to pack the above
+        and the 4th as a checksum value for the packed values.
+
+        Alphas without a valid checksum are returned as LOD -1.
+    """
+    scalar = np.ndim(a) == 0
+    a = np.asarray(a, dtype=np.float64)
+
+    valid = isValidAlphaV2(a)
+    x = np.where(valid, np.floor(a * 1000), 0).astype(np.int64)
+
+    lod = np.where(valid, (x & 768) / 256, -1)
+    mode = (x & 192) / 64
+    bump = (x & 32) / 32
+    thickness = x & 31
+
+    return tuple(_result(v, scalar) for v in (lod, mode, bump, thickness))
+
+
+def makeAlphaV2(lod, mode, bump, thickness):
+    """Make alpha value(s) from LOD/mode/bump/thickness"""
+    scalar = all(np.ndim(v) == 0 for v in (lod, mode, bump, thickness))
+
+    # Re-encode components into a single value
+    a = (np.asarray(lod, dtype=np.int64) * 256 |
+        np.asarray(mode, dtype=np.int64) * 64 |
+        np.asarray(bump, dtype=np.int64) * 32 |
+        np.asarray(thickness, dtype=np.int64))
+
+    # Offset to the [0,1) range and append a checksum
+    # An extra 0.00001 is added to correct for rounding errors
+    # with pushing between Python and Maya. Unused in decoding.
+    checksum = damm(a)
+    a = (a * 100.0 + checksum * 10.0 + 1) / 100000.0
+
+    return _result(a, scalar)
+
+
+def isValidAlphaV3(a):
+    """Check whether alpha value(s) carry the V3 signature digits"""
+    scalar = np.ndim(a) == 0
+    a = np.asarray(a, dtype=np.float64)
+
+    signature = np.floor((a * 100.0 - np.floor(a * 100.0)) * 10000)
+
+    return _result(signature == 1230, scalar)
+
+
+def breakAlphaV3(a):
+    """Returns -1 on an invalid alpha. Otherwise, returns thickness """
+    scalar = np.ndim(a) == 0
+    a = np.asarray(a, dtype=np.float64)
+
+    thickness = np.where(isValidAlphaV3(a), np.floor(a * 100.0) / 100.0, -1)
+
+    return _result(thickness, scalar)
+
+
+def makeAlphaV3(thickness):
+    """Make alpha value(s) from a thickness"""
+    scalar = np.ndim(thickness) == 0
+    thickness = np.asarray(thickness, dtype=np.float64)
+
+    return _result(np.floor(thickness * 100.0) / 100.0 + V3_SIGNATURE, scalar)
+
+
+def detectAlphaVersion(alphas):
+    """Guess which encoding version a mesh's crease alphas use
+
+        Every painted alpha is run through the V1, V2 and V3 decoders
+        and the version that accepts the most of them wins. Ties go to
+        the newer version, since V3 and V2 values also look like V1.
+
+        :alphas float[] Alpha of every vertex of a mesh
+
+        :return Tuple (version, invalid count). Version is 0 if nothing
+            is painted, and invalid is the number of painted alphas the
+            chosen version cannot decode.
+    """
+    a = np.asarray(alphas, dtype=np.float64)
+    painted = a > EPSILON
+    total = int(np.count_nonzero(painted))
+
+    if total < 1:
+        return (0, 0)
+
+    lod = breakAlphaV1(a)[0]
+    valid = (
+        (3, np.count_nonzero(painted & isValidAlphaV3(a))),
+        (2, np.count_nonzero(painted & isValidAlphaV2(a))),
+        (1, np.count_nonzero(painted & (lod > 0) & (a < 1.0)))
+    )
+
+    version, count = max(valid, key=lambda v: v[1])
+    return (version, total - int(count))
+
+
+def migrateAlphasToV3(alphas, version):
+    """Re-encode alphas of a given version to V3
+
+        Thickness is rescaled to [0.01, 0.99]. Creases with a thickness
+        of 0 are cleared, and alphas that fail to decode are left as-is.
+
+        :alphas float[] Alphas to migrate
+        :version int Encoding version of alphas
+
+        :return ndarray Migrated alphas
+    """
+    a = np.asarray(alphas, dtype=np.float64)
+    painted = a > EPSILON
+
+    if version == 2:
+        lod, mode, bump, thickness = breakAlphaV2(a)
+        valid = painted & (lod >= 0)
+        thickness = thickness / 31.0
+    elif version == 1:
+        lod, bump, thickness = breakAlphaV1(a)
+        valid = painted & (lod > 0) & (a < 1.0)
+        thickness = thickness / 100.0
+    else:
+        return a.copy()
+
+    migrated = np.where(thickness > 0, makeAlphaV3(np.clip(thickness, 0.01, 0.99)), 0.0)
+    return np.where(valid, migrated, a)
@@ -0,0 +1,280 @@
+"""
+    Batch migration of crease data to the V3 alpha encoding.
+
+    Finds every mesh using the crease colorset in one or more scenes
+    (or every scene under a directory), detects which encoding version
+    each mesh is using and re-encodes its alphas to V3 in bulk. Scenes
+    are spread across a process pool, each worker running its own
+    standalone Maya session.
+
+    Usage (through mayapy):
+
+        mayapy batchmigrate.py assets/ hero.ma [--processes 4] [--dry-run]
+            [--report report.json]
+
+    Pass --standin to run against JSON scene stand-ins instead of Maya
+    (see StandInScene), which is how the migration can be tested without
+    a Maya license.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+import numpy as np
+
+from alphacodec import detectAlphaVersion, migrateAlphasToV3
+
+CREASE_COLORSET = "colorSet"
+
+SCENE_EXTENSIONS = ('.ma', '.mb')
+STANDIN_EXTENSIONS = ('.json',)
+
+
+class MayaScene:
+    """Scene access through a (standalone) Maya session"""
+
+    EXTENSIONS = SCENE_EXTENSIONS
+
+    def __init__(self, path=None):
+        """
+            :path string Scene file to open. If omitted, the
+                currently open scene is used and never saved.
+        """
+        import maya.cmds as cmds
+        import maya.api.OpenMaya as om
+
+        self.cmds = cmds
+        self.om = om
+        self.path = path
+
+        if path:
+            cmds.file(path, open=True, force=True)
+
+    def meshes(self):
+        """List every mesh shape that has the crease colorset"""
+        found = []
+        for mesh in self.cmds.ls(type='mesh', noIntermediate=True, long=True) or []:
+            colorsets = self.cmds.polyColorSet(mesh, query=True, allColorSets=True) or []
+            if CREASE_COLORSET in colorsets:
+                found.append(mesh)
+
+        return found
+
+    def getMesh(self, mesh):
+        selection = self.om.MSelectionList()
+        selection.add(mesh)
+        return self.om.MFnMesh(selection.getDagPath(0))
+
+    def getColors(self, mesh):
+        """Read every vertex color of the crease colorset as an (N, 4) array"""
+        colors = self.getMesh(mesh).getVertexColors(CREASE_COLORSET)
+        return np.array(colors, dtype=np.float64).reshape(-1, 4)
+
+    def setColors(self, mesh, ids, colors):
+        """Write colors to a subset of vertices of the crease colorset
+
+            There's no undo in a batch session, so a single
+            MFnMesh.setVertexColors call is used for the whole mesh.
+        """
+        fn = self.getMesh(mesh)
+        fn.setCurrentColorSetName(CREASE_COLORSET)
+        fn.setVertexColors(
+            [self.om.MColor(c) for c in colors.tolist()],
+            [int(i) for i in ids]
+        )
+
+    def save(self):
+        if self.path:
+            self.cmds.file(save=True, force=True)
+
+
+class StandInScene:
+    """Maya stand-in that reads and writes scenes as JSON
+
+        The file holds a mesh name -> {"colorSets": [...], "colors": [[r, g, b, a], ...]}
+        mapping under a "meshes" key, which is enough to exercise
+        detection and migration without a Maya license.
+    """
+
+    EXTENSIONS = STANDIN_EXTENSIONS
+
+    def __init__(self, path):
+        self.path = path
+        with open(path) as f:
+            self.data = json.load(f)
+
+    def meshes(self):
+        return [
+            name for name, mesh in sorted(self.data['meshes'].items())
+            if CREASE_COLORSET in mesh.get('colorSets', [])
+        ]
+
+    def getColors(self, mesh):
+        colors = self.data['meshes'][mesh]['colors']
+        return np.array(colors, dtype=np.float64).reshape(-1, 4)
+
+    def setColors(self, mesh, ids, colors):
+        current = self.getColors(mesh)
+        current[ids] = colors
+        self.data['meshes'][mesh]['colors'] = current.tolist()
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.data, f)
+
+
+def migrateScene(scene, dry_run=False):
+    """Migrate every crease mesh of an open scene to V3
+
+        :scene MayaScene or StandInScene
+        :dry_run bool If true, report without modifying the scene
+
+        :return list Per-mesh dict reports
+    """
+    reports = []
+
+    for mesh in scene.meshes():
+        colors = scene.getColors(mesh)
+        alphas = colors[:, 3]
+        version, invalid = detectAlphaVersion(alphas)
+
+        migrated = migrateAlphasToV3(alphas, version)
+        changed = np.flatnonzero(migrated != alphas)
+
+        if len(changed) > 0 and not dry_run:
+            colors[changed, 3] = migrated[changed]
+            scene.setColors(mesh, changed, colors[changed])
+
+        reports.append({
+            'mesh': mesh,
+            'version': version,
+            'vertices': len(alphas),
+            'invalid': invalid,
+            'migrated': len(changed)
+        })
+
+    return reports
+
+def migrateFile(job):
+    """Process pool entry point to migrate a single scene file
+
+        :job Tuple (path, standin, dry_run)
+
+        :return dict File report, including timing and any error
+    """
+    path, standin, dry_run = job
+    report = {'file': path, 'meshes': [], 'error': None}
+    start = time.time()
+
+    try:
+        scene = StandInScene(path) if standin else MayaScene(path)
+        report['meshes'] = migrateScene(scene, dry_run)
+
+        if not dry_run and any(m['migrated'] > 0 for m in report['meshes']):
+            scene.save()
+    except Exception as e:
+        report['error'] = '{}: {}'.format(type(e).__name__, e)
+
+    report['seconds'] = time.time() - start
+    return report
+
+def initWorker(standin):
+    """Start a standalone Maya session in each pool worker"""
+    if not standin:
+        import maya.standalone
+        maya.standalone.initialize(name='python')
+
+def findScenes(paths, extensions):
+    """Expand directories into the scene files found beneath them"""
+    scenes = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(extensions):
+                        scenes.append(os.path.join(root, name))
+        else:
+            scenes.append(path)
+
+    return scenes
+
+def migrateFiles(paths, processes=None, standin=False, dry_run=False):
+    """Migrate every scene under the input paths across a process pool
+
+        :paths string[] Scene files and/or directories to search
+        :processes int Pool size. Defaults to the CPU count, 1 runs inline.
+        :standin bool Use StandInScene JSON files instead of Maya
+        :dry_run bool If true, report without modifying any scene
+
+        :return list Per-file dict reports
+    """
+    extensions = STANDIN_EXTENSIONS if standin else SCENE_EXTENSIONS
+    jobs = [(path, standin, dry_run) for path in findScenes(paths, extensions)]
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes < 2 or len(jobs) < 2:
+        initWorker(standin)
+        return [migrateFile(job) for job in jobs]
+
+    pool = multiprocessing.Pool(
+        min(processes, len(jobs)),
+        initializer=initWorker,
+        initargs=(standin,)
+    )
+    try:
+        return pool.map(migrateFile, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+def printReport(reports):
+    """Print per-file timings and invalid alpha counts"""
+    total_seconds = 0
+    total_invalid = 0
+    total_migrated = 0
+
+    for report in reports:
+        invalid = sum(m['invalid'] for m in report['meshes'])
+        migrated = sum(m['migrated'] for m in report['meshes'])
+
+        total_seconds += report['seconds']
+        total_invalid += invalid
+        total_migrated += migrated
+
+        status = report['error'] or '{} meshes, {} migrated, {} invalid'.format(
+            len(report['meshes']), migrated, invalid
+        )
+        print('{:8.2f}s  {}  {}'.format(report['seconds'], report['file'], status))
+
+        for mesh in report['meshes']:
+            print('           {mesh} (V{version}): {vertices} vertices, '
+                  '{migrated} migrated, {invalid} invalid'.format(**mesh))
+
+    print('{} files in {:.2f}s, {} alphas migrated, {} invalid'.format(
+        len(reports), total_seconds, total_migrated, total_invalid
+    ))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Migrate crease data to the V3 alpha encoding')
+    parser.add_argument('paths', nargs='+', help='Scene files or directories of scenes')
+    parser.add_argument('--processes', type=int, default=None, help='Process pool size')
+    parser.add_argument('--dry-run', action='store_true', help='Report without saving')
+    parser.add_argument('--standin', action='store_true', help='Use JSON scene stand-ins')
+    parser.add_argument('--report', help='Write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    reports = migrateFiles(args.paths, args.processes, args.standin, args.dry_run)
+    printReport(reports)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(reports, f, indent=2)
+
+    return 1 if any(report['error'] for report in reports) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
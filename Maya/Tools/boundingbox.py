@@ -0,0 +1,477 @@
+"""
+    Aggregate bounding box calculations for the u_BoundingBox uniform.
+
+    Shape bounds are read from one selection list with an MFnDagNode
+    query per shape, then aggregated per shading engine with NumPy.
+    Aggregates work on an (N, 3) array of shape extents, so different
+    algorithms (max, mean, percentile) can be swapped in without
+    querying Maya again (see updateSelectedBoundingBoxes).
+
+    updateShaderAggregateBoundingBox keeps its original contract of 
+    taking a callable that aggregates a list of shapes.
+
+    BoundingBoxSync optionally keeps the uniform up to date while
+    modeling, instead of relying on the editor's Update BBox buttons.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import numpy as np
+
+# Up/forward may swap depending on what workspace we're in (UE4 vs Maya)
+RIGHT = 0 # X
+UP = 1 # Y
+FORWARD = 2 # Z
+
+# Shader vec3 uniform to store BBox calculations
+BOUNDING_BOX_UNIFORM = 'u_BoundingBox'
+
+def getShapeExtents(shapes):
+    """Return the object space bbox extents of every input shape
+
+        :shapes string[] DAG object list
+
+        :return ndarray (N, 3) of (width, height, depth) per shape
+    """
+    selection = om.MSelectionList()
+    for shape in shapes:
+        selection.add(shape)
+
+    extents = np.empty((selection.length(), 3), dtype=np.float64)
+    fn = om.MFnDagNode()
+
+    for i in range(selection.length()):
+        fn.setObject(selection.getDagPath(i))
+        bbox = fn.boundingBox
+        extents[i] = (bbox.width, bbox.height, bbox.depth)
+
+    return extents
+
+def aggregateMax(extents):
+    """Maximum extents along each axis"""
+    return extents.max(axis=0)
+
+def aggregateMean(extents):
+    """Average extents along each axis"""
+    return extents.mean(axis=0)
+
+def aggregatePercentile(percentile):
+    """Make an aggregate for the given percentile of extents along each axis
+
+        Less sensitive to a single oversized shape (ground planes, skydomes)
+        than the maximum, while still biased towards the larger shapes.
+
+        :percentile float In the [0, 100] range
+    """
+    def aggregate(extents):
+        return np.percentile(extents, percentile, axis=0)
+
+    return aggregate
+
+def getMaxBoundingBox(shapes):
+    """Return max bbox extents for all the input shapes
+
+        :shapes string[] DAG object list
+
+        :return Tuple (x, y, z)
+    """
+    return tuple(aggregateMax(getShapeExtents(shapes)).tolist())
+
+def getAverageBoundingBox(shapes):
+    """Return average bbox extents for all the input shapes
+
+        :shapes string[] DAG object list
+
+        :return Tuple (x, y, z)
+    """
+    return tuple(aggregateMean(getShapeExtents(shapes)).tolist())
+
+def getPercentileBoundingBox(shapes, percentile=90):
+    """Return percentile bbox extents for all the input shapes
+
+        :shapes string[] DAG object list
+        :percentile float In the [0, 100] range
+
+        :return Tuple (x, y, z)
+    """
+    return tuple(aggregatePercentile(percentile)(getShapeExtents(shapes)).tolist())
+
+def getEngineShapes(engines):
+    """Map each shading engine to its (deduplicated) connected shapes
+
+        :engines string[] Shading engine names
+
+        :return dict Engine -> string[] of shapes
+    """
+    engine_shapes = {}
+    for engine in engines:
+        shapes = cmds.listConnections(engine, type='shape', shapes=True) or []
+        engine_shapes[engine] = sorted(set(cmds.ls(shapes, long=True)))
+
+    return engine_shapes
+
+def aggregateEngineBoundingBoxes(engines, aggregate=aggregateMax):
+    """Compute the aggregate bounding box of every input shading engine
+
+        Bounds of every shape across all engines are fetched in a single
+        pass, and engines sharing the same set of shapes are only
+        aggregated once.
+
+        :engines string[] Shading engine names
+        :aggregate callable Takes an (N, 3) extents array and
+            returns (x, y, z) extents, e.g. aggregateMax
+
+        :return dict Engine -> Tuple (x, y, z). Engines without
+            any shapes are omitted.
+    """
+    engine_shapes = getEngineShapes(engines)
+
+    # Single bulk query for every shape across all engines
+    shapes = sorted(set(s for group in engine_shapes.values() for s in group))
+    if len(shapes) < 1:
+        return {}
+
+    rows = dict((shape, i) for i, shape in enumerate(shapes))
+    extents = getShapeExtents(shapes)
+
+    memo = {}
+    results = {}
+    for engine, group in engine_shapes.items():
+        if len(group) < 1:
+            continue
+
+        key = tuple(group)
+        if key not in memo:
+            indices = [rows[shape] for shape in group]
+            memo[key] = tuple(np.asarray(aggregate(extents[indices])).tolist())
+
+        results[engine] = memo[key]
+
+    return results
+
+def getMaterials(engine):
+    """Return the materials assigned to a shading engine"""
+    # Could also do listConnections(type='GLSLShader') but I may
+    # port it in the future... so we wrap with ls() instead.
+    return list(set(cmds.ls(cmds.listConnections(engine), mat=True)))
+
+def setBoundingBoxUniform(material, bbox):
+    """Write (x, y, z) extents into a material's u_BoundingBox uniform"""
+    if not cmds.attributeQuery(BOUNDING_BOX_UNIFORM, node=material, exists=True):
+        return
+
+    cmds.setAttr(material + '.' + BOUNDING_BOX_UNIFORM + 'X', bbox[RIGHT])
+    cmds.setAttr(material + '.' + BOUNDING_BOX_UNIFORM + 'Y', bbox[UP])
+    cmds.setAttr(material + '.' + BOUNDING_BOX_UNIFORM + 'Z', bbox[FORWARD])
+
+def updateEngineBoundingBoxes(engines, aggregate=aggregateMax):
+    """Update u_BoundingBox for all materials of the input shading engines
+
+        :engines string[] Shading engine names
+        :aggregate callable See aggregateEngineBoundingBoxes
+
+        :return dict Engine -> Tuple (x, y, z) that was written
+    """
+    results = aggregateEngineBoundingBoxes(engines, aggregate)
+
+    for engine, bbox in results.items():
+        for material in getMaterials(engine):
+            setBoundingBoxUniform(material, bbox)
+
+    return results
+
+def getSelectedEngines():
+    """Return the shading engines of every selected shape
+
+        :return string[] Shading engine names
+    """
+    paths = cmds.listRelatives(fullPath=True, shapes=True, noIntermediate=True) or []
+    if len(paths) < 1:
+        return []
+
+    return list(set(cmds.listConnections(paths, type='shadingEngine') or []))
+
+def updateSelectedBoundingBoxes(aggregate=aggregateMax):
+    """Update the u_BoundingBox uniform for all shaders attached
+        to the selected object to the aggregate bounding box of
+        all shapes attached to each of those shaders.
+
+        This gets a bit convoluted when dealing with multiple
+        materials attached to each object and a shared BBox, but
+        in production BBox will be a uniform provided per-instance
+        rather than this aggregation. So this is more of an estimate
+        and works best in one-material-per-object development environments.
+
+        :aggregate callable Takes an (N, 3) extents array and returns
+            (x, y, z) extents. Different algorithms can swapped here
+            (aggregateMax, aggregateMean, aggregatePercentile(q))
+
+        :return dict Engine -> Tuple (x, y, z) that was written
+    """
+    return updateEngineBoundingBoxes(getSelectedEngines(), aggregate)
+
+# Shape aggregates with an extents equivalent, which 
+# updateShaderAggregateBoundingBox runs through the bulk path
+SHAPE_AGGREGATES = {
+    getMaxBoundingBox: aggregateMax,
+    getAverageBoundingBox: aggregateMean,
+    getPercentileBoundingBox: aggregatePercentile(90)
+}
+
+def updateShaderAggregateBoundingBox(aggregate_callable=getMaxBoundingBox):
+    """Update u_BoundingBox of the selection's shaders from a shape aggregate
+
+        Same as updateSelectedBoundingBoxes, but aggregate_callable 
+        takes the list of shapes attached to a shading engine, e.g. 
+        getMaxBoundingBox. Known shape aggregates still use the bulk
+        extents query.
+
+        :aggregate_callable method to find a bounding box for a set of shapes.
+            Different algorithms can swapped here (max vs average)
+
+        :return dict Engine -> Tuple (x, y, z) that was written
+    """
+    if aggregate_callable in SHAPE_AGGREGATES:
+        return updateSelectedBoundingBoxes(SHAPE_AGGREGATES[aggregate_callable])
+
+    results = {}
+    for engine, shapes in getEngineShapes(getSelectedEngines()).items():
+        if len(shapes) < 1:
+            continue
+
+        # Copied, as the callable may consume the list
+        bbox = tuple(aggregate_callable(list(shapes)))
+        for material in getMaterials(engine):
+            setBoundingBoxUniform(material, bbox)
+
+        results[engine] = bbox
+
+    return results
+
+class BoundingBoxSync:
+    """Optional live mode to keep u_BoundingBox in sync with geometry edits
+
+        Every shape connected to an NPR material (any material with a
+        u_BoundingBox uniform) gets a node dirty callback that only marks
+        the shape as dirty. Once Maya goes idle, bounds are re-queried for
+        just the dirty shapes and only the shading engines using them are
+        re-aggregated, so continuous modeling never triggers a scene scan.
+
+        Live mode stays on across New/Open: shapes of the closing scene
+        are forgotten, and the new scene is scanned once it has loaded.
+    """
+    aggregate = staticmethod(aggregateMax)
+
+    # Shape DAG path -> node dirty callback ID
+    callbacks = dict()
+
+    # Connection and scene callback IDs registered by enable()
+    scene_callbacks = []
+
+    # Shading engine -> shape DAG paths, and the reverse mapping
+    engines = dict()
+    shape_engines = dict()
+
+    # Shape DAG path -> last known (width, height, depth) ndarray
+    extents = dict()
+
+    # Shading engine -> (x, y, z) last written to its materials
+    written = dict()
+
+    dirty = set()
+    rescan = False
+
+    # Pending idle scriptJob ID, if a flush is scheduled
+    job = None
+
+    @classmethod
+    def isEnabled(cls):
+        return len(cls.scene_callbacks) > 0
+
+    @classmethod
+    def enable(cls, aggregate=aggregateMax):
+        """Start watching NPR shapes and update all of them once
+
+            :aggregate callable See aggregateEngineBoundingBoxes
+        """
+        cls.disable()
+        cls.aggregate = staticmethod(aggregate)
+
+        # Shading assignments changing means the watched shapes change
+        cls.scene_callbacks = [
+            om.MDGMessage.addConnectionCallback(cls.onConnection),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, cls.onSceneChange),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, cls.onSceneChange),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, cls.onSceneLoaded),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, cls.onSceneLoaded)
+        ]
+
+        cls.scan()
+        cls.flush()
+
+    @classmethod
+    def disable(cls):
+        """Remove every callback and forget all cached bounds"""
+        if cls.scene_callbacks:
+            om.MMessage.removeCallbacks(cls.scene_callbacks)
+
+        cls.scene_callbacks = []
+        cls.forget()
+
+    @classmethod
+    def forget(cls):
+        """Stop watching shapes and drop cached bounds, but stay enabled"""
+        if cls.callbacks:
+            om.MMessage.removeCallbacks(list(cls.callbacks.values()))
+
+        if cls.job is not None and cmds.scriptJob(exists=cls.job):
+            cmds.scriptJob(kill=cls.job, force=True)
+
+        cls.callbacks = dict()
+        cls.engines = dict()
+        cls.shape_engines = dict()
+        cls.extents = dict()
+        cls.written = dict()
+        cls.dirty = set()
+        cls.rescan = False
+        cls.job = None
+
+    @classmethod
+    def toggle(cls, enabled):
+        """UI hook to switch live mode on or off"""
+        if enabled:
+            cls.enable()
+        else:
+            cls.disable()
+
+    @classmethod
+    def findEngines(cls):
+        """List every shading engine with an NPR material"""
+        materials = [
+            material for material in cmds.ls(mat=True)
+            if cmds.attributeQuery(BOUNDING_BOX_UNIFORM, node=material, exists=True)
+        ]
+
+        if len(materials) < 1:
+            return []
+
+        return list(set(cmds.listConnections(materials, type='shadingEngine') or []))
+
+    @classmethod
+    def scan(cls):
+        """Refresh which shapes are watched from the current shading assignments
+
+            Only newly watched shapes are marked dirty. Shapes that are
+            no longer on an NPR material have their callbacks removed.
+        """
+        cls.rescan = False
+        cls.engines = getEngineShapes(cls.findEngines())
+
+        cls.shape_engines = dict()
+        for engine, shapes in cls.engines.items():
+            for shape in shapes:
+                cls.shape_engines.setdefault(shape, set()).add(engine)
+
+        for shape in list(cls.callbacks.keys()):
+            if shape not in cls.shape_engines:
+                om.MMessage.removeCallback(cls.callbacks.pop(shape))
+                cls.extents.pop(shape, None)
+
+        for shape in cls.shape_engines:
+            if shape not in cls.callbacks:
+                cls.watch(shape)
+                cls.dirty.add(shape)
+
+        for engine in list(cls.written.keys()):
+            if engine not in cls.engines:
+                del cls.written[engine]
+
+    @classmethod
+    def watch(cls, shape):
+        """Register a node dirty callback on a shape"""
+        selection = om.MSelectionList()
+        selection.add(shape)
+        cls.callbacks[shape] = om.MNodeMessage.addNodeDirtyCallback(
+            selection.getDependNode(0),
+            lambda *args: cls.onShapeDirty(shape)
+        )
+
+    @classmethod
+    def onShapeDirty(cls, shape):
+        cls.dirty.add(shape)
+        cls.scheduleFlush()
+
+    @classmethod
+    def onConnection(cls, src, dst, made, *args):
+        """Rescan on the next flush whenever a shading engine is (dis)connected"""
+        if (src.node().hasFn(om.MFn.kShadingEngine) or
+                dst.node().hasFn(om.MFn.kShadingEngine)):
+            cls.rescan = True
+            cls.scheduleFlush()
+
+    @classmethod
+    def onSceneChange(cls, *args):
+        """Forget the shapes of a scene that is about to close"""
+        cls.forget()
+
+    @classmethod
+    def onSceneLoaded(cls, *args):
+        """Watch and update the NPR shapes of a newly created or opened scene"""
+        cls.scan()
+        cls.flush()
+
+    @classmethod
+    def scheduleFlush(cls):
+        """Debounce updates until Maya is next idle"""
+        if cls.job is None:
+            cls.job = cmds.scriptJob(idleEvent=cls.flush, runOnce=True)
+
+    @classmethod
+    def flush(cls):
+        """Re-aggregate engines of dirty shapes and write changed uniforms
+
+            :return dict Engine -> Tuple (x, y, z) that was written
+        """
+        cls.job = None
+
+        if cls.rescan:
+            cls.scan()
+
+        shapes = [
+            shape for shape in cls.dirty
+            if shape in cls.shape_engines and cmds.objExists(shape)
+        ]
+        cls.dirty = set()
+
+        if len(shapes) < 1:
+            return {}
+
+        for shape, extents in zip(shapes, getShapeExtents(shapes)):
+            cls.extents[shape] = extents
+
+        engines = set()
+        for shape in shapes:
+            engines.update(cls.shape_engines[shape])
+
+        results = {}
+        for engine in engines:
+            group = [shape for shape in cls.engines[engine] if shape in cls.extents]
+            if len(group) < 1:
+                continue
+
+            extents = np.array([cls.extents[shape] for shape in group])
+            bbox = tuple(np.asarray(cls.aggregate(extents)).tolist())
+
+            # Skip the write (and the material dirtying it causes)
+            # for edits that don't change the aggregate
+            if engine in cls.written and np.allclose(cls.written[engine], bbox):
+                continue
+
+            for material in getMaterials(engine):
+                setBoundingBoxUniform(material, bbox)
+
+            cls.written[engine] = bbox
+            results[engine] = bbox
+
+        return results
@@ -0,0 +1,146 @@
+"""
+    Static crease edge buffer for the NPR shader suite.
+
+    Crease edges only depend on painted alphas and topology, so rather
+    than re-deriving them per patch/triangle every frame (TCS and
+    drawCreases() in NPR.ogsfx), they can be built once per mesh into a
+    deduplicated list of segments, stored with the asset and drawn
+    directly by a crease-only pass.
+
+    Edges are found with the same rules as the shader (see edgeextract.py)
+    and deduplicated by hashing each undirected edge into a single int64.
+
+    Buffer layout (little endian) before zlib and base64 encoding:
+
+        header   '<4sHI'  magic 'NPRC', version, edge count (E)
+        vertices uint32   (E, 2) source vertex IDs
+        points   float32  (E, 2, 3) object space endpoints
+        thickness float32 (E, 2) crease alpha at each endpoint
+        colors   float32  (E, 2, 3) RGB at each endpoint
+
+    Has no dependency on Maya, so it can be used from batch scripts.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import struct
+import zlib
+import base64
+import numpy as np
+
+from edgeextract import getCreaseEdges
+
+BUFFER_PREFIX = 'NPRC:'
+BUFFER_MAGIC = b'NPRC'
+BUFFER_VERSION = 1
+BUFFER_HEADER = '<4sHI'
+
+class CreaseEdgeBuffer:
+    """Deduplicated crease segments of a single mesh"""
+
+    def __init__(self, vertices, points, thickness, colors):
+        """
+            :vertices ndarray (E, 2) source vertex IDs
+            :points ndarray (E, 2, 3) object space endpoints
+            :thickness ndarray (E, 2) crease alpha at each endpoint
+            :colors ndarray (E, 2, 3) RGB at each endpoint
+        """
+        self.vertices = np.asarray(vertices, dtype=np.uint32).reshape(-1, 2)
+        self.points = np.asarray(points, dtype=np.float32).reshape(-1, 2, 3)
+        self.thickness = np.asarray(thickness, dtype=np.float32).reshape(-1, 2)
+        self.colors = np.asarray(colors, dtype=np.float32).reshape(-1, 2, 3)
+
+    def __len__(self):
+        return len(self.vertices)
+
+def getWeldedIds(positions, tolerance):
+    """Map every vertex to a shared ID per (quantized) position
+
+        Vertices split along UV/normal seams share a position but not
+        an ID, so they'd otherwise produce duplicate segments.
+
+        :positions ndarray (V, 3)
+        :tolerance float Quantization step
+
+        :return ndarray (V,) int64
+    """
+    quantized = np.round(np.asarray(positions, dtype=np.float64) / tolerance).astype(np.int64)
+    return np.unique(quantized, axis=0, return_inverse=True)[1].reshape(-1)
+
+def getEdgeKeys(start, end, count):
+    """Hash undirected edges (start, end) into unique int64 keys
+
+        :count int Number of possible IDs
+    """
+    start = np.asarray(start, dtype=np.int64)
+    end = np.asarray(end, dtype=np.int64)
+    return np.minimum(start, end) * count + np.maximum(start, end)
+
+def buildCreaseEdgeBuffer(positions, colors, triangles, weld=None):
+    """Build the deduplicated crease edge buffer of a mesh
+
+        :positions ndarray (V, 3) Object space positions
+        :colors ndarray (V, 4) RGBA of the crease colorset per vertex
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+        :weld float If set, vertices closer than this are treated as one
+            when deduplicating (e.g. across split seams)
+
+        :return CreaseEdgeBuffer
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    colors = np.asarray(colors, dtype=np.float64).reshape(-1, 4)
+    alphas = colors[:, 3]
+
+    tri, start, end = getCreaseEdges(alphas, triangles)
+
+    ids = getWeldedIds(positions, weld) if weld else np.arange(len(positions))
+    keys = getEdgeKeys(ids[start], ids[end], len(positions))
+
+    # Keep the first occurrence of each edge, in triangle order
+    first = np.sort(np.unique(keys, return_index=True)[1])
+    vertices = np.stack((start[first], end[first]), axis=1)
+
+    return CreaseEdgeBuffer(
+        vertices,
+        positions[vertices],
+        alphas[vertices],
+        colors[vertices, :3]
+    )
+
+def encodeCreaseEdgeBuffer(buffer):
+    """Encode a CreaseEdgeBuffer to a string, e.g. for a string attribute"""
+    header = struct.pack(BUFFER_HEADER, BUFFER_MAGIC, BUFFER_VERSION, len(buffer))
+    payload = b''.join((
+        buffer.vertices.astype('<u4').tobytes(),
+        buffer.points.astype('<f4').tobytes(),
+        buffer.thickness.astype('<f4').tobytes(),
+        buffer.colors.astype('<f4').tobytes()
+    ))
+
+    return BUFFER_PREFIX + base64.b64encode(header + zlib.compress(payload)).decode('ascii')
+
+def decodeCreaseEdgeBuffer(encoded):
+    """Decode a string from encodeCreaseEdgeBuffer()
+
+        :return CreaseEdgeBuffer
+    """
+    if not encoded.startswith(BUFFER_PREFIX):
+        raise ValueError('Not a crease edge buffer')
+
+    data = base64.b64decode(encoded[len(BUFFER_PREFIX):])
+    magic, version, count = struct.unpack_from(BUFFER_HEADER, data)
+    if magic != BUFFER_MAGIC or version > BUFFER_VERSION:
+        raise ValueError('Unsupported crease edge buffer version {}'.format(version))
+
+    payload = zlib.decompress(data[struct.calcsize(BUFFER_HEADER):])
+    sizes = (count * 2 * 4, count * 6 * 4, count * 2 * 4, count * 6 * 4)
+    offsets = np.cumsum((0,) + sizes)
+
+    def read(i, dtype):
+        return np.frombuffer(payload[offsets[i]:offsets[i + 1]], dtype=dtype)
+
+    return CreaseEdgeBuffer(
+        read(0, '<u4'),
+        read(1, '<f4'),
+        read(2, '<f4'),
+        read(3, '<f4')
+    )
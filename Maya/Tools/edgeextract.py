@@ -0,0 +1,239 @@
+"""
+    Offline silhouette and crease edge extraction.
+
+    CPU mirror of the NPR shader's edge classification (the TCS and
+    drawSilhouette()/drawCreases() in NPR.ogsfx), run on a mesh exported
+    as arrays for a batch of camera positions at once. Used to precompute
+    edge lists for engines without geometry shaders and to check shader
+    output in regression tests without a GPU.
+
+    Classification happens on the source triangles, which is what the
+    shader does with tessellation disabled (u_TessInner = u_TessOuter = 1).
+    Like the geometry shader, a crease edge shared by two triangles is
+    emitted once per triangle.
+
+    Math is done in float32 by default to match the GPU.
+
+    Has no dependency on Maya, so it can be used from batch scripts.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import numpy as np
+
+# Matching defines in Utility.ogsfh
+EPSILON = 0.000001
+
+# Bias added to NdotV before taking its sign in getSilhouetteControlIndex()
+SILHOUETTE_BIAS = 0.0001
+
+def isPaintedAlpha(alphas):
+    """Check which alphas carry edge data, per unpackEdgeInfo()
+
+        :alphas ndarray Crease alpha per vertex
+
+        :return ndarray bool per vertex
+    """
+    a = np.asarray(alphas)
+    return np.floor((a * 100 - np.floor(a * 100)) * 100) == 12
+
+def getPaintedEdgeFlags(alphas, triangles):
+    """Which triangle corners the TCS flags as GEO_PAINTED_EDGE
+
+        A corner is flagged if it has a valid edge to the next corner,
+        or the opposite corner has one to it, where a valid edge goes
+        from a lower to a higher vertex ID (isValidEdge()).
+
+        :alphas ndarray (V,) Crease alpha per vertex
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+
+        :return ndarray (T, 3) bool
+    """
+    ids = np.asarray(triangles)
+    valid = isPaintedAlpha(alphas)[ids]
+
+    # Corner (i + 1) % 3 and (i + 2) % 3 of each corner i
+    nextIds = np.roll(ids, -1, axis=1)
+    nextValid = np.roll(valid, -1, axis=1)
+    oppositeIds = np.roll(ids, -2, axis=1)
+    oppositeValid = np.roll(valid, -2, axis=1)
+
+    return valid & (
+        (nextValid & (ids < nextIds)) |
+        (oppositeValid & (oppositeIds < ids))
+    )
+
+def getCreaseEdges(alphas, triangles):
+    """Every triangle edge drawn by drawCreases(), before backface culling
+
+        :alphas ndarray (V,) Crease alpha per vertex
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+
+        :return Tuple (triangle IDs, start vertex IDs, end vertex IDs)
+    """
+    triangles = np.asarray(triangles)
+    flags = getPaintedEdgeFlags(alphas, triangles)
+
+    tri, corner = np.nonzero(flags & np.roll(flags, -1, axis=1))
+    start = triangles[tri, corner]
+    end = triangles[tri, (corner + 1) % 3]
+
+    return (tri, start, end)
+
+def getNdotV(positions, normals, model, cameras, dtype=np.float32):
+    """NdotV per vertex for every camera position, as in the TCS
+
+        Normals are not normalized, matching the shader.
+
+        :positions ndarray (V, 3) Object space positions
+        :normals ndarray (V, 3) Object space normals
+        :model ndarray (4, 4) u_ModelMatrix (column vector convention)
+        :cameras ndarray (C, 3) World space camera positions (u_CameraMatrix[3])
+
+        :return ndarray (C, V)
+    """
+    model = np.asarray(model, dtype=dtype)
+    positions = np.asarray(positions, dtype=dtype)
+    normals = np.asarray(normals, dtype=dtype)
+    cameras = np.asarray(cameras, dtype=dtype).reshape(-1, 3)
+
+    worldPos = positions.dot(model[:3, :3].T) + model[:3, 3]
+    worldNormal = normals.dot(model[:3, :3].T)
+
+    # dot(N, cam - P) = dot(N, cam) - dot(N, P)
+    return cameras.dot(worldNormal.T) - np.sum(worldNormal * worldPos, axis=1)
+
+def getSilhouetteControlIndex(NdotV):
+    """Vectorized getSilhouetteControlIndex() over triangles
+
+        :NdotV ndarray (..., 3) NdotV of each triangle corner
+
+        :return ndarray (...) int of the corner whose sign differs from
+            the other two, or -1 if the triangle is not on a silhouette
+    """
+    s = np.sign(NdotV + SILHOUETTE_BIAS)
+    sNext = np.roll(s, -1, axis=-1)
+    sOpposite = np.roll(s, -2, axis=-1)
+
+    # First matching corner wins, like the shader's loop
+    control = (s != sNext) & (s != sOpposite)
+    return np.where(control.any(axis=-1), control.argmax(axis=-1), -1)
+
+def xprime(di, dj, xi, xj):
+    """Weighted silhouette point along the edge xi -> xj"""
+    di = np.abs(di)[:, None]
+    dj = np.abs(dj)[:, None]
+    L = di + dj
+    return (dj / L) * xi + (di / L) * xj
+
+def getSilhouetteSegments(positions, triangles, NdotV):
+    """Silhouette segment of every silhouette triangle for one view
+
+        :positions ndarray (V, 3) Object space positions
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+        :NdotV ndarray (V,) from getNdotV() for a single camera
+
+        :return Tuple (triangle IDs (S,), object space segments (S, 2, 3))
+    """
+    triangles = np.asarray(triangles)
+    d = NdotV[triangles]
+    control = getSilhouetteControlIndex(d)
+
+    tri = np.flatnonzero(control >= 0)
+    controlIdx = control[tri]
+    nextIdx = (controlIdx + 1) % 3
+    oppositeIdx = (nextIdx + 1) % 3
+
+    vControl = positions[triangles[tri, controlIdx]]
+    vNext = positions[triangles[tri, nextIdx]]
+    vOpposite = positions[triangles[tri, oppositeIdx]]
+
+    dControl = d[tri, controlIdx]
+    segments = np.stack((
+        xprime(dControl, d[tri, nextIdx], vControl, vNext),
+        xprime(dControl, d[tri, oppositeIdx], vControl, vOpposite)
+    ), axis=1)
+
+    return (tri, segments)
+
+def toWorld(points, model):
+    """Transform object space points (..., 3) by u_ModelMatrix"""
+    return points.dot(model[:3, :3].T) + model[:3, 3]
+
+def extractEdges(positions, normals, alphas, triangles, model, cameras,
+                 mvps=None, cullBackfaceCreases=False, cones=None, dtype=np.float32):
+    """Silhouette and crease segments of a mesh for a batch of views
+
+        :positions ndarray (V, 3) Object space positions
+        :normals ndarray (V, 3) Object space normals
+        :alphas ndarray (V,) Crease alpha per vertex (crease colorset alpha)
+        :triangles ndarray (T, 3) Vertex IDs per triangle. IDs stand in for
+            gl_VertexID, so they must index the arrays above.
+        :model ndarray (4, 4) u_ModelMatrix (column vector convention)
+        :cameras ndarray (C, 3) World space camera position per view
+        :mvps ndarray (C, 4, 4) u_MVPMatrix per view. Only required
+            for cullBackfaceCreases.
+        :cullBackfaceCreases bool Mirror u_CullBackfaceCreases
+        :cones NormalConeTree Optional hierarchy of the mesh (see normalcones.py)
+            so only candidate triangles are tested for silhouettes. Views are
+            scanned in full if the model matrix has non-uniform scale.
+
+        :return list One dict per view:
+            silhouetteTriangles (S,) source triangle of each segment
+            silhouettes (S, 2, 3) world space segments
+            creaseTriangles (K,) source triangle of each segment
+            creaseVertices (K, 2) vertex IDs of each segment
+            creases (K, 2, 3) world space segments
+            creaseThickness (K, 2) alpha at each end of the segment
+    """
+    positions = np.asarray(positions, dtype=dtype)
+    normals = np.asarray(normals, dtype=dtype)
+    alphas = np.asarray(alphas, dtype=dtype)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    model = np.asarray(model, dtype=dtype)
+    cameras = np.asarray(cameras, dtype=dtype).reshape(-1, 3)
+
+    NdotV = getNdotV(positions, normals, model, cameras, dtype)
+
+    # Crease edges only depend on the view when culling backfaces
+    creaseTri, start, end = getCreaseEdges(alphas, triangles)
+    creases = toWorld(np.stack((positions[start], positions[end]), axis=1), model)
+    creaseVertices = np.stack((start, end), axis=1)
+    creaseThickness = alphas[creaseVertices]
+
+    if cullBackfaceCreases:
+        if mvps is None:
+            raise ValueError('cullBackfaceCreases requires an MVP matrix per view')
+
+        mvps = np.asarray(mvps, dtype=dtype).reshape(-1, 4, 4)
+
+        # dot(u_MVPMatrix * vec4(normal, 0), vec4(0, 0, -1, 0)) per vertex
+        facing = -normals.dot(mvps[:, 2, :3].T).T >= EPSILON
+
+    if cones is not None:
+        from normalcones import getCandidateTriangles, getObjectSpaceCamera
+
+    views = []
+    for view in range(len(cameras)):
+        camera = None if cones is None else getObjectSpaceCamera(model, cameras[view])
+
+        if camera is None:
+            tri, segments = getSilhouetteSegments(positions, triangles, NdotV[view])
+        else:
+            candidates = getCandidateTriangles(cones, *camera)
+            tri, segments = getSilhouetteSegments(positions, triangles[candidates], NdotV[view])
+            tri = candidates[tri]
+
+        keep = slice(None)
+        if cullBackfaceCreases:
+            keep = facing[view][start] & facing[view][end]
+
+        views.append({
+            'silhouetteTriangles': tri,
+            'silhouettes': toWorld(segments, model),
+            'creaseTriangles': creaseTri[keep],
+            'creaseVertices': creaseVertices[keep],
+            'creases': creases[keep],
+            'creaseThickness': creaseThickness[keep]
+        })
+
+    return views
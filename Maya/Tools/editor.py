@@ -1,27 +1,62 @@
 """
     Maya Editor Dialog to go alongside the NPR shader suite.
 
-    Install as a shelf button.
+    Install as a shelf button. Crease alpha encoding lives in 
+    alphacodec.py, bounding box aggregation in boundingbox.py and crease 
+    edge baking in creasebuffer.py, which must be importable from Maya 
+    (e.g. placed alongside this script in the user scripts directory).
+    Timings in instrument.py are optional.
 
     @author Chase McManning <mcmanning.1@osu.edu>
 """
 import maya.cmds as cmds
-import math
+import maya.api.OpenMaya as om
+import re
+import numpy as np
+from collections import OrderedDict
+
+from alphacodec import (
+    breakAlphaV1,
+    breakAlphaV2,
+    makeAlphaV2,
+    breakAlphaV3,
+    makeAlphaV3,
+    migrateAlphasToV3
+)
+
+from boundingbox import (
+    aggregateMax,
+    aggregateMean,
+    aggregatePercentile,
+    updateSelectedBoundingBoxes,
+    BoundingBoxSync
+)
+
+from creasebuffer import buildCreaseEdgeBuffer, encodeCreaseEdgeBuffer
+
+# Opt-in timings of the crease tools, see instrument.py. Optional, 
+# like in VertexColorAnimator.py, so the editor runs without it.
+try:
+    import instrument
+except ImportError:
+    class instrument:
+        """No-op fallback for when instrument.py is not alongside this script"""
+        ENABLED = False
+
+        @staticmethod
+        def timed(name):
+            return lambda func: func
+
+        @staticmethod
+        def touched(count):
+            pass
 
 TITLE = "NPR Shader Tools"
 VERSION = "0.2"
 
-# Up/forward may swap depending on what workspace we're in (UE4 vs Maya)
-RIGHT = 0 # X
-UP = 1 # Y
-FORWARD = 2 # Z
-
 # Default vertex color when resetting a mesh (brownish)
 DEFAULT_COLOR = (0.346, 0.22, 0.134)
 
-# Shader vec3 uniform to store BBox calculations
-BOUNDING_BOX_UNIFORM = 'u_BoundingBox'
-
 ABOUT_MESSAGE = """
 {}
 
@@ -31,108 +66,19 @@ Author: Chase McManning <mcmanning.1@osu.edu>
 
 CREASE_COLORSET = "colorSet"
 
-def damm(val):
-    # Damm Algorithm matrix is sourced from:
-    # https://en.wikibooks.org/wiki/Algorithm_Implementation/Checksums/Damm_Algorithm#Python
-    matrix = (
-        (0, 3, 1, 7, 5, 9, 8, 6, 4, 2),
-        (7, 0, 9, 2, 1, 5, 4, 8, 6, 3),
-        (4, 2, 0, 6, 8, 7, 1, 3, 5, 9),
-        (1, 7, 5, 0, 9, 8, 3, 4, 2, 6),
-        (6, 1, 2, 3, 0, 4, 5, 9, 7, 8),
-        (3, 6, 7, 4, 2, 0, 9, 5, 8, 1),
-        (5, 8, 6, 9, 7, 2, 0, 1, 3, 4),
-        (8, 9, 4, 5, 3, 6, 2, 0, 1, 7),
-        (9, 4, 3, 8, 6, 1, 7, 2, 0, 5),
-        (2, 5, 8, 1, 4, 3, 6, 7, 9, 0)
-    )
-
-    # interim = 0
-    # interim = matrix[interim][math.floor(val/ 100)]
-    # interim = matrix[interim][math.floor(val % 100 / 10)]
-    # interim = matrix[interim][val % 10]
-
-    # Needs to support 3 or 4 digit numbers (for both encoding & decoding), 
-    # so we instead stringify and loop
-    sval = str(int(val))
-    interim = 0
-
-    for c in sval:
-        interim = matrix[interim][int(c)]
-
-    return interim
-
-def getAverageBoundingBox(shapes):
-    pass
+# Mesh string attribute holding the baked crease edge buffer (see creasebuffer.py)
+CREASE_EDGES_ATTR = "nprCreaseEdges"
 
-def getMaxBoundingBox(shapes):
-    """Return max bbox extents for all the input shapes
+# Per-mesh crease index (see getCreaseIndex), mapping a mesh 
+# DAG path to (vertex IDs, thicknesses, dirty callback ID)
+CREASE_INDEX_CACHE = {}
 
-        :shapes string[] DAG object list
+# Dirty callbacks of dropped crease indices, removed on the next 
+# lookup since a callback can't safely remove itself while running
+STALE_CREASE_CALLBACKS = []
 
-        :return Tuple (x, y, z)
-    """
-    # Calculate maximum BBox extents from all the connected shapes
-    shape = shapes.pop()
-    bboxMin = cmds.getAttr(shape + '.boundingBoxMin')[0]
-    bboxMax = cmds.getAttr(shape + '.boundingBoxMax')[0]
-
-    width = bboxMax[RIGHT] - bboxMin[RIGHT]
-    height = bboxMax[UP] - bboxMin[UP]
-    depth = bboxMax[FORWARD] - bboxMin[FORWARD]
-
-    for shape in shapes:
-        bboxMin = cmds.getAttr(shape + '.boundingBoxMin')[0]
-        bboxMax = cmds.getAttr(shape + '.boundingBoxMax')[0]
-
-        # Maximum extents
-        width = max(width, bboxMax[RIGHT] - bboxMin[RIGHT])
-        height = max(height, bboxMax[UP] - bboxMin[UP])
-        depth = max(depth, bboxMax[FORWARD] - bboxMin[FORWARD])
-
-    return (width, height, depth)
-
-def updateShaderAggregateBoundingBox(aggregate_callable):
-    """Update the u_BoundingBox uniform for all shaders attached
-        to the selected object to the aggregate bounding box of 
-        all shapes attached to each of those shaders. 
-
-        This gets a bit convoluted when dealing with multiple 
-        materials attached to each object and a shared BBox, but
-        in production BBox will be a uniform provided per-instance
-        rather than this aggregation. So this is more of an estimate
-        and works best in one-material-per-object development environments.
-
-        :aggregate_callable method to find a bounding box for a set of shapes.
-            Different algorithms can swapped here (max vs average)
-    """
-
-    paths = cmds.listRelatives(fullPath=True, shapes=True, noIntermediate=True)
-
-    # Update all attached shaders with the new extents
-    for path in paths:
-        engines = cmds.listConnections(path, type='shadingEngine')
-        
-        # Remove dupes
-        engines = list(set(engines))
-
-        for engine in engines:
-            # Grab materials on that engine
-            # Could also do listConnections(type='GLSLShader') but I may
-            # port it in the future... so we wrap with ls() instead.
-            materials = cmds.ls(cmds.listConnections(engine), mat=True)
-            materials = list(set(materials))
-        
-            # Grab all shapes connected to that engine
-            shapes = cmds.listConnections(engine, type='shape')
-
-            bbox = aggregate_callable(shapes)
-
-            # Update materials with new bounding boxe
-            for material in materials:
-                cmds.setAttr(material + '.' + BOUNDING_BOX_UNIFORM + 'X', bbox[0])
-                cmds.setAttr(material + '.' + BOUNDING_BOX_UNIFORM + 'Y', bbox[1])
-                cmds.setAttr(material + '.' + BOUNDING_BOX_UNIFORM + 'Z', bbox[2])
+# Scene new/open callbacks clearing CREASE_INDEX_CACHE, see watchSceneChanges
+SCENE_CALLBACKS = []
 
 def about(window):
     """Prompt with an about dialog"""
@@ -153,14 +99,19 @@ def getParent(selector):
 
     return selector
 
-def setColorset():
-    """Make sure the mesh has the right colorset enabled"""
+def setColorset(mesh=None):
+    """Make sure the mesh has the right colorset enabled
+
+        :mesh string Mesh to update. Defaults to the current selection.
+    """
+    target = [mesh] if mesh else []
+
     # Try to switch to the crease colorset. If we can't, make one. 
     try:
-        cmds.polyColorSet(currentColorSet=True, colorSet=CREASE_COLORSET)
+        cmds.polyColorSet(*target, currentColorSet=True, colorSet=CREASE_COLORSET)
     except RuntimeError:
-        cmds.polyColorSet(create=True, colorSet=CREASE_COLORSET)
-        cmds.polyColorSet(currentColorSet=True, colorSet=CREASE_COLORSET)
+        cmds.polyColorSet(*target, create=True, colorSet=CREASE_COLORSET)
+        cmds.polyColorSet(*target, currentColorSet=True, colorSet=CREASE_COLORSET)
 
     """TODO: Also apply the colorset to the shader if not already. E.g.:
 
@@ -170,118 +121,276 @@ def setColorset():
     updateRenderOverride;
     """
 
+def undoChunk(func):
+    """Decorator to group every change made by func into a single undo"""
+    def wrapper(*args, **kwargs):
+        cmds.undoInfo(openChunk=True, chunkName=func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+    return wrapper
+
+def getSelectedVertices():
+    """Resolve the current selection to vertex IDs, without changing it
+
+        Objects, faces and edges are converted to the vertices they cover.
+
+        :return OrderedDict mesh DAG path -> sorted vertex ID ndarray
+    """
+    meshes = OrderedDict()
+
+    selected = cmds.ls(selection=True)
+    if len(selected) < 1:
+        return meshes
+
+    selection = om.MSelectionList()
+    for component in cmds.polyListComponentConversion(selected, tv=True) or []:
+        selection.add(component)
+
+    for i in range(selection.length()):
+        dag_path, component = selection.getComponent(i)
+        if not dag_path.hasFn(om.MFn.kMesh):
+            continue
+
+        if component.isNull():
+            ids = np.arange(om.MFnMesh(dag_path).numVertices)
+        else:
+            ids = np.array(om.MFnSingleIndexedComponent(component).getElements())
+
+        path = dag_path.fullPathName()
+        if path in meshes:
+            ids = np.union1d(meshes[path], ids)
+
+        meshes[path] = np.unique(ids)
+
+    return meshes
+
+def getOrderedSelectedVertices():
+    """Resolve the ordered selection to vertex IDs, without changing it
+
+        Requires selection order tracking to be enabled in Maya.
+
+        :return OrderedDict mesh DAG path -> vertex ID ndarray in selection order.
+            Paths are the shape's full path, as with getSelectedVertices.
+    """
+    names = OrderedDict()
+    pattern = re.compile(r'^(.+)\.vtx\[(\d+)\]$')
+
+    for vertex in cmds.ls(orderedSelection=True, flatten=True) or []:
+        match = pattern.match(vertex)
+        if match:
+            names.setdefault(match.group(1), []).append(int(match.group(2)))
+
+    # Vertices are listed under the transform's short name
+    meshes = OrderedDict()
+    for name, ids in names.items():
+        selection = om.MSelectionList()
+        selection.add('{}.vtx[{}]'.format(name, ids[0]))
+        path = selection.getComponent(0)[0].fullPathName()
+        meshes.setdefault(path, []).extend(ids)
+
+    return OrderedDict((mesh, np.array(ids)) for mesh, ids in meshes.items())
+
+def getCreaseColors(mesh):
+    """Read every vertex color of the crease colorset in one call
+
+        :mesh string Mesh DAG path
+
+        :return ndarray (N, 4) RGBA. Vertices without a color are -1.
+    """
+    selection = om.MSelectionList()
+    selection.add(mesh)
+    colors = om.MFnMesh(selection.getDagPath(0)).getVertexColors(CREASE_COLORSET)
+
+    return np.array(colors, dtype=np.float64).reshape(-1, 4)
+
+def getComponentRanges(mesh, ids):
+    """Compress sorted vertex IDs into mesh.vtx[a:b] component strings"""
+    if len(ids) < 1:
+        return []
+
+    breaks = np.flatnonzero(np.diff(ids) != 1)
+    starts = np.concatenate(([ids[0]], ids[breaks + 1]))
+    ends = np.concatenate((ids[breaks], [ids[-1]]))
+
+    return [
+        '{}.vtx[{}]'.format(mesh, a) if a == b else '{}.vtx[{}:{}]'.format(mesh, a, b)
+        for a, b in zip(starts, ends)
+    ]
+
+def setCreaseAlphas(mesh, ids, alphas):
+    """Write crease alphas to a set of vertices without touching the selection
+
+        Vertices are grouped by alpha so that each distinct value is 
+        written with a single polyColorPerVertex call on a component 
+        list. Unlike MFnMesh.setVertexColors this keeps the edit on 
+        the undo queue (wrap callers with undoChunk).
+
+        :mesh string Mesh DAG path
+        :ids int[] Vertex IDs to update
+        :alphas float or float[] New alpha for each vertex ID
+    """
+    ids = np.asarray(ids)
+    if len(ids) < 1:
+        return
+
+    alphas = np.broadcast_to(alphas, ids.shape)
+    instrument.touched(len(ids))
+    setColorset(mesh)
+    invalidateCreaseIndex(mesh)
+
+    # Group on exact values. makeAlphaV3() gives the same alpha for every
+    # thickness in a step, and rounding would drop the signature digits
+    # that isValidAlphaV3() looks for once Maya stores them as float32.
+    values, groups = np.unique(alphas, return_inverse=True)
+    for i, value in enumerate(values):
+        subset = np.sort(ids[groups == i])
+        cmds.polyColorPerVertex(getComponentRanges(mesh, subset), a=float(value))
+
+@instrument.timed('crease.clear')
+@undoChunk
 def clear():
     """Modify the crease dataset for the selected vertices"""
-    setColorset()
-    
-    # Convert selection to vertices, set alpha channel for each, 
-    # then convert back to the previous selection
-    selected = cmds.ls(selection=True)
-    cmds.select(cmds.polyListComponentConversion(tv=True))
-    cmds.polyColorPerVertex(a=0)
-    cmds.select(selected)
+    for mesh, ids in getSelectedVertices().items():
+        setCreaseAlphas(mesh, ids, 0)
 
+@instrument.timed('crease.crease')
+@undoChunk
 def crease(thickness):
     """Modify the crease dataset for the selected vertices"""
-    setColorset()
-    
     # Ensure thickness is within [0.99, 0.01]
     # and apply a signature at the end to avoid interpolation errors
     a = min(0.99, max(0.01, thickness)) + 0.001230001 
 
-    # Convert selection to vertices, set alpha channel for each, 
-    # then convert back to the previous selection
-    selected = cmds.ls(selection=True)
-    cmds.select(cmds.polyListComponentConversion(tv=True))
-    cmds.polyColorPerVertex(a=a)
-    cmds.select(selected)
+    for mesh, ids in getSelectedVertices().items():
+        setCreaseAlphas(mesh, ids, a)
 
-def selectCreases():
-    """Select all vertices with crease data"""
-    # TODO: Support subset selection (select matches that are a subset of what we already selected)
-    selected = cmds.ls(selection=True)
-    if len(selected) < 1:
-        return
-    
-    cmds.select(getParent(selected[0]), replace=True)
-    cmds.select(cmds.polyListComponentConversion(tv=True))
+def getCreaseIndex(mesh):
+    """Packed index of every valid crease vertex on a mesh
 
-    vertices = cmds.ls(selection=True, flatten=True)
-    alphas = cmds.polyColorPerVertex(query=True, a=True)
+        Built with a single vectorized decode of the crease colorset
+        and cached until the mesh is next dirtied (e.g. repainted).
+
+        :mesh string Mesh DAG path
 
-    # TODO: faster?
-    subset = []
-    for i in range(0, len(alphas)):
-        if (breakAlphaV3(alphas[i]) > -1):
-            subset.append(vertices[i])
-            
-    cmds.select(subset, replace=True)
+        :return Tuple (vertex ID ndarray, thickness ndarray), sorted by ID
+    """
+    removeStaleCreaseCallbacks()
+
+    if mesh in CREASE_INDEX_CACHE:
+        ids, thicknesses, callback = CREASE_INDEX_CACHE[mesh]
+        return (ids, thicknesses)
+
+    thicknesses = breakAlphaV3(getCreaseColors(mesh)[:, 3])
+    ids = np.flatnonzero(thicknesses > -1)
+    thicknesses = thicknesses[ids]
+
+    selection = om.MSelectionList()
+    selection.add(mesh)
+    callback = om.MNodeMessage.addNodeDirtyCallback(
+        selection.getDependNode(0),
+        lambda *args: onCreaseIndexDirty(mesh)
+    )
 
+    CREASE_INDEX_CACHE[mesh] = (ids, thicknesses, callback)
+    return (ids, thicknesses)
 
-def breakAlphaV1(a):
-    """(legacy) Break alpha value into LOD, Bump, and Thickness
+def invalidateCreaseIndex(mesh):
+    """Drop the cached crease index of a mesh, if there is one
 
-        Currently uses 4 decimal places for the float, 
-        which should be.. safe..ish..
+        Not safe to call from the index's own dirty callback, 
+        which uses onCreaseIndexDirty instead.
     """
-    lod = math.floor(a * 10)
-    bump = math.floor(a * 100) - lod * 10
-    thickness = math.floor(a * 10000) - lod * 1000 - bump * 100
-    return (lod, bump, thickness)
+    removeStaleCreaseCallbacks()
 
+    entry = CREASE_INDEX_CACHE.pop(mesh, None)
+    if entry:
+        om.MMessage.removeCallback(entry[2])
 
-def breakAlphaV2(a):
-    """Break alpha value into LOD, Mode, Bump, and Thickness
+def onCreaseIndexDirty(mesh):
+    """Node dirty callback of a cached crease index
 
-        Version 2 uses a 4 decimal places, 3 to pack the above
-        and the 4th as a checksum value for the packed values.
+        Drops the index, but leaves its callback to be removed 
+        later by removeStaleCreaseCallbacks, as removing a callback 
+        from inside its own invocation isn't safe in OpenMaya.
     """
-    # Default value: invalid crease
-    lod = -1
-    mode = 0
-    bump = 0
-    thickness = 0
-
-    # Only extract from alphas with a valid checksum
-    checksum = damm(math.floor(a * 10000))
-    if checksum == 0:
-        x = int(math.floor(a * 1000))
-        lod = (x & 768) / 256
-        mode = (x & 192) / 64
-        bump = (x & 32) / 32
-        thickness = x & 31
-
-    return (lod, mode, bump, thickness)
-
-
-def makeAlphaV2(lod, mode, bump, thickness):
-    """Make an alpha value from LOD/mode/bump/thickness"""
-    # Re-encode components into a single value
-    a = int(lod) * 256 | int(mode) * 64 | int(bump) * 32 | int(thickness)
-
-    # print('makeAlphaV2 a: {}'.format(a))
-
-    # Offset to the [0,1) range and append a checksum
-    # An extra 0.00001 is added to correct for rounding errors 
-    # with pushing between Python and Maya. Unused in decoding.
-    checksum = damm(a)
-    # print('makeAlphaV2 checksum: {}'.format(checksum))
-
-    a = (a * 100.0 + checksum * 10.0 + 1) / 100000.0
-
-    # print('makeAlphaV2 final: {}'.format(a))
-    return a
-
-def breakAlphaV3(a):
-    """Returns -1 on an invalid alpha. Otherwise, returns thickness """
-    if (math.floor((a * 100.0 - math.floor(a * 100.0)) * 10000) == 1230):
-        return math.floor(a * 100.0) / 100.0
-    
-    return -1
+    entry = CREASE_INDEX_CACHE.pop(mesh, None)
+    if entry:
+        STALE_CREASE_CALLBACKS.append(entry[2])
+
+def removeStaleCreaseCallbacks():
+    """Remove dirty callbacks left behind by onCreaseIndexDirty"""
+    if STALE_CREASE_CALLBACKS:
+        om.MMessage.removeCallbacks(STALE_CREASE_CALLBACKS)
+        del STALE_CREASE_CALLBACKS[:]
+
+def clearCreaseIndices(*args):
+    """Drop every cached crease index and remove all of their callbacks
+
+        Registered to run before a new scene is created or opened, 
+        so callbacks don't outlive the meshes they watch.
+    """
+    callbacks = [entry[2] for entry in CREASE_INDEX_CACHE.values()]
+    callbacks += STALE_CREASE_CALLBACKS
+
+    if callbacks:
+        om.MMessage.removeCallbacks(callbacks)
+
+    CREASE_INDEX_CACHE.clear()
+    del STALE_CREASE_CALLBACKS[:]
+
+def watchSceneChanges():
+    """Clear crease indices whenever a new scene is created or opened"""
+    if SCENE_CALLBACKS:
+        om.MMessage.removeCallbacks(SCENE_CALLBACKS)
+
+    SCENE_CALLBACKS[:] = [
+        om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, clearCreaseIndices),
+        om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, clearCreaseIndices)
+    ]
+
+@instrument.timed('crease.selectCreases')
+def selectCreases(subset=False, thickness_range=(0.0, 1.0)):
+    """Select vertices with crease data
+
+        :subset bool If true, only select creases within the current selection.
+            Otherwise every crease of the selected meshes is selected.
+        :thickness_range Tuple (min, max) inclusive thickness to select
+    """
+    selection = getSelectedVertices()
+    if len(selection) < 1:
+        return
+
+    components = []
+    for mesh, selected_ids in selection.items():
+        ids, thicknesses = getCreaseIndex(mesh)
+
+        mask = (thicknesses >= thickness_range[0]) & (thicknesses <= thickness_range[1])
+        if subset:
+            mask &= np.isin(ids, selected_ids, assume_unique=True)
+
+        instrument.touched(len(ids))
+
+        components += getComponentRanges(mesh, ids[mask])
+
+    if len(components) > 0:
+        cmds.select(components, replace=True)
+    else:
+        cmds.select(clear=True)
+
+def selectCreasesInRange(field, subset):
+    """Select creases filtered by the thickness range set in the UI
+
+        :field string floatFieldGrp containing the min/max thickness
+        :subset bool If true, only select creases within the current selection.
+    """
+    thickness_range = cmds.floatFieldGrp(field, query=True, value=True)
+    selectCreases(subset, (min(thickness_range), max(thickness_range)))
 
-def makeAlphaV3(thickness):
-    return math.floor(thickness * 100.0) / 100.0 + 0.001230001
 
+@instrument.timed('crease.sharpenCrease')
+@undoChunk
 def sharpenCrease(slider):
     """Sharpen (reduce width) of selected creased vertices.
         First vertex will be given a small width, and progress
@@ -290,49 +399,76 @@ def sharpenCrease(slider):
     min_thickness = cmds.floatSliderGrp(slider, query=True, value=True)
     min_thickness = min_thickness + 0.1
 
-    selected = cmds.ls(orderedSelection=True, flatten=True)
-    if len(selected) < 1:
-        return
+    for mesh, ids in getOrderedSelectedVertices().items():
+        alphas = getCreaseColors(mesh)[ids, 3]
+        thickness = breakAlphaV3(alphas[-1])
 
-    alphas = cmds.polyColorPerVertex(query=True, a=True)
-    thickness = breakAlphaV3(alphas.pop())
+        # If minimum is greater than maximum, then all vertices will
+        # gain the same thickness 
+        max_thickness = max(thickness, min_thickness)
 
-    # If minimum is greater than maximum, then all vertices will
-    # gain the same thickness 
-    max_thickness = max(thickness, min_thickness)
+        # Edge case: if there's only one vertex selected, set that
+        # vertex to whatever the slider says. 
+        if len(ids) < 2:
+            max_thickness = min_thickness
 
-    # Edge case: if there's only one vertex selected, set that
-    # vertex to whatever the slider says. 
-    if len(alphas) < 1:
-        max_thickness = min_thickness
+        # Every vert in the list increments to the local maximum, 
+        # with the last vert in the list set to maximum 
+        flen = max(len(ids) - 1, 1) * 1.0
+        ramp = np.arange(len(ids)) / flen
+        thickness = min_thickness + ramp * (max_thickness - min_thickness)
 
-    # Set the last vert in the list to maximum 
-    print(selected[-1])
-    print(max_thickness)
+        # makeAlphaV3 quantizes the ramp to the 0.01 thickness steps V3 
+        # can store, so neighbouring vertices share an alpha and 
+        # setCreaseAlphas writes each step with one call (at most 100 
+        # per mesh, however many vertices are selected)
+        setCreaseAlphas(mesh, ids, makeAlphaV3(thickness))
 
-    cmds.select(selected[-1], replace=True)
-    cmds.polyColorPerVertex(a=makeAlphaV3(max_thickness))
-    
-    # Set every other vert in the list to increment to the local maximum 
-    flen = len(alphas) * 1.0
-    for i in range(0, len(alphas)):
-        thickness = min_thickness + (i / flen) * (max_thickness - min_thickness)
 
-        print(selected[i])
-        print(thickness)
-        print(makeAlphaV3(thickness))
+def getMeshTriangles(mesh):
+    """Object space points and triangulated vertex IDs of a mesh
 
-        cmds.select(selected[i], replace=True)
-        cmds.polyColorPerVertex(a=makeAlphaV3(thickness))
+        :mesh string Mesh DAG path
 
-    # Restore selection
-    cmds.select(selected, replace=True)
-    selected = cmds.ls(orderedSelection=True, flatten=True)
-    print('-----')
-    print(selected)
-    alphas = cmds.polyColorPerVertex(query=True, a=True)
-    print(alphas)
+        :return Tuple (points ndarray (N, 3), triangles ndarray (T, 3))
+    """
+    selection = om.MSelectionList()
+    selection.add(mesh)
+    fn = om.MFnMesh(selection.getDagPath(0))
+
+    points = np.array(fn.getPoints(om.MSpace.kObject), dtype=np.float64)[:, :3]
+    counts, vertices = fn.getTriangles()
+
+    return (points, np.array(vertices, dtype=np.int64).reshape(-1, 3))
+
+@instrument.timed('crease.bakeCreaseEdges')
+@undoChunk
+def bakeCreaseEdges():
+    """Store a deduplicated crease edge buffer on each selected mesh
+
+        Lets a crease-only pass draw segments directly instead of
+        re-deriving crease edges per triangle every frame. Needs to
+        be re-baked after creases or topology change.
+
+        :return dict Mesh DAG path -> number of crease edges baked
+    """
+    counts = OrderedDict()
+    for mesh in getSelectedVertices().keys():
+        points, triangles = getMeshTriangles(mesh)
+        buffer = buildCreaseEdgeBuffer(points, getCreaseColors(mesh), triangles)
 
+        if not cmds.attributeQuery(CREASE_EDGES_ATTR, node=mesh, exists=True):
+            cmds.addAttr(mesh, longName=CREASE_EDGES_ATTR, dataType='string')
+
+        cmds.setAttr(
+            mesh + '.' + CREASE_EDGES_ATTR, 
+            encodeCreaseEdgeBuffer(buffer), 
+            type='string'
+        )
+
+        counts[mesh] = len(buffer)
+
+    return counts
 
 def softenModel():
     """Applies polySoftEdge softening to all edges in the model"""
@@ -365,6 +501,8 @@ def resetMesh():
     # Restore selection
     cmds.select(selected, replace=True)
 
+@instrument.timed('crease.migrate2to3')
+@undoChunk
 def migrate2to3():
     """Migrate version 2 of the alpha set of a mesh to version 3.
 
@@ -379,9 +517,18 @@ def migrate2to3():
         * Rather than using Damm to (slowly) validate vertices, we'll have fixed digits
             "0.xx1230" that are used to validate the vertex. Deviation from this will be 
             marked as invalid. 
+
+        Use batchmigrate.py to migrate whole scenes or directories of scenes.
     """
-    pass
+    for mesh, ids in getSelectedVertices().items():
+        alphas = getCreaseColors(mesh)[ids, 3]
+        migrated = migrateAlphasToV3(alphas, 2)
 
+        changed = migrated != alphas
+        setCreaseAlphas(mesh, ids[changed], migrated[changed])
+
+@instrument.timed('crease.migrate1to2')
+@undoChunk
 def migrate1to2():
     """Migrate version 1 of the alpha set of a mesh to version 2.
     
@@ -390,38 +537,31 @@ def migrate1to2():
         the amount of bits actually needed and then adds a Damm algorithm
         checksum as a last digit. 
     """
-    selected = cmds.ls(selection=True)
-    cmds.select(cmds.polyListComponentConversion(tv=True))
-
-    vertices = cmds.ls(selection=True, flatten=True)
-    alphas = cmds.polyColorPerVertex(query=True, a=True)
+    for mesh, ids in getSelectedVertices().items():
+        alphas = getCreaseColors(mesh)[ids, 3]
 
-    for i in range(len(alphas)):
-        lod, bump, thickness = breakAlphaV1(alphas[i])
+        lod, bump, thickness = breakAlphaV1(alphas)
         mode = 0 # Not supported in v1, assume default mode 0
 
-        if (lod > 0):
-            # Scale thickness down to [0,31] from [0,99]
-            thickness = math.floor(thickness / 3.1)
+        # Only vertices with crease data are migrated
+        migrate = lod > 0
 
-            # Lower LOD by 1 value so LOD0 = 0, etc
-            lod = lod - 1
+        # Scale thickness down to [0,31] from [0,99]
+        thickness = np.floor(thickness[migrate] / 3.1)
 
-            a = makeAlphaV2(lod, mode, bump, thickness)
+        # Lower LOD by 1 value so LOD0 = 0, etc
+        lod = lod[migrate] - 1
 
-            cmds.select(vertices[i], replace=True)
-            cmds.polyColorPerVertex(a=a)
-    
-    # Restore selection
-    cmds.select(selected, replace=True)
+        a = makeAlphaV2(lod, mode, bump[migrate], thickness)
+        setCreaseAlphas(mesh, ids[migrate], a)
 
 def testA():
     selected = cmds.ls(selection=True)
     cmds.select(cmds.polyListComponentConversion(tv=True))
     alphas = cmds.polyColorPerVertex(query=True, a=True)
+    decoded = breakAlphaV2(np.array(alphas))
 
-    for alpha in alphas:
-        lod, mode, bump, thickness = breakAlphaV2(alpha)
+    for alpha, lod, mode, bump, thickness in zip(alphas, *decoded):
         print('{} - V2 LOD: {}, Mode: {}, Bump: {}, Thickness: {}'.format(
             alpha, lod, mode, bump, thickness
         ))
@@ -461,10 +601,25 @@ def addCreaseGroup(window):
     cmds.rowLayout(numberOfColumns=4)
     cmds.button(label="Clear Selected", command="clear()")
     cmds.button(label="Crease", command="crease(1.0)")
+    cmds.button(label="Bake Edges", command="bakeCreaseEdges()")
     cmds.setParent("..")
 
+    thickness_range = cmds.floatFieldGrp(
+        label="Thickness Range",
+        numberOfFields=2,
+        value1=0.0,
+        value2=1.0
+    )
+
     cmds.rowLayout(numberOfColumns=4)
-    cmds.button(label="Select All", command="selectCreases()")
+    cmds.button(
+        label="Select All", 
+        command="selectCreasesInRange(\"" + thickness_range + "\", False)"
+    )
+    cmds.button(
+        label="Select In Selection", 
+        command="selectCreasesInRange(\"" + thickness_range + "\", True)"
+    )
     cmds.setParent("..")
 
     cmds.columnLayout(rowSpacing=5)
@@ -485,7 +640,7 @@ def addCreaseGroup(window):
 def addMiscGroup(window):
     """Misc relevant tools"""
     cmds.frameLayout(label="Misc Tools")
-    cmds.rowColumnLayout(numberOfColumns=5)
+    cmds.rowColumnLayout(numberOfColumns=4)
 
     cmds.button(label="Soften all edges", command="softenModel()")
     cmds.button(label="Delete History", command="cmds.DeleteHistory()")
@@ -493,7 +648,20 @@ def addMiscGroup(window):
     cmds.button(label="Test A", command="testA()")
     cmds.button(
         label="Update BBox (MAX)", 
-        command="updateShaderAggregateBoundingBox(getMaxBoundingBox)"
+        command="updateSelectedBoundingBoxes(aggregateMax)"
+    )
+    cmds.button(
+        label="Update BBox (AVG)", 
+        command="updateSelectedBoundingBoxes(aggregateMean)"
+    )
+    cmds.button(
+        label="Update BBox (P90)", 
+        command="updateSelectedBoundingBoxes(aggregatePercentile(90))"
+    )
+    cmds.checkBox(
+        label="Live BBox (MAX)",
+        value=BoundingBoxSync.isEnabled(),
+        changeCommand="BoundingBoxSync.toggle(#1)"
     )
 
     cmds.setParent("..")
@@ -504,11 +672,14 @@ def addLegacyGroup(window):
 
     cmds.rowLayout(numberOfColumns=4)
     cmds.button(label="Migrate 1->2", command="migrate1to2()")
+    cmds.button(label="Migrate 2->3", command="migrate2to3()")
 
     cmds.setParent("..")
     cmds.setParent("..")
 
 def openEditor():        
+    watchSceneChanges()
+
     window = cmds.window(title=TITLE, iconName=TITLE) # , widthHeight=(200, 55))
     cmds.columnLayout(adjustableColumn=True)
 
@@ -521,4 +692,5 @@ def openEditor():
     
     cmds.showWindow(window)
 
-openEditor()
+if __name__ == '__main__':
+    openEditor()
@@ -0,0 +1,185 @@
+"""Lightweight timing instrumentation for the Maya tool scripts
+
+Hot entry points (keying, playback transitions, cache save/load,
+crease edits) are wrapped with timed(), which records call counts,
+cumulative and p95 latency, and how many vertices each call touched
+(reported from inside the call through touched()).
+
+Disabled by default. While disabled, a wrapped call costs a single
+flag check, and touched() returns immediately.
+
+Usage:
+
+    import instrument
+    instrument.enable()
+    ...  # Use the tools
+    print(instrument.format_report())
+    instrument.dump('profile.json')
+
+@author Chase McManning <cmcmanning@gmail.com>
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from functools import wraps
+
+# Number of most recent samples kept per entry point for percentiles
+SAMPLE_LIMIT = 10000
+
+# Whether timed() wrappers record anything. Toggle with enable()/disable().
+ENABLED = False
+
+# time.perf_counter is Python 3 only (Maya 2022+)
+clock = getattr(time, 'perf_counter', time.time)
+
+_stats = dict()
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Stat:
+    """Accumulated timings of a single entry point"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.vertices = 0
+        self.samples = deque(maxlen=SAMPLE_LIMIT)
+
+    def percentile(self, q):
+        """Latency at percentile q of the retained samples, in seconds"""
+        if not self.samples:
+            return 0.0
+
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100.0 * len(ordered)))]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p95': self.percentile(95),
+            'vertices': self.vertices
+        }
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _stats.clear()
+
+def timed(name):
+    """Decorator to record timings of func under name while enabled
+
+    Parameters:
+        name (str): Entry point name, e.g. 'playback.transition'
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+
+            # Vertices reported by touched() during this call
+            stack = getattr(_local, 'stack', None)
+            if stack is None:
+                stack = _local.stack = []
+            stack.append(0)
+
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                vertices = stack.pop()
+                record(name, elapsed, vertices)
+
+                # Nested calls count towards their callers as well
+                if stack:
+                    stack[-1] += vertices
+
+        return wrapper
+    return decorator
+
+def touched(count):
+    """Report vertices read or written by the innermost timed() call
+
+    Parameters:
+        count (int): Number of vertices
+    """
+    if not ENABLED:
+        return
+
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1] += int(count)
+
+def record(name, elapsed, vertices=0):
+    """Add a single sample for an entry point
+
+    Parameters:
+        name (str): Entry point name
+        elapsed (float): Call duration in seconds
+        vertices (int): Vertices touched by the call
+    """
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = Stat()
+
+        stat.count += 1
+        stat.total += elapsed
+        stat.vertices += vertices
+        stat.samples.append(elapsed)
+
+def report():
+    """Snapshot of every entry point's stats
+
+    Returns:
+        dict: Entry point name -> stats dict, see Stat.to_dict()
+    """
+    with _lock:
+        return dict((name, stat.to_dict()) for name, stat in _stats.items())
+
+def format_report():
+    """Human readable table of report(), slowest cumulative time first
+
+    Returns:
+        str: Table text
+    """
+    rows = sorted(report().items(), key=lambda row: -row[1]['total'])
+
+    lines = ['{:32} {:>8} {:>10} {:>10} {:>10} {:>12}'.format(
+        'Entry point', 'Calls', 'Total ms', 'Mean ms', 'p95 ms', 'Vertices'
+    )]
+    for name, stat in rows:
+        lines.append('{:32} {:>8} {:>10.2f} {:>10.3f} {:>10.3f} {:>12}'.format(
+            name,
+            stat['count'],
+            stat['total'] * 1000,
+            stat['mean'] * 1000,
+            stat['p95'] * 1000,
+            stat['vertices']
+        ))
+
+    return '\n'.join(lines)
+
+def dump(path):
+    """Write report() to a JSON file
+
+    Parameters:
+        path (str): Output file path
+    """
+    with open(path, 'w') as f:
+        json.dump(report(), f, indent=2, sort_keys=True)
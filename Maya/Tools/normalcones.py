@@ -0,0 +1,357 @@
+"""
+    Normal cone hierarchy for silhouette candidate lookup.
+
+    The TCS computes NdotV for every corner of every patch each frame just
+    to find the few triangles on the silhouette (corners whose NdotV signs
+    differ, see getSilhouetteControlIndex()). This builds a bounding volume
+    hierarchy over a mesh's triangles offline, where every node bounds its
+    corners with a sphere and its corner normals with a cone. For a camera
+    position, whole nodes that are entirely front or back facing can then
+    be skipped without looking at their triangles.
+
+    Triangles are split at the median of whichever of their centroid or
+    face normal components varies most, so leaves (clusters) are tight
+    both spatially and in normal direction.
+
+    Culling is conservative: candidates are a superset of the triangles
+    getSilhouetteControlIndex() accepts for the same view.
+
+    Serialized layout (little endian) before zlib and base64 encoding:
+
+        header   '<4sHII' magic 'NPRN', version, node count (N), triangle count (T)
+        centers  float32  (N, 3) bounding sphere centers
+        radii    float32  (N,) bounding sphere radii
+        axes     float32  (N, 3) normal cone axes
+        cosines  float32  (N,) cosine of each cone's half angle
+        minimums float32  (N,) shortest corner normal per node
+        children int32    (N, 2) child node IDs, -1 for leaves
+        ranges   uint32   (N, 2) start and count of each node in order
+        order    uint32   (T,) triangle IDs, grouped by node
+
+    Has no dependency on Maya, so it can be used from batch scripts.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import struct
+import zlib
+import base64
+import numpy as np
+
+from edgeextract import SILHOUETTE_BIAS, getSilhouetteControlIndex
+
+TREE_PREFIX = 'NPRN:'
+TREE_MAGIC = b'NPRN'
+TREE_VERSION = 1
+TREE_HEADER = '<4sHII'
+
+# Maximum triangles per leaf cluster
+LEAF_SIZE = 64
+
+# Weight of face normal direction vs (extent normalized) position when splitting
+NORMAL_WEIGHT = 1.0
+
+# Relative slack on the culling bounds, to stay conservative
+# against float32 rounding of NdotV on the GPU/in edgeextract
+CULL_EPSILON = 0.00001
+
+class NormalConeTree:
+    """Bounding sphere and normal cone hierarchy over a mesh's triangles
+
+        Node 0 is the root. Node n covers triangles
+        order[ranges[n, 0]:ranges[n, 0] + ranges[n, 1]].
+    """
+
+    def __init__(self, centers, radii, axes, cosines, minimums, children, ranges, order):
+        """
+            :centers ndarray (N, 3) Bounding sphere center per node
+            :radii ndarray (N,) Bounding sphere radius per node
+            :axes ndarray (N, 3) Unit normal cone axis per node
+            :cosines ndarray (N,) Cosine of each cone's half angle
+            :minimums ndarray (N,) Length of the shortest corner normal per node
+            :children ndarray (N, 2) Child node IDs, -1 for leaves
+            :ranges ndarray (N, 2) Start and count of each node in order
+            :order ndarray (T,) Triangle IDs, grouped by node
+        """
+        self.centers = np.asarray(centers, dtype=np.float32).reshape(-1, 3)
+        self.radii = np.asarray(radii, dtype=np.float32).reshape(-1)
+        self.axes = np.asarray(axes, dtype=np.float32).reshape(-1, 3)
+        self.cosines = np.asarray(cosines, dtype=np.float32).reshape(-1)
+        self.minimums = np.asarray(minimums, dtype=np.float32).reshape(-1)
+        self.children = np.asarray(children, dtype=np.int32).reshape(-1, 2)
+        self.ranges = np.asarray(ranges, dtype=np.uint32).reshape(-1, 2)
+        self.order = np.asarray(order, dtype=np.uint32).reshape(-1)
+
+    def __len__(self):
+        return len(self.centers)
+
+    def getLeaves(self):
+        """Node IDs of every leaf cluster"""
+        return np.flatnonzero(self.children[:, 0] < 0)
+
+def getNodeBounds(corners, normals):
+    """Bounding sphere and normal cone of a set of triangle corners
+
+        :corners ndarray (C, 3) Corner positions
+        :normals ndarray (C, 3) Corner normals
+
+        :return Tuple (center, radius, axis, cosine, minimum normal length)
+    """
+    low = corners.min(axis=0)
+    high = corners.max(axis=0)
+    center = (low + high) * 0.5
+    radius = np.sqrt(np.max(np.sum((corners - center) ** 2, axis=1)))
+
+    lengths = np.sqrt(np.sum(normals ** 2, axis=1))
+    nonzero = lengths > 0
+    unit = normals[nonzero] / lengths[nonzero, None]
+
+    # Zero length normals make NdotV 0, which is covered by the
+    # minimum length below rather than the cone
+    axis = unit.sum(axis=0)
+    axisLength = np.sqrt(np.sum(axis ** 2))
+    if len(unit) < 1 or axisLength < 1e-6:
+        return (center, radius, np.array((0.0, 0.0, 1.0)), -1.0, lengths.min())
+
+    axis /= axisLength
+    cosine = max(-1.0, np.min(unit.dot(axis)))
+
+    return (center, radius, axis, cosine, lengths.min())
+
+def buildNormalConeTree(positions, normals, triangles, leafSize=LEAF_SIZE):
+    """Build the hierarchy for a mesh
+
+        :positions ndarray (V, 3) Vertex positions
+        :normals ndarray (V, 3) Vertex normals, in the same space
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+        :leafSize int Maximum triangles per leaf
+
+        :return NormalConeTree
+    """
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+
+    if len(triangles) < 1:
+        return NormalConeTree((), (), (), (), (), (), (), ())
+
+    corners = positions[triangles]
+    cornerNormals = normals[triangles]
+
+    # Split keys: centroid scaled to the mesh extent, and face normal direction
+    extent = max(np.max(np.ptp(positions, axis=0)) if len(positions) else 0.0, 1e-12)
+    faceNormals = cornerNormals.sum(axis=1)
+    faceNormals /= np.maximum(np.sqrt(np.sum(faceNormals ** 2, axis=1)), 1e-12)[:, None]
+    keys = np.concatenate((corners.mean(axis=1) / extent, faceNormals * NORMAL_WEIGHT), axis=1)
+
+    order = np.arange(len(triangles), dtype=np.int64)
+    bounds = []
+    children = []
+    ranges = []
+
+    # (start, count, parent node, child slot)
+    stack = [(0, len(triangles), -1, 0)]
+    while stack:
+        start, count, parent, slot = stack.pop()
+        node = len(bounds)
+        if parent >= 0:
+            children[parent][slot] = node
+
+        ids = order[start:start + count]
+        bounds.append(getNodeBounds(corners[ids].reshape(-1, 3), cornerNormals[ids].reshape(-1, 3)))
+        children.append([-1, -1])
+        ranges.append((start, count))
+
+        if count <= leafSize:
+            continue
+
+        nodeKeys = keys[ids]
+        axis = np.argmax(nodeKeys.var(axis=0))
+        half = count // 2
+        order[start:start + count] = ids[np.argpartition(nodeKeys[:, axis], half)]
+
+        stack.append((start + half, count - half, node, 1))
+        stack.append((start, half, node, 0))
+
+    center, radius, axis, cosine, minimum = (
+        np.array(values, dtype=np.float64) for values in zip(*bounds)
+    )
+
+    # Round bounds outward when storing as float32
+    radius = np.nextafter(np.float32(radius), np.float32(np.inf))
+    cosine = np.nextafter(np.float32(cosine), np.float32(-np.inf))
+    minimum = np.nextafter(np.float32(minimum), np.float32(-np.inf))
+
+    return NormalConeTree(center, radius, axis, cosine, minimum, children, ranges, order)
+
+def getObjectSpaceCamera(model, camera):
+    """World space camera position in the tree's object space
+
+        NdotV signs only survive the transform to object space if
+        u_ModelMatrix is a rotation, translation and uniform scale s.
+        World space NdotV is then s^2 times object space NdotV, which
+        matters once SILHOUETTE_BIAS is added before taking the sign.
+
+        :model ndarray (4, 4) u_ModelMatrix (column vector convention)
+        :camera ndarray (3,) World space camera position
+
+        :return Tuple (object space camera ndarray (3,), NdotV scale s^2),
+            or None if the model matrix has non-uniform scale or shear
+            (culling is then not safe)
+    """
+    model = np.asarray(model, dtype=np.float64)
+    linear = model[:3, :3]
+
+    gram = linear.T.dot(linear)
+    scale = np.trace(gram) / 3.0
+    if scale <= 0 or not np.allclose(gram, np.eye(3) * scale, rtol=1e-5, atol=1e-8 * scale):
+        return None
+
+    camera = np.linalg.solve(linear, np.asarray(camera, dtype=np.float64) - model[:3, 3])
+    return (camera, scale)
+
+def cullNodes(tree, nodes, camera, scale=1.0):
+    """Which nodes may contain silhouette triangles for a camera
+
+        A node is skipped when scale * dot(n, camera - p) + SILHOUETTE_BIAS
+        has the same sign for every corner normal n in its cone and corner p
+        in its sphere.
+
+        :nodes ndarray Node IDs to test
+        :camera ndarray (3,) Camera position in object space
+        :scale float Object to world space NdotV scale (see getObjectSpaceCamera())
+
+        :return ndarray bool per node, True to visit
+    """
+    v = camera - tree.centers[nodes]
+    distance = np.sqrt(np.sum(v ** 2, axis=1))
+    radius = tree.radii[nodes]
+    cosTheta = tree.cosines[nodes].astype(np.float64)
+    sinTheta = np.sqrt(np.maximum(0.0, 1.0 - cosTheta ** 2))
+
+    cosPhi = np.where(
+        distance > 0,
+        np.sum(tree.axes[nodes] * v, axis=1) / np.maximum(distance, 1e-30),
+        1.0
+    )
+    sinPhi = np.sqrt(np.maximum(0.0, 1.0 - cosPhi ** 2))
+
+    # Range of dot(n, camera - center) over the cone is
+    # |v| * [cos(min(pi, phi + theta)), cos(max(0, phi - theta))]
+    upperCos = np.where(cosPhi >= cosTheta, 1.0, cosPhi * cosTheta + sinPhi * sinTheta)
+    lowerCos = np.where(cosPhi <= -cosTheta, -1.0, cosPhi * cosTheta - sinPhi * sinTheta)
+
+    # Moving the corner within the sphere shifts it by at most the radius
+    margin = CULL_EPSILON * (distance + radius)
+    upper = distance * upperCos + radius + margin
+    lower = distance * lowerCos - radius - margin
+
+    minimum = tree.minimums[nodes]
+    front = lower > 0
+    back = (minimum > 0) & (upper * minimum * scale < -SILHOUETTE_BIAS)
+
+    return ~(front | back)
+
+def getCandidateTriangles(tree, camera, scale=1.0):
+    """Triangles that may be on the silhouette for a camera position
+
+        Walks the tree one level at a time, skipping nodes (and all of
+        their triangles) that are entirely front or back facing.
+
+        :tree NormalConeTree
+        :camera ndarray (3,) Camera position in the tree's object space
+            (see getObjectSpaceCamera())
+        :scale float Object to world space NdotV scale (see getObjectSpaceCamera())
+
+        :return ndarray sorted triangle IDs
+    """
+    camera = np.asarray(camera, dtype=np.float64).reshape(3)
+    if len(tree) < 1:
+        return np.zeros(0, dtype=np.int64)
+
+    leaves = []
+    nodes = np.zeros(1, dtype=np.int64)
+    while len(nodes):
+        nodes = nodes[cullNodes(tree, nodes, camera, scale)]
+
+        isLeaf = tree.children[nodes, 0] < 0
+        leaves.append(nodes[isLeaf])
+        nodes = tree.children[nodes[~isLeaf]].reshape(-1).astype(np.int64)
+
+    leaves = np.concatenate(leaves)
+    if len(leaves) < 1:
+        return np.zeros(0, dtype=np.int64)
+
+    start = tree.ranges[leaves, 0].astype(np.int64)
+    count = tree.ranges[leaves, 1].astype(np.int64)
+
+    # Concatenated order[start:start + count] of every leaf
+    offsets = np.repeat(start - np.cumsum(count) + count, count)
+    ids = tree.order[offsets + np.arange(count.sum())]
+
+    return np.sort(ids).astype(np.int64)
+
+def getSilhouetteTriangles(tree, positions, normals, triangles, camera, scale=1.0,
+                           dtype=np.float32):
+    """Exact silhouette triangles for a camera, only testing candidates
+
+        Same result as running getSilhouetteControlIndex() over every
+        triangle with object space NdotV times scale.
+
+        :positions ndarray (V, 3) Object space positions
+        :normals ndarray (V, 3) Object space normals
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+        :camera ndarray (3,) Camera position in object space
+        :scale float Object to world space NdotV scale (see getObjectSpaceCamera())
+
+        :return Tuple (triangle IDs, control corner index per triangle)
+    """
+    candidates = getCandidateTriangles(tree, camera, scale)
+    corners = np.asarray(triangles, dtype=np.int64)[candidates]
+
+    p = np.asarray(positions, dtype=dtype)[corners]
+    n = np.asarray(normals, dtype=dtype)[corners]
+    NdotV = np.sum(n * (np.asarray(camera, dtype=dtype) - p), axis=2) * dtype(scale)
+
+    control = getSilhouetteControlIndex(NdotV)
+    found = control >= 0
+
+    return (candidates[found], control[found])
+
+def encodeNormalConeTree(tree):
+    """Encode a NormalConeTree to a string, e.g. for a string attribute"""
+    header = struct.pack(TREE_HEADER, TREE_MAGIC, TREE_VERSION, len(tree), len(tree.order))
+    payload = b''.join((
+        tree.centers.astype('<f4').tobytes(),
+        tree.radii.astype('<f4').tobytes(),
+        tree.axes.astype('<f4').tobytes(),
+        tree.cosines.astype('<f4').tobytes(),
+        tree.minimums.astype('<f4').tobytes(),
+        tree.children.astype('<i4').tobytes(),
+        tree.ranges.astype('<u4').tobytes(),
+        tree.order.astype('<u4').tobytes()
+    ))
+
+    return TREE_PREFIX + base64.b64encode(header + zlib.compress(payload)).decode('ascii')
+
+def decodeNormalConeTree(encoded):
+    """Decode a string from encodeNormalConeTree()
+
+        :return NormalConeTree
+    """
+    if not encoded.startswith(TREE_PREFIX):
+        raise ValueError('Not a normal cone tree')
+
+    data = base64.b64decode(encoded[len(TREE_PREFIX):])
+    magic, version, count, triangles = struct.unpack_from(TREE_HEADER, data)
+    if magic != TREE_MAGIC or version > TREE_VERSION:
+        raise ValueError('Unsupported normal cone tree version {}'.format(version))
+
+    payload = zlib.decompress(data[struct.calcsize(TREE_HEADER):])
+    sizes = (count * 3, count, count * 3, count, count, count * 2, count * 2, triangles)
+    offsets = np.cumsum((0,) + tuple(size * 4 for size in sizes))
+    dtypes = ('<f4', '<f4', '<f4', '<f4', '<f4', '<i4', '<u4', '<u4')
+
+    return NormalConeTree(*(
+        np.frombuffer(payload[offsets[i]:offsets[i + 1]], dtype=dtypes[i])
+        for i in range(len(sizes))
+    ))
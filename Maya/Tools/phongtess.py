@@ -0,0 +1,340 @@
+"""
+    Offline Phong tessellation matching the NPR shader's TES.
+
+    The TES in NPR.ogsfx (and ShadowTES in Shadows.ogsfh) Phong tessellates
+    every patch on every draw. This bakes the same subdivided mesh on the
+    CPU for engines without tessellation, or as a cheaper shadow caster.
+
+    Domain points follow the GL triangle tessellation rules for
+    tesparams(triangles, equal_spacing, ccw) with one inner and one outer
+    level (u_TessInner, u_TessOuter). Point positions are defined by the
+    spec, but how rings are stitched into triangles is up to the driver,
+    so only the vertices (not necessarily the triangles) match the GPU.
+
+    Every patch is evaluated at once per attribute: positions are Phong
+    projected and blended by u_TessShapeFactor, normals, UVs and colors
+    are interpolated (normals are not renormalized, like the shader),
+    and data1.x gets the TES geometry group of crease edges.
+
+    Math is done in float32 by default to match the GPU.
+
+    Has no dependency on Maya, so it can be used from batch scripts.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import numpy as np
+from collections import OrderedDict
+
+from edgeextract import EPSILON, getPaintedEdgeFlags
+
+# GL_MAX_TESS_GEN_LEVEL guaranteed by the spec
+MAX_TESS_LEVEL = 64
+
+# Matching defines in NPR.ogsfx (GEO_SOURCE is defined twice, the last one wins)
+GEO_SOURCE = 0.4
+GEO_PAINTED_EDGE = 1.0
+
+# Decimal places vertex attributes must match to within to be welded
+WELD_DECIMALS = 5
+
+# Domain patterns per (inner, outer) level, see getTessellationPattern()
+PATTERN_CACHE = {}
+
+class TessellatedMesh:
+    """Static mesh output of the TES for every patch of a mesh"""
+
+    def __init__(self, positions, normals, uvs, colors, data1, triangles):
+        """
+            :positions ndarray (N, 3)
+            :normals ndarray (N, 3)
+            :uvs ndarray (N, 2)
+            :colors ndarray (N, 4)
+            :data1 ndarray (N, 3) x is the geometry group (GEO_SOURCE or
+                a crease's group), y and z are always 0 (the silhouette
+                flag depends on the view, see edgeextract.py)
+            :triangles ndarray (M, 3) Vertex IDs per triangle
+        """
+        self.positions = positions
+        self.normals = normals
+        self.uvs = uvs
+        self.colors = colors
+        self.data1 = data1
+        self.triangles = triangles
+
+    def __len__(self):
+        return len(self.positions)
+
+def getTessLevels(inner, outer):
+    """Effective integer levels for equal_spacing
+
+        :return Tuple (inner, outer), or None if the patch is discarded
+    """
+    if outer <= 0:
+        return None
+
+    inner = int(np.ceil(min(max(inner, 1), MAX_TESS_LEVEL)))
+    outer = int(np.ceil(min(max(outer, 1), MAX_TESS_LEVEL)))
+
+    # An inner level of 1 with any outer level above 1 is
+    # treated as 1 + epsilon, which rounds up to 2
+    if inner == 1 and outer > 1:
+        inner = 2
+
+    return (inner, outer)
+
+def getRing(corners, segments):
+    """Points around a triangle, starting at corner 0, segments per side
+
+        :corners ndarray (3, 3) Barycentric corners
+        :segments int Per side. 0 collapses the ring to its center.
+
+        :return ndarray (max(3 * segments, 1), 3)
+    """
+    if segments == 0:
+        return corners.mean(axis=0, keepdims=True)
+
+    t = np.arange(segments) / float(segments)
+    start = np.repeat(corners, segments, axis=0)
+    end = np.repeat(np.roll(corners, -1, axis=0), segments, axis=0)
+    t = np.tile(t, 3)[:, None]
+
+    return start + (end - start) * t
+
+def stitchRings(outerIds, outerSegments, innerIds, innerSegments):
+    """Triangulate the strip between two concentric rings
+
+        Walks each side of both rings at once, always advancing along the
+        ring whose next point comes first. Inner ring points project onto
+        the outer side at (j + 1) / (innerSegments + 2).
+
+        :return list of (a, b, c) triangles
+    """
+    triangles = []
+    outerCount = len(outerIds)
+    innerCount = len(innerIds)
+
+    for side in range(3):
+        def outer(j):
+            return outerIds[(side * outerSegments + j) % outerCount]
+
+        def inner(j):
+            return innerIds[(side * innerSegments + j) % innerCount]
+
+        o = i = 0
+        while o < outerSegments or i < innerSegments:
+            nextOuter = (o + 1) / float(outerSegments)
+            nextInner = (i + 2) / float(innerSegments + 2)
+
+            if i == innerSegments or (o < outerSegments and nextOuter <= nextInner):
+                triangles.append((outer(o), outer(o + 1), inner(i)))
+                o += 1
+            else:
+                triangles.append((outer(o), inner(i + 1), inner(i)))
+                i += 1
+
+    return triangles
+
+def getTessellationPattern(inner, outer):
+    """Barycentric domain points and triangles of a single patch
+
+        Cached per level, since it's the same for every patch.
+
+        :inner float u_TessInner
+        :outer float u_TessOuter
+
+        :return Tuple (coords ndarray (K, 3) (U, V, W) per point,
+            triangles ndarray (M, 3) point indices, counter-clockwise),
+            or None if patches are discarded at this level
+    """
+    levels = getTessLevels(inner, outer)
+    if levels is None:
+        return None
+
+    if levels in PATTERN_CACHE:
+        return PATTERN_CACHE[levels]
+
+    inner, outer = levels
+    corners = np.eye(3)
+    center = np.full(3, 1.0 / 3)
+
+    if inner == 1:
+        coords = corners
+        triangles = [(0, 1, 2)]
+    else:
+        # Outermost ring uses the outer level, inner rings lose
+        # 2 segments per side and move 2 / inner toward the center
+        rings = [(getRing(corners, outer), outer)]
+        for k in range(1, inner // 2 + 1):
+            ringCorners = corners + (center - corners) * (2.0 * k / inner)
+            rings.append((getRing(ringCorners, inner - 2 * k), inner - 2 * k))
+
+        offsets = np.cumsum([0] + [len(points) for points, segments in rings])
+        coords = np.concatenate([points for points, segments in rings])
+
+        triangles = []
+        for k in range(len(rings) - 1):
+            triangles += stitchRings(
+                np.arange(offsets[k], offsets[k + 1]), rings[k][1],
+                np.arange(offsets[k + 1], offsets[k + 2]), rings[k + 1][1]
+            )
+
+        # Odd levels end on a single inner triangle
+        if rings[-1][1] == 1:
+            triangles.append(tuple(range(offsets[-2], offsets[-1])))
+
+    triangles = np.array(triangles, dtype=np.int64).reshape(-1, 3)
+
+    # Wind every triangle like the patch itself (ccw)
+    uv = coords[:, :2][triangles]
+    a = uv[:, 1] - uv[:, 0]
+    b = uv[:, 2] - uv[:, 0]
+    area = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+    triangles[area < 0] = triangles[area < 0][:, ::-1]
+
+    PATTERN_CACHE[levels] = (coords, triangles)
+    return PATTERN_CACHE[levels]
+
+def getGeometryGroups(coords, cornerGroups, cornerFlags):
+    """Geometry group (data1.x) of every domain point of every patch
+
+        Points on an edge between two GEO_PAINTED_EDGE corners copy the
+        group of one of them, in the same order as the TES. Everything
+        else is GEO_SOURCE.
+
+        :coords ndarray (K, 3) from getTessellationPattern()
+        :cornerGroups ndarray (T, 3) data1.x of each patch corner
+        :cornerFlags ndarray (T, 3) bool, whether each corner is a painted edge
+
+        :return ndarray (T, K)
+    """
+    U, V, W = coords.T
+    e0, e1, e2 = (cornerFlags[:, i:i + 1] for i in range(3))
+
+    groups = np.full((len(cornerGroups), len(coords)), GEO_SOURCE, dtype=cornerGroups.dtype)
+
+    # Reversed, so the first matching branch of the TES is written last
+    for mask, corner in (
+        ((V < EPSILON) & e2 & e0, 2),
+        ((U < EPSILON) & e1 & e2, 1),
+        ((W < EPSILON) & e0 & e1, 0)
+    ):
+        groups = np.where(mask, cornerGroups[:, corner:corner + 1], groups)
+
+    return groups
+
+def weldVertices(mesh, decimals=WELD_DECIMALS):
+    """Merge vertices with matching attributes (e.g. along shared edges)
+
+        Patches sharing an edge evaluate its points with their corners in
+        a different order, so attributes are compared after rounding.
+
+        :decimals int Decimal places attributes are rounded to for comparison
+
+        :return TessellatedMesh
+    """
+    attributes = np.ascontiguousarray(np.round(np.concatenate((
+        mesh.positions, mesh.normals, mesh.uvs, mesh.colors, mesh.data1
+    ), axis=1), decimals))
+
+    rows = attributes.view(np.dtype((np.void, attributes.dtype.itemsize * attributes.shape[1])))
+    unique, first, inverse = np.unique(rows.reshape(-1), return_index=True, return_inverse=True)
+
+    return TessellatedMesh(
+        mesh.positions[first],
+        mesh.normals[first],
+        mesh.uvs[first],
+        mesh.colors[first],
+        mesh.data1[first],
+        inverse.reshape(-1)[mesh.triangles]
+    )
+
+def tessellate(positions, normals, triangles, inner, outer, shapeFactor=0.5,
+               uvs=None, colors=None, weld=False, dtype=np.float32):
+    """Phong tessellate every triangle of a mesh like the TES
+
+        :positions ndarray (V, 3) Vertex positions
+        :normals ndarray (V, 3) Vertex normals, in the same space
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+        :inner float u_TessInner
+        :outer float u_TessOuter
+        :shapeFactor float u_TessShapeFactor, 0 is flat and 1 is full Phong
+        :uvs ndarray (V, 2) Optional, zeros if omitted
+        :colors ndarray (V, 4) Optional RGBA of the crease colorset. The alpha
+            channel flags crease corners (see getPaintedEdgeFlags())
+        :weld bool Merge identical vertices instead of keeping each
+            patch's vertices separate, like the GPU does
+        :dtype Float type to compute in
+
+        :return TessellatedMesh
+    """
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    positions = np.asarray(positions, dtype=dtype).reshape(-1, 3)
+    normals = np.asarray(normals, dtype=dtype).reshape(-1, 3)
+
+    if uvs is None:
+        uvs = np.zeros((len(positions), 2), dtype=dtype)
+    if colors is None:
+        colors = np.zeros((len(positions), 4), dtype=dtype)
+
+    uvs = np.asarray(uvs, dtype=dtype).reshape(-1, 2)
+    colors = np.asarray(colors, dtype=dtype).reshape(-1, 4)
+
+    pattern = getTessellationPattern(inner, outer)
+    if pattern is None or len(triangles) < 1:
+        empty = np.zeros((0, 3), dtype=dtype)
+        return TessellatedMesh(
+            empty, empty, np.zeros((0, 2), dtype=dtype), np.zeros((0, 4), dtype=dtype),
+            empty, np.zeros((0, 3), dtype=np.int64)
+        )
+
+    coords, pattern = pattern
+    B = coords.astype(dtype)
+
+    # Patch corners (T, 3, D), interpolated to every domain point (T, K, D)
+    P = positions[triangles]
+    N = normals[triangles]
+    position = np.matmul(B, P)
+
+    # Projection onto each corner's tangent plane, weighted by the
+    # same barycentrics: sum(B_c * (p - dot(p - P_c, N_c) * N_c))
+    distance = np.matmul(position, N.transpose(0, 2, 1)) - np.sum(P * N, axis=2)[:, None, :]
+    phong = position * B.sum(axis=1)[None, :, None] - np.matmul(B * distance, N)
+
+    # lerp(position, phong, u_TessShapeFactor)
+    factor = dtype(shapeFactor)
+    position = position * (1 - factor) + phong * factor
+
+    # The TCS flags crease corners as GEO_PAINTED_EDGE, everything else is GEO_SOURCE
+    flags = getPaintedEdgeFlags(colors[:, 3], triangles)
+    cornerGroups = np.where(flags, GEO_PAINTED_EDGE, GEO_SOURCE).astype(dtype)
+
+    data1 = np.zeros((len(triangles), len(B), 3), dtype=dtype)
+    data1[:, :, 0] = getGeometryGroups(coords, cornerGroups, flags)
+
+    offsets = np.arange(len(triangles), dtype=np.int64)[:, None, None] * len(B)
+
+    mesh = TessellatedMesh(
+        position.reshape(-1, 3),
+        np.matmul(B, N).reshape(-1, 3),
+        np.matmul(B, uvs[triangles]).reshape(-1, 2),
+        np.matmul(B, colors[triangles]).reshape(-1, 4),
+        data1.reshape(-1, 3),
+        (pattern[None, :, :] + offsets).reshape(-1, 3)
+    )
+
+    return weldVertices(mesh) if weld else mesh
+
+def tessellateLevels(positions, normals, triangles, levels, shapeFactor=0.5, **kwargs):
+    """Bake a static mesh for each of a set of tessellation levels
+
+        :levels list of (inner, outer) levels
+        :kwargs Passed through to tessellate()
+
+        :return OrderedDict (inner, outer) -> TessellatedMesh
+    """
+    return OrderedDict(
+        ((inner, outer), tessellate(
+            positions, normals, triangles, inner, outer, shapeFactor, **kwargs
+        ))
+        for inner, outer in levels
+    )
@@ -0,0 +1,218 @@
+"""
+    PN-AEN 9 index buffer generation (GLSL_PNAEN9).
+
+    The Main technique of NPR.ogsfx asks Maya for PN-AEN index buffers.
+    This builds the same 9 index patches from a triangle index array,
+    for engine export or inspecting what Maya hands to the shader.
+
+    Per triangle (a, b, c), see References/PNAEN Index Buffer.png:
+
+        a b c   the triangle itself
+        d e     vertices of the adjacent triangle across edge a -> b,
+                colocated with a and b respectively
+        f g     same for edge b -> c (at b and c)
+        h i     same for edge c -> a (at c and a)
+
+    Edges without a neighbor (borders) reference the triangle's own
+    vertices. Vertices are matched by position rather than index, so
+    adjacency is found across UV/normal seams where vertices are split.
+    Every position maps to its dominant (lowest index) vertex, each
+    half-edge is hashed into a single int64 of dominant IDs, and twins
+    are found with one sorted lookup over all half-edges at once.
+
+    Buffers are cached on disk keyed by a hash of the positions and
+    triangles, so rebuilding an unchanged asset only costs the hash.
+    Every mesh edit makes a new entry, so only the CACHE_LIMIT most
+    recently used buffers are kept.
+
+    Has no dependency on Maya, so it can be used from batch scripts.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import os
+import hashlib
+import tempfile
+import numpy as np
+
+CACHE_DIR = os.path.join(tempfile.gettempdir(), 'npr-pnaen9')
+
+# Bump to invalidate previously cached buffers if the layout changes
+CACHE_VERSION = 1
+
+# Maximum number of buffers kept in a cache directory. Past that, the least
+# recently used ones (by modification time, refreshed on every hit) are removed.
+CACHE_LIMIT = 64
+
+def getDominantVertices(positions):
+    """Map every vertex to the lowest vertex index sharing its position
+
+        :positions ndarray (V, 3)
+
+        :return ndarray (V,) int64
+    """
+    positions = np.ascontiguousarray(positions, dtype=np.float64).reshape(-1, 3)
+    if len(positions) < 1:
+        return np.zeros(0, dtype=np.int64)
+
+    # Exact position match, compared as raw bytes per row
+    rows = positions.view(np.dtype((np.void, positions.dtype.itemsize * 3))).reshape(-1)
+    unique, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+    return first[inverse.reshape(-1)].astype(np.int64)
+
+def getHalfEdgeTwins(triangles, dominant):
+    """Find the opposite half-edge of every triangle edge
+
+        Half-edge (t, k) runs from corner k to corner (k + 1) % 3 of
+        triangle t. Its twin runs the other way between the same two
+        positions. Non-manifold edges pick one of their neighbors.
+
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+        :dominant ndarray (V,) from getDominantVertices()
+
+        :return ndarray (T, 3) flat half-edge index (t * 3 + k) of the
+            twin of each half-edge, or -1 on borders
+    """
+    count = np.int64(len(dominant))
+    start = dominant[triangles].reshape(-1)
+    end = dominant[np.roll(triangles, -1, axis=1)].reshape(-1)
+
+    keys = start * count + end
+    twinKeys = end * count + start
+
+    order = np.argsort(keys, kind='stable')
+    sortedKeys = keys[order]
+
+    found = np.searchsorted(sortedKeys, twinKeys)
+    found = np.minimum(found, len(sortedKeys) - 1)
+    twins = np.where(sortedKeys[found] == twinKeys, order[found], -1)
+
+    # Degenerate edges (both ends at one position) would be their own twin
+    twins[start == end] = -1
+
+    return twins.reshape(-1, 3)
+
+def buildPNAEN9(positions, triangles):
+    """Build PN-AEN 9 index patches for a triangle mesh
+
+        :positions ndarray (V, 3) Vertex positions
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+
+        :return ndarray (T, 9) uint32 in a b c d e f g h i order
+    """
+    triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    dominant = getDominantVertices(positions)
+    twins = getHalfEdgeTwins(triangles, dominant)
+
+    # Corner vertices at the start/end of each half-edge
+    flat = triangles.reshape(-1)
+    start = triangles
+    end = np.roll(triangles, -1, axis=1)
+
+    # The twin runs end -> start, so its end is colocated
+    # with our start and its start with our end
+    twinStart = flat[twins - twins % 3 + (twins % 3 + 1) % 3]
+    twinEnd = flat[twins]
+
+    border = twins < 0
+    adjacentStart = np.where(border, start, twinStart)
+    adjacentEnd = np.where(border, end, twinEnd)
+
+    patches = np.empty((len(triangles), 9), dtype=np.uint32)
+    patches[:, 0:3] = triangles
+    patches[:, 3::2] = adjacentStart
+    patches[:, 4::2] = adjacentEnd
+
+    return patches
+
+def getTopologyHash(positions, triangles):
+    """Hash of everything that affects a mesh's PN-AEN buffer"""
+    # sha1 rather than blake2b, which is Python 3.6+ only
+    digest = hashlib.sha1()
+    digest.update(str(CACHE_VERSION).encode('ascii'))
+    digest.update(np.ascontiguousarray(positions, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(triangles, dtype=np.int64).tobytes())
+
+    return digest.hexdigest()
+
+def pruneCache(cache_dir, limit=CACHE_LIMIT):
+    """Remove the least recently used cached buffers past a limit
+
+        :cache_dir string Directory of cached buffers
+        :limit int Number of buffers to keep
+    """
+    try:
+        names = [name for name in os.listdir(cache_dir) if name.endswith('.npy')]
+    except OSError:
+        return
+
+    entries = []
+    for name in names:
+        path = os.path.join(cache_dir, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            pass # Removed by another process
+
+    entries.sort(reverse=True)
+    for mtime, path in entries[limit:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def getCachedPNAEN9(positions, triangles, cache_dir=CACHE_DIR, limit=CACHE_LIMIT):
+    """Build PN-AEN 9 index patches, reusing a cached buffer when possible
+
+        :positions ndarray (V, 3) Vertex positions
+        :triangles ndarray (T, 3) Vertex IDs per triangle
+        :cache_dir string Directory for cached buffers
+        :limit int Number of buffers to keep in cache_dir, see pruneCache()
+
+        :return ndarray (T, 9) uint32, see buildPNAEN9()
+    """
+    path = os.path.join(cache_dir, getTopologyHash(positions, triangles) + '.npy')
+
+    if os.path.exists(path):
+        try:
+            patches = np.load(path)
+        except (IOError, ValueError):
+            patches = None # Corrupt/partial file, rebuild below
+
+        if patches is not None:
+            # Mark as recently used for pruneCache()
+            try:
+                os.utime(path, None)
+            except OSError:
+                pass
+
+            return patches
+
+    patches = buildPNAEN9(positions, triangles)
+
+    # makedirs(exist_ok=True) is Python 3 only
+    try:
+        os.makedirs(cache_dir)
+    except OSError:
+        if not os.path.isdir(cache_dir):
+            raise
+
+    # Write to a temp file first so concurrent readers never see a partial buffer.
+    # The suffix keeps it out of pruneCache() until it is in place.
+    handle, temp = tempfile.mkstemp(suffix='.tmp', dir=cache_dir)
+    with os.fdopen(handle, 'wb') as f:
+        np.save(f, patches)
+
+    try:
+        os.replace(temp, path)
+    except AttributeError:
+        # Python 2. rename() won't overwrite on Windows, where losing
+        # to another process writing the same buffer is fine.
+        try:
+            os.rename(temp, path)
+        except OSError:
+            os.remove(temp)
+
+    pruneCache(cache_dir, limit)
+
+    return patches
@@ -0,0 +1,137 @@
+"""
+    CPU reference of the NPR shader's screen coverage LOD selection.
+
+    Mirrors getScreenCoverage() and getCurrentLOD() in Utility.ogsfh,
+    but evaluates a whole stream of MVP matrices (e.g. every frame of
+    a camera path) in one batched call. Useful for tuning u_LOD1/u_LOD2
+    and for finding which LODs an asset is never displayed at.
+
+    Math is done in float32 by default to match the GPU.
+
+    Has no dependency on Maya, so it can be used from batch scripts.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import numpy as np
+
+# Defaults of the matching uniforms in Settings.ogsfh
+DEFAULT_BOUNDING_BOX = (1.0, 1.0, 1.0)
+DEFAULT_LOD1 = 0.667
+DEFAULT_LOD2 = 0.333
+
+def getBoundingBoxCorners(bbox, dtype=np.float32):
+    """Local space corners of u_BoundingBox, in the shader's order
+
+        The box is centered on X/Y and sits on Z = 0.
+
+        :bbox Tuple (x, y, z) extents, as stored in u_BoundingBox
+
+        :return ndarray (8, 4) of homogeneous corners
+    """
+    halfWidth = bbox[0] * 0.5
+    halfDepth = bbox[1] * 0.5
+    height = bbox[2]
+
+    return np.array((
+        (halfWidth, halfDepth, height, 1),
+        (halfWidth, -halfDepth, height, 1),
+        (-halfWidth, halfDepth, height, 1),
+        (halfWidth, halfDepth, 0, 1),
+        (-halfWidth, -halfDepth, height, 1),
+        (halfWidth, -halfDepth, 0, 1),
+        (-halfWidth, halfDepth, 0, 1),
+        (-halfWidth, -halfDepth, 0, 1)
+    ), dtype=dtype)
+
+def fromMayaMatrices(matrices, dtype=np.float32):
+    """Convert Maya matrices to the shader's convention
+
+        Maya (MMatrix, xform, getAttr) stores matrices for row vectors
+        (p * M), whereas the shader multiplies column vectors (M * p).
+
+        :matrices Sequence of 16 floats (or 4x4) per matrix, e.g.
+            the worldViewProjection of each frame as a flat list
+
+        :return ndarray (F, 4, 4) for use with getScreenCoverage()
+    """
+    matrices = np.asarray(matrices, dtype=dtype).reshape(-1, 4, 4)
+    return np.ascontiguousarray(matrices.transpose(0, 2, 1))
+
+def getScreenCoverage(bbox, mvp, dtype=np.float32):
+    """Percentage of the screen covered by the bounding box for each MVP
+
+        :bbox Tuple (x, y, z) extents, as stored in u_BoundingBox
+        :mvp ndarray (F, 4, 4) or (4, 4) of u_MVPMatrix, in the
+            shader's (column vector) convention. See fromMayaMatrices()
+
+        :return ndarray (F,) of coverage in [0, 1], or a float for a single matrix
+    """
+    scalar = np.ndim(mvp) == 2
+    mvp = np.asarray(mvp, dtype=dtype).reshape(-1, 4, 4)
+    corners = getBoundingBoxCorners(bbox, dtype)
+
+    # Convert to NDC. Like the shader, corners behind the camera
+    # (w <= 0) are not clipped and may produce odd results
+    p = np.einsum('fij,cj->fci', mvp, corners)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = p / p[:, :, 3:4]
+
+    # Find minimum/maximum points, converted to range [0, 2]
+    hmin = np.clip(p[:, :, 0].min(axis=1) + 1, 0.0, 2.0)
+    hmax = np.clip(p[:, :, 0].max(axis=1) + 1, 0.0, 2.0)
+    vmin = np.clip(p[:, :, 1].min(axis=1) + 1, 0.0, 2.0)
+    vmax = np.clip(p[:, :, 1].max(axis=1) + 1, 0.0, 2.0)
+
+    area = (hmax - hmin) * (vmax - vmin)
+    coverage = np.clip(area / 4.0, 0.0, 1.0).astype(dtype)
+
+    if scalar:
+        return coverage[0].item()
+
+    return coverage
+
+def getLOD(coverage, lod1=DEFAULT_LOD1, lod2=DEFAULT_LOD2, dtype=np.float32):
+    """LOD the shader selects for each screen coverage
+
+        :coverage float or ndarray from getScreenCoverage()
+        :lod1 float u_LOD1 threshold
+        :lod2 float u_LOD2 threshold
+
+        :return ndarray of int [0, 2] per coverage, or an int for a single coverage
+    """
+    scalar = np.ndim(coverage) == 0
+    coverage = np.asarray(coverage, dtype=dtype)
+
+    # Switch LOD if screen coverage is
+    # less than the upper bound at each LOD
+    lod = np.where(coverage < dtype(lod2), 2, np.where(coverage < dtype(lod1), 1, 0))
+
+    if scalar:
+        return int(lod)
+
+    return lod.astype(np.int8)
+
+def getCurrentLOD(bbox, mvp, lod1=DEFAULT_LOD1, lod2=DEFAULT_LOD2, dtype=np.float32):
+    """Screen coverage and selected LOD for each MVP
+
+        :bbox Tuple (x, y, z) extents, as stored in u_BoundingBox
+        :mvp ndarray (F, 4, 4) of u_MVPMatrix. See getScreenCoverage()
+        :lod1 float u_LOD1 threshold
+        :lod2 float u_LOD2 threshold
+
+        :return Tuple (coverage ndarray, LOD ndarray), one entry per MVP
+    """
+    coverage = getScreenCoverage(bbox, mvp, dtype)
+    return (coverage, getLOD(coverage, lod1, lod2, dtype))
+
+def getLODUsage(lods):
+    """Count how many frames each LOD is displayed for
+
+        An LOD with a count of 0 is never displayed along the evaluated
+        camera path, so its crease data can be dropped for the asset.
+
+        :lods ndarray of LODs from getCurrentLOD()
+
+        :return ndarray (3,) of frame counts for LOD 0, 1 and 2
+    """
+    return np.bincount(np.asarray(lods, dtype=np.int64).ravel(), minlength=3)[:3]
@@ -0,0 +1,590 @@
+"""
+    Specialized shader variant generator for the NPR shader suite.
+
+    NPR.ogsfx picks what to draw at runtime from debug/draw mode uniforms
+    (u_GlobalDrawMode, u_GeometryDrawMode, etc in Settings.ogsfh), and
+    every material pays for those branches in the GS and PS. This builds
+    standalone .ogsfx variants with a chosen set of uniforms fixed:
+
+    * #includes are inlined, so a variant is a single file
+    * Baked uniform declarations are replaced by a #define of their value
+    * if/else branches decided by baked values (and numeric #defines) are
+        removed from the source, leaving only the taken branch
+    * Debug passes (p2) are stripped, along with any GLSLShader block
+        no remaining pass references
+
+    Each variant records a hash of its resolved source and settings in
+    its header. Rebuilding skips any variant whose hash still matches,
+    so only variants affected by an edit are regenerated.
+
+    Usage:
+
+        python shadervariants.py [../NPR.ogsfx] [--output ../Variants]
+            [--variant Lookdev Unlit] [--set u_GlobalDrawMode=DRAW_MODE_LOOKDEV]
+            [--name Custom] [--keep-debug] [--force]
+
+    Has no dependency on Maya, so it can be used from batch scripts.
+
+    @author Chase McManning <mcmanning.1@osu.edu>
+"""
+import os
+import re
+import sys
+import hashlib
+import argparse
+from collections import OrderedDict
+
+# Bump to rebuild every variant if the generator output changes
+GENERATOR_VERSION = 1
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'NPR.ogsfx')
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Variants')
+
+# Passes only used for debug/development, see technique Main in NPR.ogsfx
+DEBUG_PASSES = ('p2',)
+
+# Production settings of the draw mode uniforms in Settings.ogsfh
+PRODUCTION_SETTINGS = OrderedDict((
+    ('u_GeometryDrawMode', 'GEOMETRY_DRAW_COLOR'),
+    ('u_SilhouetteDrawMode', 'SILHOUETTE_DRAW_COLOR'),
+    ('u_CreaseDrawMode', 'CREASE_DRAW_COLOR'),
+    ('u_IsolateLightContribution', 0),
+    ('u_DrawBoundingBox', False),
+))
+
+def _preset(drawMode):
+    settings = OrderedDict((('u_GlobalDrawMode', drawMode),))
+    settings.update(PRODUCTION_SETTINGS)
+    return settings
+
+PRESETS = OrderedDict((
+    ('Lookdev', _preset('DRAW_MODE_LOOKDEV')),
+    ('Unlit', _preset('DRAW_MODE_UNLIT')),
+    ('Silhouette', _preset('DRAW_MODE_SILHOUETTE')),
+))
+
+HASH_PREFIX = '// Variant hash: '
+
+INCLUDE_PATTERN = re.compile(r'^[ \t]*#include\s+"([^"]+)"[^\n]*$', re.MULTILINE)
+DEFINE_PATTERN = re.compile(r'^[ \t]*#define\s+(\w+)\s+([-+]?(?:\d+\.?\d*|\.\d+)f?)\b', re.MULTILINE)
+IF_PATTERN = re.compile(r'(?<![#\w])if\s*\(')
+TOKEN_PATTERN = re.compile(r'\s*(\d+\.\d*f?|\.\d+f?|\d+|\w+|&&|\|\||==|!=|<=|>=|\S)')
+SHADER_STAGE_PATTERN = re.compile(
+    r'\b(?:Vertex|TessControl|TessEvaluation|Geometry|Pixel|Compute)Shader\s*\([^)]*\)\s*=\s*([^;]+);'
+)
+
+def resolveIncludes(path, included=None):
+    """Inline every #include of a shader file, recursively
+
+        Each file is only inlined once (include guards make the
+        rest no-ops anyway).
+
+        :path string Shader file path
+        :included set Absolute paths already inlined
+
+        :return string Source without #includes
+    """
+    if included is None:
+        included = set()
+
+    path = os.path.abspath(path)
+    included.add(path)
+
+    with open(path) as f:
+        source = f.read()
+
+    def include(match):
+        name = match.group(1)
+        target = os.path.abspath(os.path.join(os.path.dirname(path), name))
+        if target in included:
+            return '// Already included: {}'.format(name)
+
+        return '// Begin {}\n{}\n// End {}'.format(
+            name, resolveIncludes(target, included).rstrip(), name
+        )
+
+    return INCLUDE_PATTERN.sub(include, source)
+
+def blankComments(source):
+    """Replace comments and string literals with spaces
+
+        Keeps offsets (and newlines) intact, so matches in the
+        result index straight into the original source.
+    """
+    def blank(match):
+        return re.sub(r'[^\n]', ' ', match.group(0))
+
+    return re.sub(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"', blank, source, flags=re.DOTALL)
+
+def findClosing(blanked, start):
+    """Offset just past the bracket matching the one at start"""
+    pairs = {'(': ')', '{': '}', '[': ']', '<': '>'}
+    opening = blanked[start]
+    closing = pairs[opening]
+    depth = 0
+
+    for i in range(start, len(blanked)):
+        if blanked[i] == opening:
+            depth += 1
+        elif blanked[i] == closing:
+            depth -= 1
+            if depth == 0:
+                return i + 1
+
+    raise ValueError('Unbalanced {} at offset {}'.format(opening, start))
+
+def skipSpace(blanked, pos):
+    while pos < len(blanked) and blanked[pos].isspace():
+        pos += 1
+    return pos
+
+def getDefines(source):
+    """Numeric #define constants of a source
+
+        :return dict Name -> float value
+    """
+    return dict(
+        (name, float(value.rstrip('f')))
+        for name, value in DEFINE_PATTERN.findall(blankComments(source))
+    )
+
+def formatValue(value, defines):
+    """GLSL literal and numeric value of a uniform setting
+
+        :value int, float, bool, or string (a #define name, 'true'/'false' or a number)
+        :defines dict from getDefines()
+
+        :return Tuple (GLSL literal string, float)
+    """
+    if isinstance(value, bool):
+        return ('true' if value else 'false', float(value))
+
+    if isinstance(value, (int, float)):
+        return (str(value), float(value))
+
+    value = str(value).strip()
+    if value in ('true', 'false'):
+        return (value, float(value == 'true'))
+
+    if value in defines:
+        number = defines[value]
+        return (str(int(number)) if number.is_integer() else repr(number), number)
+
+    try:
+        return (value, float(value.rstrip('f')))
+    except ValueError:
+        raise ValueError('Cannot bake unknown value {}'.format(value))
+
+def bakeUniforms(source, settings):
+    """Replace uniform declarations with a #define of a fixed value
+
+        :source string Resolved source (see resolveIncludes())
+        :settings dict Uniform name -> value (see formatValue())
+
+        :return Tuple (source, dict uniform name -> float value)
+    """
+    defines = getDefines(source)
+    values = dict()
+
+    for name, value in settings.items():
+        literal, values[name] = formatValue(value, defines)
+
+        blanked = blankComments(source)
+        match = re.search(r'\buniform\s+\w+\s+{}\b'.format(re.escape(name)), blanked)
+        if not match:
+            raise ValueError('No uniform named {}'.format(name))
+
+        # Skip the optional semantic, annotations and default value
+        end = skipSpace(blanked, match.end())
+        if blanked[end] == ':':
+            end = skipSpace(blanked, re.compile(r':\s*\w+').match(blanked, end).end())
+        if blanked[end] == '<':
+            end = findClosing(blanked, end)
+        end = blanked.index(';', end) + 1
+
+        source = '{}#define {} {}{}'.format(source[:match.start()], name, literal, source[end:])
+
+    return (source, values)
+
+def evaluateCondition(condition, values):
+    """Evaluate an if() condition from known values
+
+        Supports identifiers, numbers, comparisons, !, && and ||. Anything
+        else (function calls, members, arithmetic, unknown identifiers) is
+        unknown. Without function calls, a known operand decides && and ||
+        on either side. Otherwise only GLSL's left to right short
+        circuiting is followed, so calls with side effects are kept.
+
+        :condition string Condition without the outer parentheses
+        :values dict Identifier -> float value
+
+        :return True/False, or None if it can't be decided
+    """
+    tokens = TOKEN_PATTERN.findall(condition)
+    pos = [0]
+    pure = not re.search(r'\w\s*\(', condition)
+
+    def peek():
+        return tokens[pos[0]] if pos[0] < len(tokens) else None
+
+    def take(expected=None):
+        token = peek()
+        if token is None or (expected and token != expected):
+            raise ValueError('Unexpected {}'.format(token))
+        pos[0] += 1
+        return token
+
+    def truth(value):
+        return None if value is None else value != 0
+
+    def skipGroup():
+        # Skip a balanced (...) or [...] following a call/index
+        depth = 0
+        while True:
+            token = take()
+            if token in ('(', '['):
+                depth += 1
+            elif token in (')', ']'):
+                depth -= 1
+                if depth == 0:
+                    return
+
+    def primary():
+        token = take()
+        if token == '(':
+            value = orExpr()
+            take(')')
+            return value
+
+        if re.match(r'[\d.]', token):
+            return float(token.rstrip('f'))
+
+        if not re.match(r'\w+$', token):
+            raise ValueError('Unsupported {}'.format(token))
+
+        unknown = False
+        while peek() in ('(', '[', '.'):
+            unknown = True
+            if peek() == '.':
+                take()
+                take()
+            else:
+                skipGroup()
+
+        if unknown:
+            return None
+        if token in ('true', 'false'):
+            return float(token == 'true')
+        return values.get(token)
+
+    def comparison():
+        left = primary()
+        if peek() not in ('==', '!=', '<', '>', '<=', '>='):
+            return left
+
+        op = take()
+        right = primary()
+        if left is None or right is None:
+            return None
+
+        return {
+            '==': left == right, '!=': left != right,
+            '<': left < right, '>': left > right,
+            '<=': left <= right, '>=': left >= right
+        }[op]
+
+    def notExpr():
+        if peek() == '!':
+            take()
+            value = truth(notExpr())
+            return None if value is None else not value
+        return comparison()
+
+    def andExpr():
+        value = truth(notExpr())
+        while peek() == '&&':
+            take()
+            right = truth(notExpr())
+            if value is None and pure and right is False:
+                value = False
+            elif value is not False:
+                value = None if value is None else right
+        return value
+
+    def orExpr():
+        value = truth(andExpr())
+        while peek() == '||':
+            take()
+            right = truth(andExpr())
+            if value is None and pure and right is True:
+                value = True
+            elif value is not True:
+                value = None if value is None else right
+        return value
+
+    try:
+        value = orExpr()
+        if peek() is not None:
+            return None
+        return value
+    except (ValueError, IndexError):
+        return None
+
+def parseStatement(blanked, pos):
+    """Offset just past the statement (block, if chain or single) at pos"""
+    pos = skipSpace(blanked, pos)
+    if blanked[pos] == '{':
+        return findClosing(blanked, pos)
+
+    if IF_PATTERN.match(blanked, pos):
+        return parseIf(blanked, pos)['end']
+
+    # Single statement, up to the ; outside of any parentheses
+    depth = 0
+    for i in range(pos, len(blanked)):
+        if blanked[i] in '([':
+            depth += 1
+        elif blanked[i] in ')]':
+            depth -= 1
+        elif blanked[i] == ';' and depth == 0:
+            return i + 1
+
+    raise ValueError('Unterminated statement at offset {}'.format(pos))
+
+def parseIf(blanked, pos):
+    """Extents of the if statement (and its else chain) at pos
+
+        :return dict with condition (start, end) inside the parentheses,
+            body (start, end), orElse (start, end) of the else statement
+            or None, and end of the whole statement
+    """
+    opening = blanked.index('(', pos)
+    closing = findClosing(blanked, opening)
+
+    bodyStart = skipSpace(blanked, closing)
+    bodyEnd = parseStatement(blanked, bodyStart)
+
+    orElse = None
+    end = bodyEnd
+    match = re.compile(r'\s*else\b').match(blanked, bodyEnd)
+    if match:
+        elseStart = skipSpace(blanked, match.end())
+        end = parseStatement(blanked, elseStart)
+        orElse = (elseStart, end)
+
+    return {
+        'condition': (opening + 1, closing - 1),
+        'body': (bodyStart, bodyEnd),
+        'orElse': orElse,
+        'end': end
+    }
+
+def removeSpan(source, start, end):
+    """Remove source[start:end], along with its line if nothing else is on it"""
+    lineStart = source.rfind('\n', 0, start) + 1
+    lineEnd = source.find('\n', end)
+    lineEnd = len(source) if lineEnd < 0 else lineEnd
+
+    if not source[lineStart:start].strip() and not source[end:lineEnd].strip():
+        return source[:lineStart] + source[lineEnd + 1:]
+
+    return source[:start] + source[end:]
+
+def stripDeadBranches(source, values):
+    """Remove if/else branches decided by known values
+
+        Taken branches are kept as a block to preserve scoping.
+
+        :source string Source (with uniforms baked, see bakeUniforms())
+        :values dict Identifier -> float value
+
+        :return string
+    """
+    pos = 0
+    while True:
+        blanked = blankComments(source)
+        match = IF_PATTERN.search(blanked, pos)
+        if not match:
+            return source
+
+        statement = parseIf(blanked, match.start())
+        start, end = statement['condition']
+        taken = evaluateCondition(source[start:end], values)
+
+        if taken is None:
+            pos = match.end()
+            continue
+
+        if taken:
+            start, end = statement['body']
+        elif statement['orElse']:
+            start, end = statement['orElse']
+        else:
+            # Dropping an `else if` drops its else too
+            previous = re.search(r'else\s*$', blanked[:match.start()])
+            if previous:
+                source = source[:previous.start()].rstrip() + source[statement['end']:]
+                pos = len(source[:previous.start()].rstrip())
+            else:
+                source = removeSpan(source, match.start(), statement['end'])
+                pos = match.start()
+            continue
+
+        source = source[:match.start()] + source[start:end] + source[statement['end']:]
+        pos = match.start()
+
+def getLeadingComments(source, blanked, start):
+    """Start of the comment lines directly above offset start, if any"""
+    lineStart = source.rfind('\n', 0, start) + 1
+    while lineStart > 0:
+        previous = source.rfind('\n', 0, lineStart - 1) + 1
+        line = source[previous:lineStart]
+        if not line.strip() or blanked[previous:lineStart].strip():
+            break
+        lineStart = previous
+
+    return lineStart
+
+def stripPasses(source, names):
+    """Remove passes (and the comments directly above them) from techniques
+
+        :names string[] Pass names, e.g. DEBUG_PASSES
+    """
+    for name in names:
+        blanked = blankComments(source)
+        match = re.search(r'\bpass\s+{}\b'.format(re.escape(name)), blanked)
+        if not match:
+            continue
+
+        end = skipSpace(blanked, match.end())
+        if blanked[end] == '<':
+            end = skipSpace(blanked, findClosing(blanked, end))
+
+        end = findClosing(blanked, end)
+        start = getLeadingComments(source, blanked, match.start())
+        source = removeSpan(source, start, end)
+
+    return source
+
+def stripUnusedShaders(source):
+    """Remove GLSLShader blocks that no pass references"""
+    blanked = blankComments(source)
+    used = set(re.findall(r'\w+', ' '.join(SHADER_STAGE_PATTERN.findall(blanked))))
+
+    for match in reversed(list(re.finditer(r'\bGLSLShader\s+(\w+)\s*\{', blanked))):
+        if match.group(1) in used:
+            continue
+
+        end = findClosing(blanked, match.end() - 1)
+        start = getLeadingComments(source, blanked, match.start())
+        source = removeSpan(source, start, end)
+
+    return source
+
+def getVariantHash(resolved, settings, passes):
+    """Hash of everything that affects the output of a variant"""
+    # sha1 rather than blake2b, which is Python 3.6+ only
+    digest = hashlib.sha1()
+    digest.update(str(GENERATOR_VERSION).encode('ascii'))
+    digest.update(resolved.encode('utf-8'))
+    digest.update(repr(sorted((name, str(value)) for name, value in settings.items())).encode('utf-8'))
+    digest.update(repr(sorted(passes)).encode('utf-8'))
+
+    return digest.hexdigest()
+
+def buildVariant(resolved, settings, passes=DEBUG_PASSES):
+    """Specialize a resolved shader source
+
+        :resolved string Source from resolveIncludes()
+        :settings dict Uniform name -> value to bake
+        :passes string[] Passes to strip
+
+        :return string Variant source
+    """
+    source, values = bakeUniforms(resolved, settings)
+
+    known = getDefines(source)
+    known.update(values)
+
+    source = stripDeadBranches(source, known)
+    source = stripPasses(source, passes)
+    return stripUnusedShaders(source)
+
+def writeVariant(sourcePath, outputPath, settings, passes=DEBUG_PASSES, force=False):
+    """Build a variant to a file, unless the existing file is up to date
+
+        :sourcePath string Shader to specialize, e.g. NPR.ogsfx
+        :outputPath string Variant file to write
+        :settings dict Uniform name -> value to bake
+        :passes string[] Passes to strip
+        :force bool Rebuild even if the hash matches
+
+        :return bool True if the variant was (re)built
+    """
+    resolved = resolveIncludes(sourcePath)
+    variantHash = getVariantHash(resolved, settings, passes)
+
+    if not force and os.path.exists(outputPath):
+        with open(outputPath) as f:
+            if f.readline().strip() == HASH_PREFIX + variantHash:
+                return False
+
+    header = '\n'.join([HASH_PREFIX + variantHash,
+        '// Generated by shadervariants.py from {} - do not edit.'.format(
+            os.path.basename(sourcePath)
+        )] + [
+        '// {} = {}'.format(name, value) for name, value in settings.items()
+    ])
+
+    source = buildVariant(resolved, settings, passes)
+
+    directory = os.path.dirname(os.path.abspath(outputPath))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    with open(outputPath, 'w') as f:
+        f.write(header + '\n' + source)
+
+    return True
+
+def parseSetting(text):
+    """Parse a NAME=VALUE command line setting"""
+    if '=' not in text:
+        raise argparse.ArgumentTypeError('Expected NAME=VALUE, got {}'.format(text))
+
+    name, value = text.split('=', 1)
+    return (name.strip(), value.strip())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build specialized variants of an .ogsfx shader')
+    parser.add_argument('source', nargs='?', default=DEFAULT_SOURCE, help='Shader to specialize')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Directory for variants')
+    parser.add_argument('--variant', nargs='+', choices=list(PRESETS.keys()), help='Presets to build')
+    parser.add_argument('--set', type=parseSetting, nargs='+', help='NAME=VALUE uniforms to bake')
+    parser.add_argument('--name', default='Custom', help='Name of the --set variant')
+    parser.add_argument('--keep-debug', action='store_true', help='Keep debug passes')
+    parser.add_argument('--force', action='store_true', help='Rebuild up to date variants')
+    args = parser.parse_args(argv)
+
+    if args.set:
+        variants = OrderedDict(((args.name, OrderedDict(args.set)),))
+    else:
+        variants = OrderedDict((name, PRESETS[name]) for name in args.variant or PRESETS.keys())
+
+    passes = () if args.keep_debug else DEBUG_PASSES
+    base = os.path.splitext(os.path.basename(args.source))[0]
+
+    for name, settings in variants.items():
+        path = os.path.join(args.output, '{}_{}.ogsfx'.format(base, name))
+        try:
+            built = writeVariant(args.source, path, settings, passes, args.force)
+        except ValueError as e:
+            print('{:12} failed: {}'.format(name, e))
+            return 1
+
+        print('{:12} {} {}'.format(name, 'built' if built else 'up to date', path))
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())